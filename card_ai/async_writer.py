@@ -0,0 +1,110 @@
+import os
+import queue
+import threading
+import cv2
+import numpy as np
+
+# Standardwerte für den Hintergrund-Schreiber
+WRITER_THREADS = 2  # cv2.imencode und Dateizugriffe geben den GIL frei
+QUEUE_SIZE = 32  # Maximale Anzahl wartender Frames (Back-Pressure)
+JPEG_QUALITY = 95
+
+# Standardwerte für das Überspringen fast identischer Frames
+MIN_FRAME_DIFF = 4.0  # Mittlere absolute Differenz (Graustufen, 0-255) zum zuletzt gespeicherten Frame
+MIN_SHARPNESS = 0  # Varianz des Laplace-Filters wie in enhance_images.is_blurry (0 = keine Prüfung)
+COMPARE_SIZE = (64, 36)
+
+# Debug-Modus (0 = aus, 1 = an)
+DEBUG = 1
+
+def log(msg):
+    """ Debug-Logger für schnelle Prints """
+    if DEBUG:
+        print(f"[LOG] {msg}")
+
+class AsyncImageWriter:
+    """ Kodiert und speichert Frames in Hintergrund-Threads, damit die Kamera-Schleife nicht blockiert """
+
+    def __init__(self, threads=WRITER_THREADS, queue_size=QUEUE_SIZE, jpeg_quality=JPEG_QUALITY, block=False):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.block = block  # True = Aufnahme wartet bei voller Queue, False = Frame wird verworfen
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, path, frame):
+        """ Reiht einen Frame zum Speichern ein, gibt False zurück, wenn er wegen voller Queue verworfen wurde """
+        try:
+            self.queue.put((path, frame), block=self.block)
+            return True
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            path, frame = item
+            # Fehler (unbekannte Endung, Platte voll, Ordner fehlt) zählen nur als failed - der Thread muss
+            # weiterlaufen und task_done() melden, sonst warten submit(block=True) und close() für immer
+            try:
+                try:
+                    ext = os.path.splitext(path)[1] or ".jpg"
+                    ok, encoded = cv2.imencode(ext, frame, self.params)
+                    if ok:
+                        encoded.tofile(path)
+                    error = None if ok else "Kodieren fehlgeschlagen"
+                except Exception as exc:
+                    error = exc
+                with self.lock:
+                    if error is None:
+                        self.written += 1
+                    else:
+                        self.failed += 1
+                if error is not None:
+                    log(f"❌ Fehler beim Speichern: {path} ({error})")
+            finally:
+                self.queue.task_done()
+
+    def close(self):
+        """ Wartet, bis alle eingereihten Frames geschrieben sind, und beendet die Threads """
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+class DuplicateFilter:
+    """ Erkennt fast identische (verkleinertes Graustufenbild) und optional unscharfe Frames """
+
+    def __init__(self, min_diff=MIN_FRAME_DIFF, min_sharpness=MIN_SHARPNESS):
+        self.min_diff = min_diff
+        self.min_sharpness = min_sharpness
+        self.last = None
+        self.skipped_similar = 0
+        self.skipped_blurry = 0
+
+    def accept(self, frame):
+        """ True, wenn der Frame scharf genug ist und sich vom zuletzt gespeicherten unterscheidet """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, COMPARE_SIZE, interpolation=cv2.INTER_AREA)
+
+        # Gleiches Schärfemaß wie die spätere Vorverarbeitung, die solche Bilder ohnehin verwirft
+        if self.min_sharpness and cv2.Laplacian(gray, cv2.CV_64F).var() < self.min_sharpness:
+            self.skipped_blurry += 1
+            return False
+
+        if self.last is not None and np.mean(cv2.absdiff(small, self.last)) < self.min_diff:
+            self.skipped_similar += 1
+            return False
+
+        self.last = small
+        return True
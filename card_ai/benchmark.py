@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import cv2
+import numpy as np
+import enhance_images
+from live_card_detector import detect_card, crop_card
+from card_detection import find_card_contours, CardDetector
+from inference_engine import load_engine, MODEL_VARIANTS
+from dataset_files import IMAGE_EXTENSIONS
+
+# Basisverzeichnis bestimmen
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RAW_DATA_DIR = os.path.join(BASE_DIR, "datasets", "raw")
+
+# Auflösungen, auf die synthetische und echte Frames gebracht werden
+RESOLUTIONS = {
+    "480p": (640, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+}
+
+# Standardwerte für die Messung
+REPEAT = 30
+WARMUP = 3
+SAMPLE_FRAMES = 5
+REGRESSION_THRESHOLD = 0.10  # 10% langsamer (Median) gilt als Regression
+ENHANCE_BATCH = 32  # Stapelgröße für den Vergleich Einzelbild- vs. Stapel-Verbesserung
+
+def synthetic_frame(size, seed=0):
+    """ Künstlicher Frame: verrauschter Hintergrund mit einer hellen, leicht gedrehten Karte """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(30, 90, size=(height, width, 3), dtype=np.uint8)
+    center = (width / 2, height / 2)
+    card = (center, (height * 0.45, height * 0.65), 12.0)
+    corners = cv2.boxPoints(card).astype(np.int32)
+    cv2.fillConvexPoly(frame, corners, (235, 235, 235))
+    cv2.putText(frame, "10", (int(center[0] - height * 0.1), int(center[1])), cv2.FONT_HERSHEY_SIMPLEX,
+                height / 300, (0, 0, 200), 3, cv2.LINE_AA)
+    return frame
+
+def sample_frames(count, seed=0):
+    """ Zufällige (aber reproduzierbare) Aufnahmen aus datasets/raw """
+    if not os.path.exists(RAW_DATA_DIR):
+        return []
+    paths = []
+    for card in sorted(os.listdir(RAW_DATA_DIR)):
+        card_path = os.path.join(RAW_DATA_DIR, card)
+        if not os.path.isdir(card_path):
+            continue
+        paths += [os.path.join(card_path, f) for f in sorted(os.listdir(card_path)) if f.lower().endswith(IMAGE_EXTENSIONS)]
+    random.Random(seed).shuffle(paths)
+    frames = [cv2.imread(path) for path in paths[:count]]
+    return [frame for frame in frames if frame is not None]
+
+def full_frame_contour(frame):
+    """ Fallback-Kontur über den ganzen Frame, falls keine Karte gefunden wurde """
+    h, w = frame.shape[:2]
+    return np.array([[[0, 0]], [[w - 1, 0]], [[w - 1, h - 1]], [[0, h - 1]]], dtype=np.int32)
+
+def measure(fn, inputs, repeat=REPEAT, warmup=WARMUP):
+    """ Führt fn über alle Eingaben aus und liefert Median, p95 (ms) und Durchsatz (Aufrufe/s) """
+    for i in range(warmup):
+        fn(inputs[i % len(inputs)])
+    timings = []
+    for i in range(repeat):
+        item = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return {
+        "median_ms": round(float(np.median(timings)), 4),
+        "p95_ms": round(float(np.percentile(timings, 95)), 4),
+        "throughput": round(float(1000 / timings.mean()), 2),
+        "samples": len(timings),
+    }
+
+def enhance_per_image(crops):
+    """ Bisheriger Pfad pro Bild: CLAHE über LAB, Schärfen in Farbe, dann Graustufen und Skalieren """
+    for crop in crops:
+        sharpened = enhance_images.sharpen_image(enhance_images.adjust_brightness_contrast(crop))
+        gray = cv2.cvtColor(sharpened, cv2.COLOR_BGR2GRAY)
+        cv2.resize(gray, enhance_images.TARGET_SIZE, interpolation=cv2.INTER_AREA)
+
+def compare_enhancement(crops, repeat=REPEAT):
+    """ Durchsatz (Bilder/s) der Einzelbild-Verbesserung gegen BatchEnhancer auf denselben Crops """
+    enhancer = enhance_images.BatchEnhancer(len(crops))
+    cases = {
+        f"enhance_per_image/batch{len(crops)}": enhance_per_image,
+        f"enhance_batch/batch{len(crops)}": enhancer.process,
+        f"enhance_batch_normalized/batch{len(crops)}": lambda items: enhancer.normalize(enhancer.process(items)),
+    }
+    results = {}
+    for key, fn in cases.items():
+        results[key] = measure(fn, [crops], repeat)
+        images_per_s = results[key]["throughput"] * len(crops)
+        print(f"📊 {key:<45} median {results[key]['median_ms']:>9.3f} ms | {images_per_s:>8.0f} Bilder/s")
+    per_image, batched = (results[key]["median_ms"] for key in list(cases)[:2])
+    print(f"⚡ Stapel-Verbesserung {per_image / batched:.1f}x schneller als der Einzelbild-Pfad")
+    return results
+
+def build_inputs(resolutions, sample_count):
+    """ Frames pro (Quelle, Auflösung): synthetisch und aus datasets/raw skaliert """
+    samples = sample_frames(sample_count)
+    inputs = {}
+    for name in resolutions:
+        size = RESOLUTIONS[name]
+        inputs[("synthetic", name)] = [synthetic_frame(size, seed) for seed in range(3)]
+        if samples:
+            inputs[("raw", name)] = [cv2.resize(frame, size, interpolation=cv2.INTER_AREA) for frame in samples]
+    return inputs
+
+def run_benchmarks(resolutions, sample_count=SAMPLE_FRAMES, repeat=REPEAT, model_path=None):
+    """ Misst alle Hot-Paths und gibt ein Dict {Name: Statistik} zurück """
+    enhance_images.DEBUG = 0  # Keine Log-Ausgaben während der Messung
+    results = {}
+
+    for (source, resolution), frames in build_inputs(resolutions, sample_count).items():
+        contours = [detect_card(frame) for frame in frames]
+        pairs = [(frame, contour if contour is not None else full_frame_contour(frame)) for frame, contour in zip(frames, contours)]
+        tag = f"{source}@{resolution}"
+
+        # ROI-Modus: Detektor hat die Karte im vorherigen (gleichen) Frame schon gefunden
+        primed = []
+        for frame in frames:
+            card_detector = CardDetector(min_area=0)
+            card_detector.detect(frame)
+            primed.append((card_detector, frame))
+
+        cases = {
+            "detect_card": (detect_card, frames),
+            "find_card_contours": (lambda frame: find_card_contours(frame, min_area=0), frames),
+            "card_detector_roi": (lambda pair: pair[0].detect(pair[1]), primed),
+            "crop_card": (lambda pair: crop_card(*pair), pairs),
+            "crop_to_card": (enhance_images.crop_to_card, frames),
+            "adjust_brightness_contrast": (enhance_images.adjust_brightness_contrast, frames),
+            "sharpen_image": (enhance_images.sharpen_image, frames),
+            "is_blurry": (enhance_images.is_blurry, frames),
+            # Vorprüfung direkt auf den JPEG-Bytes (verkleinert dekodieren + Laplace) statt volles Dekodieren + is_blurry
+            "prescreen_blurry": (enhance_images.prescreen_blurry, [cv2.imencode(".jpg", frame)[1] for frame in frames]),
+        }
+        for name, (fn, inputs) in cases.items():
+            key = f"{name}/{tag}"
+            results[key] = measure(fn, inputs, repeat)
+            print(f"📊 {key:<45} median {results[key]['median_ms']:>9.3f} ms | p95 {results[key]['p95_ms']:>9.3f} ms")
+
+    # Einzelbild- vs. Stapel-Verbesserung auf Karten-Crops (wie im Offline-Enhancer nach crop_to_card)
+    crops = [enhance_images.crop_to_card(frame) for frame in sample_frames(ENHANCE_BATCH)] or \
+            [synthetic_frame(RESOLUTIONS["720p"], seed) for seed in range(ENHANCE_BATCH)]
+    results.update(compare_enhancement(crops, max(3, repeat // 10)))
+
+    # CNN-Forward-Pass auf einem entzerrten 256x256-Crop (nur wenn ein Modell vorhanden ist)
+    if model_path and os.path.exists(model_path):
+        engine = load_engine(model_path)
+        crop = cv2.cvtColor(crop_card(*pairs[0]), cv2.COLOR_BGR2GRAY)
+        for batch_size in (1, 8):
+            batch = np.repeat(crop[np.newaxis], batch_size, axis=0)
+            key = f"cnn_forward/batch{batch_size}"
+            results[key] = measure(engine.predict_batch, [batch], repeat)
+            print(f"📊 {key:<45} median {results[key]['median_ms']:>9.3f} ms | p95 {results[key]['p95_ms']:>9.3f} ms")
+    else:
+        print(f"⚠️ Kein Modell unter {model_path}, CNN-Forward-Pass wird übersprungen")
+
+    return results
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """ Vergleicht Mediane mit einem früheren Lauf, gibt die Liste der Regressionen zurück """
+    regressions = []
+    print(f"\n{'Benchmark':<45}{'Baseline':>12}{'Aktuell':>12}{'Änderung':>10}")
+    for key, stats in results.items():
+        old = baseline.get("results", {}).get(key)
+        if old is None:
+            continue
+        change = stats["median_ms"] / old["median_ms"] - 1 if old["median_ms"] else 0.0
+        flag = " ❌" if change > threshold else ""
+        print(f"{key:<45}{old['median_ms']:>12.3f}{stats['median_ms']:>12.3f}{change:>+10.1%}{flag}")
+        if change > threshold:
+            regressions.append((key, change))
+    return regressions
+
+def main(argv=None):
+    """ Einstiegspunkt für die Kommandozeile und run_pipeline.py """
+    parser = argparse.ArgumentParser(description="Benchmark der Erkennungs- und Bildverbesserungs-Hot-Paths")
+    parser.add_argument("--resolutions", nargs="+", choices=sorted(RESOLUTIONS), default=["480p", "720p", "1080p"], help="Auflösungen der Test-Frames")
+    parser.add_argument("--samples", type=int, default=SAMPLE_FRAMES, help="Anzahl echter Frames aus datasets/raw")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="Messungen pro Benchmark")
+    parser.add_argument("--variant", choices=sorted(MODEL_VARIANTS), default="float32", help="Modellvariante für den CNN-Benchmark")
+    parser.add_argument("--model", type=str, help="Expliziter Modellpfad, überschreibt --variant")
+    parser.add_argument("--output", type=str, default="benchmark_results.json", help="JSON-Datei für die Ergebnisse")
+    parser.add_argument("--baseline", type=str, help="Frühere Ergebnisdatei zum Vergleich")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Ab dieser relativen Verlangsamung des Medians gilt ein Benchmark als Regression")
+    args = parser.parse_args(argv)
+
+    cv2.setRNGSeed(0)
+    results = run_benchmarks(args.resolutions, args.samples, args.repeat, args.model or MODEL_VARIANTS[args.variant])
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Ergebnisse gespeichert unter: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} Regression(en) über {args.threshold:.0%} gefunden")
+            sys.exit(1)
+        print("\n✅ Keine Regressionen gefunden")
+
+if __name__ == "__main__":
+    main()
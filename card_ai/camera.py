@@ -1,6 +1,8 @@
 import cv2
 import os
 import time
+import argparse
+from async_writer import AsyncImageWriter, DuplicateFilter, WRITER_THREADS, QUEUE_SIZE, MIN_FRAME_DIFF, MIN_SHARPNESS
 
 # Hauptordner für Bilder
 RAW_DATA_DIR = "datasets/raw"
@@ -20,7 +22,8 @@ def create_card_folder(card_name):
     os.makedirs(path, exist_ok=True)
     return path
 
-def capture_images(card_name, frame_rate=2):
+def capture_images(card_name, frame_rate=2, writer_threads=WRITER_THREADS, queue_size=QUEUE_SIZE,
+                   skip_duplicates=False, min_diff=MIN_FRAME_DIFF, min_sharpness=MIN_SHARPNESS):
     """ Startet die Kamera und nimmt Bilder auf """
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
@@ -32,6 +35,10 @@ def capture_images(card_name, frame_rate=2):
     frame_count = len(os.listdir(folder_path))  # Falls schon Bilder existieren
     log(f"Starte Aufnahme für: {card_name} (Vorhandene Bilder: {frame_count})")
 
+    # Frames werden in Hintergrund-Threads kodiert und geschrieben, bei voller Queue verworfen
+    writer = AsyncImageWriter(threads=writer_threads, queue_size=queue_size)
+    duplicate_filter = DuplicateFilter(min_diff, min_sharpness) if skip_duplicates else None
+
     print("Drücke 'q', um die Aufnahme zu beenden.")
 
     while True:
@@ -43,13 +50,13 @@ def capture_images(card_name, frame_rate=2):
         # Live-Feed anzeigen
         cv2.imshow("Live Video", frame)
 
-        # Alle paar Sekunden speichern
+        # Alle paar Sekunden speichern (Kodieren & Schreiben übernimmt der Hintergrund-Writer)
         if time.time() - last_time > 1 / frame_rate:
-            frame_count += 1
-            img_path = os.path.join(folder_path, f"img{frame_count}.jpg")
-            cv2.imwrite(img_path, frame)
-            log(f"📸 Bild gespeichert: {img_path}")
             last_time = time.time()
+            if duplicate_filter is None or duplicate_filter.accept(frame):
+                img_path = os.path.join(folder_path, f"img{frame_count + 1}.jpg")
+                if writer.submit(img_path, frame):
+                    frame_count += 1
 
         # Abbruch mit 'q'
         if cv2.waitKey(1) & 0xFF == ord('q'):
@@ -58,11 +65,29 @@ def capture_images(card_name, frame_rate=2):
 
     cap.release()
     cv2.destroyAllWindows()
+    writer.close()
     log(f"✅ Aufnahme abgeschlossen. {frame_count} Bilder gespeichert in {folder_path}.")
+    log(f"📊 Geschrieben: {writer.written}, verworfen (Queue voll): {writer.dropped}, Fehler: {writer.failed}")
+    if duplicate_filter is not None:
+        log(f"📊 Übersprungen: {duplicate_filter.skipped_similar} fast identisch, {duplicate_filter.skipped_blurry} unscharf")
+
+def main(argv=None):
+    """ Einstiegspunkt für die Kommandozeile und run_pipeline.py """
+    parser = argparse.ArgumentParser(description="Nimmt Bilder einer Karte mit der Kamera auf")
+    parser.add_argument("--frame-rate", type=float, default=2, help="Gespeicherte Bilder pro Sekunde")
+    parser.add_argument("--writer-threads", type=int, default=WRITER_THREADS, help="Threads, die im Hintergrund kodieren und schreiben")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Maximale Anzahl wartender Frames, danach wird verworfen")
+    parser.add_argument("--skip-duplicates", action="store_true", help="Fast identische Frames nicht speichern")
+    parser.add_argument("--min-diff", type=float, default=MIN_FRAME_DIFF, help="Mindest-Unterschied zum letzten gespeicherten Frame (mittlere Graustufen-Differenz)")
+    parser.add_argument("--min-sharpness", type=float, default=MIN_SHARPNESS, help="Unschärfere Frames (Laplace-Varianz) nicht speichern, 0 = aus")
+    args = parser.parse_args(argv)
 
-if __name__ == "__main__":
     card_name = input("🃏 Name der Karte (z.B. hearts_2): ").strip().lower()
     if card_name == "":
         print("❌ Kein Name eingegeben. Beende Skript.")
     else:
-        capture_images(card_name)
+        capture_images(card_name, args.frame_rate, args.writer_threads, args.queue_size,
+                       args.skip_duplicates, args.min_diff, args.min_sharpness)
+
+if __name__ == "__main__":
+    main()
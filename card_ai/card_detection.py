@@ -0,0 +1,166 @@
+import cv2
+import numpy as np
+
+# Mindestbreite der Pyramidenebene, auf der Konturen gesucht werden (720p -> 640, 1080p -> 480)
+DETECT_WIDTH = 480
+
+# Billige Vorfilter vor approxPolyDP
+MIN_CARD_AREA = 5000  # Pixel im Originalframe
+MAX_ASPECT = 3.0  # Seitenverhältnis der Bounding-Box (auch bei starker Perspektive)
+MIN_EXTENT = 0.3  # Konturfläche / Fläche der Bounding-Box (gedrehte Karte ~0.5, gerade ~1.0)
+
+# ROI um die letzten Karten (Anteil der Box-Größe) und wie oft trotzdem der ganze Frame durchsucht wird
+ROI_MARGIN = 0.25
+FULL_SEARCH_EVERY = 15
+
+def to_gray(frame):
+    """ Graustufen-Ansicht des Frames (ohne Kopie, falls er schon grau ist) """
+    return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+# Anzahl Profile pro Seite für die Verfeinerung der Ecken
+REFINE_SAMPLES = 24
+
+def fit_side(gray, p, q, band):
+    """ Passt eine Gerade an die Kante zwischen p und q an: stärkster Gradient auf kurzen Querprofilen """
+    direction = q - p
+    length = float(np.hypot(*direction))
+    if length == 0:
+        return None
+    normal = np.array([-direction[1], direction[0]]) / length
+
+    # Querprofile (senkrecht zur groben Seite), Eckbereiche ausgelassen; je 3 parallele Linien gemittelt gegen Rauschen
+    along = np.linspace(0.15, 0.85, REFINE_SAMPLES)
+    across = np.arange(-band, band + 0.5, 0.5)
+    tangent = direction / length
+    base = p + along[:, np.newaxis] * direction
+    profiles = 0
+    for shift in (-1.0, 0.0, 1.0):
+        coords = (base + shift * tangent)[:, np.newaxis, :] + across[np.newaxis, :, np.newaxis] * normal
+        profiles = profiles + cv2.remap(gray, coords[..., 0].astype(np.float32), coords[..., 1].astype(np.float32),
+                                        cv2.INTER_LINEAR).astype(np.float32)
+
+    gradient = np.abs(np.diff(profiles, axis=1))
+    strongest = gradient.argmax(axis=1)
+    keep = gradient[np.arange(len(along)), strongest] > 3 * 20  # mind. ~20 Graustufen Sprung pro Linie
+    if keep.sum() < REFINE_SAMPLES // 3:
+        return None
+    offsets = (across[strongest] + across[strongest + 1]) / 2
+    points = (base + offsets[:, np.newaxis] * normal)[keep].astype(np.float32)
+    vx, vy, x, y = cv2.fitLine(points, cv2.DIST_HUBER, 0, 0.01, 0.01).ravel()
+    return np.array([x, y]), np.array([vx, vy])
+
+def intersect(line_a, line_b):
+    """ Schnittpunkt zweier Geraden (Punkt, Richtung), None falls (fast) parallel """
+    (pa, da), (pb, db) = line_a, line_b
+    det = da[0] * -db[1] + db[0] * da[1]
+    if abs(det) < 1e-6:
+        return None
+    diff = pb - pa
+    t = (diff[0] * -db[1] + db[0] * diff[1]) / det
+    return pa + t * da
+
+def refine_corners(gray, corners, scale):
+    """ Verfeinert die auf der kleinen Ebene gefundenen Ecken im Originalbild über Geraden-Fits der vier Seiten """
+    band = int(np.ceil(2.0 / scale)) + 2
+    points = corners.reshape(4, 2)
+    lines = [fit_side(gray, points[i], points[(i + 1) % 4], band) for i in range(4)]
+    if any(line is None for line in lines):
+        return corners
+
+    refined = []
+    for i in range(4):
+        corner = intersect(lines[i - 1], lines[i])  # Ecke i liegt zwischen Seite i-1 und Seite i
+        if corner is None or np.linalg.norm(corner - points[i]) > 2 * band:
+            return corners
+        refined.append(corner)
+    return np.array(refined, dtype=np.float32).reshape(4, 1, 2)
+
+def find_card_contours(frame, min_area=MIN_CARD_AREA, roi=None, detect_width=DETECT_WIDTH, dilate_iterations=1, refine=True):
+    """ Findet viereckige Karten-Konturen: Suche auf verkleinerter Ebene, Ecken im Original verfeinert.
+
+    roi (x, y, w, h) beschränkt die Suche auf einen Ausschnitt. Rückgabe wie detect_cards:
+    Liste von (4, 1, 2)-int32-Konturen in Originalkoordinaten, größte zuerst.
+    """
+    # Anzahl Pyramidenebenen hängt vom ganzen Frame ab, nicht von der ROI (gleiche Auflösung in beiden Fällen)
+    levels = 0
+    while (frame.shape[1] >> (levels + 1)) >= detect_width:
+        levels += 1
+
+    # Erst ausschneiden, dann konvertieren: in der ROI wird nur der Ausschnitt angefasst
+    offset_x, offset_y = 0, 0
+    if roi is not None:
+        x, y, w, h = roi
+        frame = frame[y:y + h, x:x + w]
+        offset_x, offset_y = x, y
+    gray = to_gray(frame)
+
+    small = gray
+    for _ in range(levels):
+        small = cv2.pyrDown(small)
+    scale = small.shape[1] / float(gray.shape[1])
+
+    blurred = cv2.GaussianBlur(small, (5, 5), 0)
+    edges = cv2.Canny(blurred, 50, 150)
+    if dilate_iterations:
+        edges = cv2.dilate(edges, np.ones((3, 3), np.uint8), iterations=dilate_iterations)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    small_min_area = min_area * scale * scale
+    cards = []
+    for contour in contours:
+        # Billige Checks zuerst: Fläche, Seitenverhältnis und Füllgrad der Bounding-Box
+        area = cv2.contourArea(contour)
+        if area <= small_min_area:
+            continue
+        _, _, bw, bh = cv2.boundingRect(contour)
+        if max(bw, bh) > MAX_ASPECT * min(bw, bh) or area < MIN_EXTENT * bw * bh:
+            continue
+
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) != 4:
+            continue
+
+        corners = approx.reshape(4, 1, 2).astype(np.float32) / scale
+        if refine and scale < 1.0:
+            corners = refine_corners(gray, corners, scale)
+        corners += (offset_x, offset_y)
+        cards.append((area, np.round(corners).astype(np.int32)))
+
+    cards.sort(key=lambda card: card[0], reverse=True)
+    return [contour for _, contour in cards]
+
+class CardDetector:
+    """ Schnelle Kartenerkennung: sucht bevorzugt in einer ROI um die zuletzt gefundenen Karten """
+
+    def __init__(self, min_area=MIN_CARD_AREA, detect_width=DETECT_WIDTH, roi_margin=ROI_MARGIN, full_search_every=FULL_SEARCH_EVERY):
+        self.min_area = min_area
+        self.detect_width = detect_width
+        self.roi_margin = roi_margin
+        self.full_search_every = full_search_every
+        self.roi = None
+        self.frames_since_full = 0
+
+    def roi_around(self, contours, frame_shape):
+        """ Gemeinsame Bounding-Box aller Karten, um einen Rand erweitert und an den Frame geklemmt """
+        points = np.concatenate([contour.reshape(-1, 2) for contour in contours])
+        x, y, w, h = cv2.boundingRect(points)
+        mx, my = int(w * self.roi_margin), int(h * self.roi_margin)
+        height, width = frame_shape[:2]
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(width, x + w + mx), min(height, y + h + my)
+        return x0, y0, x1 - x0, y1 - y0
+
+    def detect(self, frame):
+        """ Alle Karten-Konturen im Frame, größte zuerst """
+        contours = []
+        if self.roi is not None and self.frames_since_full < self.full_search_every:
+            contours = find_card_contours(frame, self.min_area, self.roi, self.detect_width)
+            self.frames_since_full += 1
+
+        # Nichts in der ROI (oder Zeit für eine Vollsuche) -> ganzen Frame durchsuchen
+        if not contours:
+            contours = find_card_contours(frame, self.min_area, None, self.detect_width)
+            self.frames_since_full = 0
+
+        self.roi = self.roi_around(contours, frame.shape) if contours else None
+        return contours
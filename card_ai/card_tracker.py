@@ -0,0 +1,137 @@
+import time
+from collections import deque
+import cv2
+import numpy as np
+
+# Standardwerte für das Tracking
+IOU_THRESHOLD = 0.3  # Mindest-Überlappung der Bounding-Boxen, damit eine Kontur zur selben Karte gehört
+HASH_THRESHOLD = 10  # Ab so vielen unterschiedlichen Bits (von 64) gilt der Crop als verändert
+REFRESH_INTERVAL = 2.0  # Spätestens nach so vielen Sekunden wird eine Karte neu klassifiziert
+SMOOTH_WINDOW = 5  # Anzahl Vorhersagen, über die die Wahrscheinlichkeiten gemittelt werden
+MAX_MISSED = 5  # Nach so vielen Frames ohne Treffer wird eine Karte vergessen
+
+def crop_hash(crop):
+    """ Perceptual Hash (dHash, 64 Bit) eines Graustufen-Crops """
+    small = cv2.resize(crop, (9, 8), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+def hash_distance(a, b):
+    """ Anzahl unterschiedlicher Bits zweier Hashes """
+    return int(np.unpackbits(a ^ b).sum())
+
+def bbox_iou(a, b):
+    """ Intersection over Union zweier Bounding-Boxen (x, y, w, h) """
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = min(ax + aw, bx + bw) - max(ax, bx)
+    ih = min(ay + ah, by + bh) - max(ay, by)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return inter / float(aw * ah + bw * bh - inter)
+
+class Track:
+    """ Eine über mehrere Frames verfolgte Karte """
+
+    def __init__(self, track_id, contour, bbox, smooth_window):
+        self.id = track_id
+        self.contour = contour
+        self.bbox = bbox
+        self.hash = None
+        self.last_classified = 0.0
+        self.predictions = deque(maxlen=smooth_window)
+        self.missed = 0
+
+    def probabilities(self):
+        """ Über das Fenster geglättete Klassenwahrscheinlichkeiten """
+        return np.mean(self.predictions, axis=0)
+
+class CardTracker:
+    """ Verfolgt Karten über Frames (IoU der Bounding-Box) und klassifiziert nur bei Veränderung neu """
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, hash_threshold=HASH_THRESHOLD,
+                 refresh_interval=REFRESH_INTERVAL, smooth_window=SMOOTH_WINDOW, max_missed=MAX_MISSED):
+        self.iou_threshold = iou_threshold
+        self.hash_threshold = hash_threshold
+        self.refresh_interval = refresh_interval
+        self.smooth_window = smooth_window
+        self.max_missed = max_missed
+        self.tracks = []
+        self.next_id = 1
+
+        # Statistik: wie viele Karten-Detektionen tatsächlich das CNN gebraucht haben
+        self.detections = 0
+        self.classifications = 0
+
+    def match(self, bboxes):
+        """ Ordnet Konturen gierig (höchste IoU zuerst) bestehenden Tracks zu """
+        pairs = []
+        for i, bbox in enumerate(bboxes):
+            for track in self.tracks:
+                iou = bbox_iou(bbox, track.bbox)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, i, track))
+        pairs.sort(key=lambda pair: pair[0], reverse=True)
+
+        matches = {}
+        used = set()
+        for _, i, track in pairs:
+            if i in matches or track.id in used:
+                continue
+            matches[i] = track
+            used.add(track.id)
+        return matches
+
+    def update(self, contours, crops, classify_batch):
+        """ Aktualisiert die Tracks mit den Karten des aktuellen Frames.
+
+        crops sind die entzerrten Graustufen-Karten, classify_batch bekommt einen Stapel der Crops,
+        die neu klassifiziert werden müssen, und liefert deren Wahrscheinlichkeiten zurück.
+        Gibt die Tracks in der Reihenfolge der übergebenen Konturen zurück.
+        """
+        now = time.monotonic()
+        bboxes = [cv2.boundingRect(contour) for contour in contours]
+        matches = self.match(bboxes)
+
+        current = []
+        to_classify = []
+        for i, (contour, bbox, crop) in enumerate(zip(contours, bboxes, crops)):
+            track = matches.get(i)
+            if track is None:
+                track = Track(self.next_id, contour, bbox, self.smooth_window)
+                self.next_id += 1
+                self.tracks.append(track)
+            track.contour = contour
+            track.bbox = bbox
+            track.missed = 0
+
+            # Nur neu klassifizieren, wenn sich der Crop sichtbar verändert hat oder das Ergebnis zu alt ist
+            new_hash = crop_hash(crop)
+            changed = track.hash is None or hash_distance(new_hash, track.hash) > self.hash_threshold
+            stale = now - track.last_classified > self.refresh_interval
+            if changed or stale:
+                # Anderer Crop = womöglich andere Karte an derselben Stelle: alte Vorhersagen nicht mitteln,
+                # geglättet wird nur über Auffrischungen derselben Karte
+                if changed:
+                    track.predictions.clear()
+                to_classify.append(i)
+                track.hash = new_hash
+                track.last_classified = now
+            current.append(track)
+
+        if to_classify:
+            predictions = classify_batch(np.stack([crops[i] for i in to_classify]))
+            for i, prediction in zip(to_classify, predictions):
+                current[i].predictions.append(prediction)
+
+        self.detections += len(current)
+        self.classifications += len(to_classify)
+
+        # Nicht mehr gesehene Karten nach einigen Frames verwerfen
+        seen = {track.id for track in current}
+        for track in self.tracks:
+            if track.id not in seen:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        return current
@@ -0,0 +1,144 @@
+import math
+import numpy as np
+import tensorflow as tf
+from dataset_files import split_dataset, IMAGE_SIZE, VALIDATION_SPLIT
+
+# Augmentierung wie im ImageDataGenerator von train_model.py
+ROTATION_RANGE = 45  # Grad
+SHIFT_RANGE = 0.4  # Anteil der Bildbreite/-höhe
+ZOOM_RANGE = 0.5  # Zoom zwischen 1 - x und 1 + x
+SHEAR_RANGE = 0.3  # Grad (wie bei Keras)
+BRIGHTNESS_RANGE = (0.7, 1.3)
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+def decode_image(path, image_size=IMAGE_SIZE):
+    """ JPEG/PNG lesen, in Graustufen dekodieren und auf die Netzgröße skalieren (uint8) """
+    img = tf.io.decode_image(tf.io.read_file(path), channels=1, expand_animations=False)
+    img = tf.image.resize(img, image_size, method="nearest")
+    return tf.cast(img, tf.uint8)
+
+def random_affine(images):
+    """ Zufällige Rotation, Scherung, Zoom und Verschiebung für einen ganzen Batch auf einmal """
+    batch = tf.shape(images)[0]
+    height = tf.cast(tf.shape(images)[1], tf.float32)
+    width = tf.cast(tf.shape(images)[2], tf.float32)
+
+    def uniform(low, high):
+        return tf.random.uniform((batch,), low, high)
+
+    angle = uniform(-ROTATION_RANGE, ROTATION_RANGE) * (math.pi / 180)
+    shear = uniform(-SHEAR_RANGE, SHEAR_RANGE) * (math.pi / 180)
+    zoom_x = uniform(1 - ZOOM_RANGE, 1 + ZOOM_RANGE)
+    zoom_y = uniform(1 - ZOOM_RANGE, 1 + ZOOM_RANGE)
+    shift_x = uniform(-SHIFT_RANGE, SHIFT_RANGE) * width
+    shift_y = uniform(-SHIFT_RANGE, SHIFT_RANGE) * height
+
+    # Ausgabe-Pixel -> Eingabe-Pixel: A = Rotation @ Scherung @ Zoom, um die Bildmitte
+    cos, sin = tf.cos(angle), tf.sin(angle)
+    a00 = cos * zoom_x
+    a01 = (-cos * tf.sin(shear) - sin * tf.cos(shear)) * zoom_y
+    a10 = sin * zoom_x
+    a11 = (-sin * tf.sin(shear) + cos * tf.cos(shear)) * zoom_y
+    cx, cy = width / 2, height / 2
+    a02 = cx - a00 * cx - a01 * cy + shift_x
+    a12 = cy - a10 * cx - a11 * cy + shift_y
+    zeros = tf.zeros_like(a00)
+    transforms = tf.stack([a00, a01, a02, a10, a11, a12, zeros, zeros], axis=1)
+
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=tf.shape(images)[1:3],
+        fill_value=0.0,
+        interpolation="BILINEAR",
+        fill_mode="NEAREST",
+    )
+
+def augment(images, labels):
+    """ Vektorisierte Augmentierung eines float32-Batches (Werte 0-255) """
+    images = random_affine(images)
+
+    batch = tf.shape(images)[0]
+    brightness = tf.random.uniform((batch, 1, 1, 1), *BRIGHTNESS_RANGE)
+    images = tf.clip_by_value(images * brightness, 0.0, 255.0)
+
+    flip = tf.random.uniform((batch, 1, 1, 1)) < 0.5
+    images = tf.where(flip, tf.reverse(images, axis=[2]), images)
+    return images, labels
+
+def make_dataset(files, num_classes, batch_size, image_size=IMAGE_SIZE, training=False, cache=""):
+    """ Baut die tf.data-Pipeline: einmal dekodieren & cachen, dann mischen, batchen, augmentieren """
+    paths = [f for f, _ in files]
+    labels = [label for _, label in files]
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+    ds = ds.map(lambda path, label: (decode_image(path, image_size), tf.one_hot(label, num_classes)),
+                num_parallel_calls=AUTOTUNE)
+
+    # Dekodierte Bilder cachen ("" = im Speicher, sonst Datei auf der Platte)
+    if cache is not None:
+        ds = ds.cache(cache)
+
+    if training:
+        ds = ds.shuffle(len(paths), reshuffle_each_iteration=True)
+    return finish_batches(ds.batch(batch_size), training)
+
+def finish_batches(ds, training):
+    """ uint8-Batches -> float32, beim Training augmentieren, normalisieren und vorladen """
+    ds = ds.map(lambda images, labels: (tf.cast(images, tf.float32), labels), num_parallel_calls=AUTOTUNE)
+    if training:
+        ds = ds.map(augment, num_parallel_calls=AUTOTUNE)
+    ds = ds.map(lambda images, labels: (images * (1.0 / 255.0), labels), num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE)
+
+def make_pack_dataset(pack, indices, batch_size, training=False, image_size=None):
+    """ tf.data-Pipeline über ein memory-mapped Pack: Batches werden direkt aus der Datei geschnitten """
+    num_classes = len(pack.classes)
+    height, width = pack.images.shape[1:3]
+    resize = image_size is not None and tuple(image_size) != (height, width)
+
+    def gather(idx):
+        idx = np.sort(idx)  # aufsteigend lesen = sequentieller Zugriff auf die Datei
+        return pack.images[idx][..., np.newaxis], pack.labels[idx].astype(np.int32)
+
+    def load_batch(idx):
+        images, labels = tf.numpy_function(gather, [idx], [tf.uint8, tf.int32])
+        images.set_shape((None, height, width, 1))
+        labels.set_shape((None,))
+        if resize:
+            # Pack ist in 256x256 gespeichert, kleinere Netze bekommen flächengemittelt verkleinerte Bilder
+            images = tf.cast(tf.image.resize(images, image_size, method="area"), tf.uint8)
+        return images, tf.one_hot(labels, num_classes)
+
+    ds = tf.data.Dataset.from_tensor_slices(indices)
+    if training:
+        ds = ds.shuffle(len(indices), reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size).map(load_batch, num_parallel_calls=AUTOTUNE)
+    return finish_batches(ds, training)
+
+def build_pack_datasets(pack, batch_size, validation_split=VALIDATION_SPLIT, image_size=None):
+    """ Trainings- und Validierungs-Datasets samt class_indices aus einem Pack (siehe dataset_pack.py) """
+    train_idx, val_idx = pack.split(validation_split)
+    print(f"Found {len(train_idx)} images belonging to {len(pack.classes)} classes.")
+    print(f"Found {len(val_idx)} images belonging to {len(pack.classes)} classes.")
+
+    train_ds = make_pack_dataset(pack, train_idx, batch_size, training=True, image_size=image_size)
+    val_ds = make_pack_dataset(pack, val_idx, batch_size, training=False, image_size=image_size)
+    return train_ds, val_ds, pack.class_indices
+
+def build_datasets(dataset_dir, batch_size, image_size=IMAGE_SIZE, validation_split=VALIDATION_SPLIT, cache="", skip=None):
+    """ Trainings- und Validierungs-Datasets samt class_indices (wie bei flow_from_directory) """
+    classes, train_files, val_files = split_dataset(dataset_dir, validation_split, skip=skip)
+    num_classes = len(classes)
+    print(f"Found {len(train_files)} images belonging to {num_classes} classes.")
+    print(f"Found {len(val_files)} images belonging to {num_classes} classes.")
+
+    # Getrennte Cache-Dateien für Training und Validierung
+    train_cache = cache + ".train" if cache else cache
+    val_cache = cache + ".val" if cache else cache
+
+    train_ds = make_dataset(train_files, num_classes, batch_size, image_size, training=True, cache=train_cache)
+    val_ds = make_dataset(val_files, num_classes, batch_size, image_size, training=False, cache=val_cache)
+    class_indices = {card: i for i, card in enumerate(classes)}
+    return train_ds, val_ds, class_indices
@@ -0,0 +1,46 @@
+import hashlib
+import os
+
+# Dateilisten und Aufteilung der Datensätze, ohne TensorFlow: dataset_pack.py, export_model.py und
+# Werkzeuge, die nur Dateien brauchen, zahlen so keinen TF-Start. data_pipeline.py baut darauf auf.
+
+# Eingabegröße des Netzes (Graustufen)
+IMAGE_SIZE = (256, 256)
+
+# Anteil der Validierung (wie ImageDataGenerator(validation_split=0.2))
+VALIDATION_SPLIT = 0.2
+
+# Nur diese Dateien zählen als Bilder (.DS_Store, Manifeste usw. würden decode_image mitten in der Epoche abbrechen)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+def is_validation(key, validation_split=VALIDATION_SPLIT):
+    """ Stabile Zuordnung eines Bildes ("<klasse>/<datei>") zur Validierung über einen Hash des Namens
+
+    Anders als "die ersten 20% in Sortierreihenfolge" hängt das nur vom Bild selbst ab: neue Aufnahmen
+    verschieben keine alten Bilder zwischen Training und Validierung, ein inkrementelles Training wird
+    also auf denselben zurückgehaltenen Bildern bewertet wie das Basismodell.
+    """
+    digest = hashlib.md5(key.replace(os.sep, "/").encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") < validation_split * 2 ** 32
+
+def split_dataset(dataset_dir, validation_split=VALIDATION_SPLIT, classes=None, skip=None):
+    """ Teilt jede Klasse auf: etwa 20% Validierung (stabil per is_validation), der Rest Training
+
+    Ohne classes werden die Ordner alphabetisch nummeriert, sonst gilt deren Reihenfolge als Label
+    (z.B. die Klassen-Map eines Modells, das inkrementell um neue Klassen erweitert wurde).
+    skip enthält Schlüssel "<klasse>/<datei>", die vor dem Aufteilen wegfallen (Duplikate aus dedup_index.py).
+    Dateien ohne Bild-Endung (IMAGE_EXTENSIONS) werden ignoriert.
+    """
+    if classes is None:
+        classes = sorted(d for d in os.listdir(dataset_dir) if os.path.isdir(os.path.join(dataset_dir, d)))
+    train_files, val_files = [], []
+    for label, card in enumerate(classes):
+        card_path = os.path.join(dataset_dir, card)
+        if not os.path.isdir(card_path):
+            continue
+        for f in sorted(os.listdir(card_path)):
+            if not f.lower().endswith(IMAGE_EXTENSIONS) or (skip and f"{card}/{f}" in skip):
+                continue
+            target = val_files if is_validation(f"{card}/{f}", validation_split) else train_files
+            target.append((os.path.join(card_path, f), label))
+    return classes, train_files, val_files
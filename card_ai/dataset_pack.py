@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import argparse
+import cv2
+import numpy as np
+from multiprocessing import Pool
+from dataset_files import split_dataset, is_validation, IMAGE_SIZE, VALIDATION_SPLIT
+from enhance_images import BatchEnhancer
+from dedup_index import duplicate_filter
+
+# Basisverzeichnis korrekt setzen
+BASE_DATASET_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "datasets"))
+
+# Ordnernamen der Quell-Datensätze ('warped' = entzerrte Karten aus warp_dataset.py)
+DATASET_DIRS = {"raw": "raw", "processed": "processed_dataset", "warped": "warped"}
+
+# Standard-Ablage für Packs
+PACKS_DIR = os.path.join(BASE_DATASET_PATH, "packs")
+
+# Stapelgröße für --enhance (BatchEnhancer-Puffer)
+ENHANCE_BATCH = 64
+
+# Debug-Modus (0 = aus, 1 = an)
+DEBUG = 1
+
+def log(msg):
+    """ Debug-Logger für schnelle Prints """
+    if DEBUG:
+        print(f"[LOG] {msg}")
+
+def pack_paths(pack_path):
+    """ Ein Pack besteht aus drei Dateien: Bilder (.images.npy), Labels (.labels.npy) und Index (.json) """
+    base = pack_path[:-len(".json")] if pack_path.endswith(".json") else pack_path
+    return base + ".images.npy", base + ".labels.npy", base + ".json"
+
+def load_and_resize(path, image_size=IMAGE_SIZE):
+    """ Lädt ein Bild als Graustufen und skaliert es auf die Netzgröße """
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    return cv2.resize(img, image_size, interpolation=cv2.INTER_AREA)
+
+def enhance_pack(images, count, image_size=IMAGE_SIZE, batch_size=ENHANCE_BATCH):
+    """ Wendet CLAHE + Schärfen stapelweise direkt auf die gepackten Bilder an """
+    enhancer = BatchEnhancer(batch_size, image_size)
+    for start in range(0, count, batch_size):
+        end = min(start + batch_size, count)
+        images[start:end] = enhancer.enhance(images[start:end])
+
+def pack_dataset(dataset_dir, pack_path, image_size=IMAGE_SIZE, workers=None, enhance=False, dedup=False):
+    """ Wandelt einen Klassenordner-Baum in ein zusammenhängendes uint8-Array plus Label-Index um """
+    images_path, labels_path, index_path = pack_paths(pack_path)
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+
+    skip = duplicate_filter(dataset_dir) if dedup else None
+    classes, files, _ = split_dataset(dataset_dir, validation_split=0, skip=skip)
+    log(f"📦 Packe {len(files)} Bilder aus {len(classes)} Klassen nach {images_path}")
+
+    start = time.perf_counter()
+    images = np.lib.format.open_memmap(images_path, mode="w+", dtype=np.uint8,
+                                       shape=(len(files), image_size[1], image_size[0]))
+    labels = np.zeros(len(files), dtype=np.int32)
+    kept = []
+
+    with Pool(workers) as pool:
+        decoded = pool.imap(load_and_resize, [path for path, _ in files], chunksize=16)
+        for (path, label), img in zip(files, decoded):
+            if img is None:
+                log(f"❌ Fehler beim Laden: {path}")
+                continue
+            images[len(kept)] = img
+            labels[len(kept)] = label
+            kept.append(os.path.relpath(path, dataset_dir))
+
+    if enhance:
+        enhance_pack(images, len(kept), image_size)
+
+    images.flush()
+    del images
+
+    # Fehlerhafte Bilder wurden übersprungen -> Datei auf die tatsächliche Anzahl kürzen
+    if len(kept) < len(files):
+        full = np.load(images_path, mmap_mode="r")
+        np.save(images_path + ".tmp.npy", full[:len(kept)])
+        del full
+        os.replace(images_path + ".tmp.npy", images_path)
+
+    np.save(labels_path, labels[:len(kept)])
+    with open(index_path, "w") as f:
+        json.dump({
+            "classes": classes,
+            "image_size": list(image_size),
+            "count": len(kept),
+            "enhanced": enhance,
+            "dedup": dedup,
+            "files": kept,
+        }, f)
+
+    log(f"✅ Pack erstellt in {time.perf_counter() - start:.1f}s: {index_path}")
+    return index_path
+
+class PackedDataset:
+    """ Memory-mapped Zugriff auf ein Pack: Bilder werden nicht kopiert, sondern direkt aus der Datei gelesen """
+
+    def __init__(self, pack_path):
+        images_path, labels_path, index_path = pack_paths(pack_path)
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"❌ Kein Pack gefunden unter: {index_path} \nBitte zuerst 'dataset_pack.py pack' ausführen!")
+
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        self.classes = index["classes"]
+        self.image_size = tuple(index["image_size"])
+        self.files = index["files"]
+        self.images = np.load(images_path, mmap_mode="r")  # (N, H, W) uint8, zero-copy
+        self.labels = np.load(labels_path)
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def class_indices(self):
+        return {card: i for i, card in enumerate(self.classes)}
+
+    def split(self, validation_split=VALIDATION_SPLIT):
+        """ Gleiche Aufteilung wie split_dataset: files enthält dieselben Schlüssel "<klasse>/<datei>" """
+        val = np.array([is_validation(key, validation_split) for key in self.files], dtype=bool)
+        return np.flatnonzero(~val), np.flatnonzero(val)
+
+def benchmark(dataset_dir, pack_path, runs=3):
+    """ Vergleicht einen kompletten Lesedurchlauf: Einzel-JPEGs dekodieren vs. Pack memory-mappen """
+    _, files, _ = split_dataset(dataset_dir, validation_split=0)
+
+    def read_folder():
+        total = 0
+        for path, _ in files:
+            img = load_and_resize(path)
+            if img is not None:
+                total += int(img[0, 0])
+        return total
+
+    def read_pack():
+        pack = PackedDataset(pack_path)
+        total = 0
+        for i in range(len(pack)):
+            total += int(pack.images[i][0, 0])
+        pack.images[:].sum()  # alle Seiten tatsächlich anfassen
+        return total
+
+    for name, fn in (("Ordner (JPEG)", read_folder), ("Pack (mmap)", read_pack)):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        print(f"📊 {name:<15} {len(files)} Bilder: {min(timings):.3f}s ({len(files) / min(timings):.0f} Bilder/s)")
+
+def main(argv=None):
+    """ Einstiegspunkt für die Kommandozeile und run_pipeline.py """
+    parser = argparse.ArgumentParser(description="Packt Klassenordner in ein memory-mapped uint8-Array")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pack_parser = sub.add_parser("pack", help="Pack aus einem Klassenordner-Baum erstellen")
+    pack_parser.add_argument("--dataset", type=str, choices=sorted(DATASET_DIRS), default="raw", help="Quell-Datensatz")
+    pack_parser.add_argument("--output", type=str, help="Pfad des Packs (Standard: datasets/packs/<dataset>)")
+    pack_parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse zum Dekodieren (Standard: alle Kerne)")
+    pack_parser.add_argument("--enhance", action="store_true", help="CLAHE + Schärfen (BatchEnhancer) beim Packen anwenden, statt vorher enhance_images.py laufen zu lassen")
+    pack_parser.add_argument("--dedup", action="store_true", help="Fast identische Aufnahmen (dedup_index.py) nicht mit einpacken")
+
+    bench_parser = sub.add_parser("bench", help="Lesegeschwindigkeit Ordner vs. Pack vergleichen")
+    bench_parser.add_argument("--dataset", type=str, choices=sorted(DATASET_DIRS), default="raw", help="Quell-Datensatz")
+    bench_parser.add_argument("--pack", type=str, help="Pfad des Packs (Standard: datasets/packs/<dataset>)")
+    bench_parser.add_argument("--runs", type=int, default=3, help="Wiederholungen, der schnellste Lauf zählt")
+    args = parser.parse_args(argv)
+
+    dataset_dir = os.path.join(BASE_DATASET_PATH, DATASET_DIRS[args.dataset])
+    if not os.path.exists(dataset_dir):
+        raise FileNotFoundError(f"❌ Der Dataset-Ordner '{dataset_dir}' wurde nicht gefunden!")
+
+    if args.command == "pack":
+        pack_dataset(dataset_dir, args.output or os.path.join(PACKS_DIR, args.dataset), workers=args.workers, enhance=args.enhance, dedup=args.dedup)
+    else:
+        benchmark(dataset_dir, args.pack or os.path.join(PACKS_DIR, args.dataset), args.runs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import cv2
+import numpy as np
+from multiprocessing import Pool
+
+# Basisverzeichnis korrekt setzen
+BASE_DATASET_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "datasets"))
+
+# Ordnernamen der Datensätze ('warped' = entzerrte Karten aus warp_dataset.py)
+DATASET_DIRS = {"raw": "raw", "processed": "processed_dataset", "warped": "warped"}
+
+# Index liegt neben den Datensätzen unter .dedup/<ordner>.json, nicht im Klassenbaum - dort würde ihn jeder,
+# der die Einträge für Klassenordner hält (z.B. benchmark.sample_frames), mitlesen.
+# Schlüssel "<klasse>/<datei>" wie in den Manifesten.
+INDEX_DIR = ".dedup"
+
+# Frühere Ablage im Datensatz-Ordner, wird beim ersten Laden verschoben
+LEGACY_INDEX_NAME = ".dedup_index.json"
+
+# Aussortierte Duplikate landen hier (gleiche Klassenordner), statt gelöscht zu werden
+DUPLICATES_DIR = os.path.join(BASE_DATASET_PATH, "duplicates")
+
+# Perceptual Hash: 32x32-Graubild -> DCT -> die 8x8 niedrigsten Frequenzen über/unter dem Median = 64 Bit.
+# Version erhöhen, wenn sich die Berechnung ändert, dann werden alle Hashes neu berechnet.
+HASH_VERSION = 1
+HASH_SIZE = 32
+HASH_BLOCK = 8
+
+# Zwei Bilder gelten als fast identisch, wenn sich ihre Hashes in höchstens so vielen Bits unterscheiden
+MAX_DISTANCE = 8
+
+# Bilder pro Gruppe, die behalten werden (gleichmäßig über die Aufnahme-Reihenfolge verteilt)
+KEEP_PER_GROUP = 1
+
+# Batch-Modus: Anzahl Prozesse (None = alle Kerne) und Bilder pro Arbeitspaket
+DEFAULT_WORKERS = None
+DEFAULT_CHUNKSIZE = 32
+
+# Debug-Modus (0 = aus, 1 = an)
+DEBUG = 1
+
+def log(msg):
+    """ Debug-Logger für schnelle Prints """
+    if DEBUG:
+        print(f"[LOG] {msg}")
+
+def params_hash():
+    """ Hash über alles, was den Perceptual Hash beeinflusst - ändert er sich, wird alles neu berechnet """
+    params = {"version": HASH_VERSION, "size": HASH_SIZE, "block": HASH_BLOCK}
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def perceptual_hash(gray):
+    """ 64-Bit-pHash eines Graubilds als Integer (robust gegen Rauschen, Helligkeit und leichte Verschiebung) """
+    small = cv2.resize(gray, (HASH_SIZE, HASH_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:HASH_BLOCK, :HASH_BLOCK].flatten()
+    bits = low > np.median(low[1:])  # Gleichanteil (DC) bestimmt nur die Helligkeit, nicht den Median
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hash_single_image(job):
+    """ Hash einer Datei (läuft im Worker-Prozess); JPEGs werden direkt auf 1/4 verkleinert dekodiert """
+    key, img_path = job
+    gray = cv2.imread(img_path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        log(f"❌ Fehler beim Laden: {img_path}")
+        return key, None
+    return key, f"{perceptual_hash(gray):016x}"
+
+def index_path(dataset_dir):
+    dataset_dir = os.path.abspath(dataset_dir)
+    return os.path.join(os.path.dirname(dataset_dir), INDEX_DIR, os.path.basename(dataset_dir) + ".json")
+
+def load_index(dataset_dir):
+    """ Lädt die gespeicherten Hashes; bei anderer Hash-Version oder kaputter Datei wird neu begonnen """
+    path = index_path(dataset_dir)
+    legacy_path = os.path.join(dataset_dir, LEGACY_INDEX_NAME)
+    if os.path.exists(legacy_path) and not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(legacy_path, path)
+        log(f"📦 Dedup-Index aus dem Datensatz-Ordner verschoben nach: {path}")
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        log("⚠️ Dedup-Index nicht lesbar, berechne alles neu")
+        return {}
+    if index.get("params_hash") != params_hash():
+        log("🔄 Hash-Parameter haben sich geändert, berechne alles neu")
+        return {}
+    return index.get("files", {})
+
+def save_index(dataset_dir, files):
+    """ Schreibt den Index atomar (erst temporäre Datei, dann umbenennen) """
+    path = index_path(dataset_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"params_hash": params_hash(), "files": files}, f)
+    os.replace(tmp_path, path)
+
+def update_index(dataset_dir, workers=DEFAULT_WORKERS, chunksize=DEFAULT_CHUNKSIZE):
+    """ Hasht nur neue oder geänderte Bilder (mtime/Größe), entfernt gelöschte, gibt {Schlüssel: Eintrag} zurück """
+    files = load_index(dataset_dir)
+    jobs, current = [], {}
+    for card in sorted(os.listdir(dataset_dir)):
+        card_path = os.path.join(dataset_dir, card)
+        if not os.path.isdir(card_path):
+            continue
+        for img_file in sorted(os.listdir(card_path)):
+            img_path = os.path.join(card_path, img_file)
+            key = f"{card}/{img_file}"
+            stat = os.stat(img_path)
+            entry = files.get(key)
+            if entry is not None and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                current[key] = entry
+            else:
+                current[key] = {"mtime": stat.st_mtime, "size": stat.st_size, "hash": None}
+                jobs.append((key, img_path))
+
+    if jobs:
+        start = time.perf_counter()
+        pool = Pool(workers) if workers != 1 and len(jobs) > 1 else None
+        try:
+            results = pool.imap_unordered(hash_single_image, jobs, chunksize) if pool else map(hash_single_image, jobs)
+            for key, value in results:
+                current[key]["hash"] = value
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        log(f"⏱️ {len(jobs)} Bilder in {time.perf_counter() - start:.1f}s gehasht, {len(current) - len(jobs)} aus dem Index")
+
+    if jobs or len(current) != len(files):
+        save_index(dataset_dir, current)
+    return current
+
+def hamming(hashes, value):
+    """ Bit-Abstand eines Hashs zu allen Hashes eines uint64-Arrays (Popcount über unpackbits, läuft auch mit NumPy 1.x) """
+    diff = (hashes ^ np.uint64(value)).view(np.uint8)
+    return np.unpackbits(diff).reshape(len(hashes), 64).sum(axis=1)
+
+def group_duplicates(files, max_distance=MAX_DISTANCE):
+    """ Gruppiert fast identische Bilder innerhalb jeder Klasse: {Klasse: [[Schlüssel, ...], ...]}
+
+    Gierig in Aufnahme-Reihenfolge: ein Bild kommt in die nächstgelegene Gruppe, wenn deren erstes Bild
+    höchstens max_distance Bits entfernt ist, sonst eröffnet es eine neue Gruppe. Bilder ohne Hash
+    (nicht lesbar) bilden eigene Gruppen, damit sie nicht stillschweigend verschwinden.
+    """
+    by_class = {}
+    for key in sorted(files):
+        by_class.setdefault(key.split("/", 1)[0], []).append(key)
+
+    groups = {}
+    for card, keys in by_class.items():
+        leaders = np.empty(len(keys), dtype=np.uint64)  # Hash des ersten Bilds jeder Gruppe in hashed
+        card_groups, hashed = [], []
+        for key in keys:
+            value = files[key]["hash"]
+            if value is None:
+                card_groups.append([key])
+                continue
+            value = int(value, 16)
+            if hashed:
+                distances = hamming(leaders[:len(hashed)], value)
+                nearest = int(np.argmin(distances))
+                if distances[nearest] <= max_distance:
+                    hashed[nearest].append(key)
+                    continue
+            group = [key]
+            leaders[len(hashed)] = value
+            hashed.append(group)
+            card_groups.append(group)
+        groups[card] = card_groups
+    return groups
+
+def select_keep(group, keep=KEEP_PER_GROUP):
+    """ Behält keep Bilder einer Gruppe, gleichmäßig verteilt (erstes Bild immer dabei) """
+    if keep < 1:
+        raise ValueError(f"❌ Pro Gruppe muss mindestens ein Bild erhalten bleiben (keep={keep})!")
+    if len(group) <= keep:
+        return list(group)
+    step = len(group) / keep
+    return [group[int(i * step)] for i in range(keep)]
+
+def duplicates(groups, keep=KEEP_PER_GROUP):
+    """ Schlüssel aller Bilder, die beim Filtern wegfallen """
+    dropped = set()
+    for card_groups in groups.values():
+        for group in card_groups:
+            dropped.update(set(group) - set(select_keep(group, keep)))
+    return dropped
+
+def duplicate_filter(dataset_dir, max_distance=MAX_DISTANCE, keep=KEEP_PER_GROUP):
+    """ Index aktualisieren und die Menge der zu überspringenden Schlüssel liefern (für Training und Vorverarbeitung) """
+    files = update_index(dataset_dir)
+    dropped = duplicates(group_duplicates(files, max_distance), keep)
+    log(f"🧹 Dedup: {len(dropped)} von {len(files)} Bildern sind fast identisch und werden übersprungen")
+    return dropped
+
+def report(dataset_dir, max_distance=MAX_DISTANCE, keep=KEEP_PER_GROUP):
+    """ Übersicht pro Klasse: Bilder, Gruppen, Duplikate und die größte Gruppe """
+    files = update_index(dataset_dir)
+    groups = group_duplicates(files, max_distance)
+    dropped = duplicates(groups, keep)
+
+    print(f"\n{'Klasse':<20}{'Bilder':>8}{'Gruppen':>9}{'Duplikate':>11}{'Größte Gruppe':>15}")
+    for card, card_groups in groups.items():
+        count = sum(len(group) for group in card_groups)
+        card_dropped = sum(1 for group in card_groups for key in group if key in dropped)
+        print(f"{card:<20}{count:>8}{len(card_groups):>9}{card_dropped:>11}{max(len(group) for group in card_groups):>15}")
+    total_groups = sum(len(card_groups) for card_groups in groups.values())
+    print(f"\n📊 {len(files)} Bilder, {total_groups} Gruppen (max. {max_distance} Bit Abstand), "
+          f"{len(dropped)} Duplikate ({len(dropped) / max(len(files), 1):.1%}) bei {keep} pro Gruppe")
+    return groups, dropped
+
+def prune(dataset_dir, dataset, max_distance=MAX_DISTANCE, keep=KEEP_PER_GROUP, delete=False, dry_run=False):
+    """ Verschiebt Duplikate nach datasets/duplicates/<datensatz>/ (oder löscht sie mit delete=True) """
+    _, dropped = report(dataset_dir, max_distance, keep)
+    if dry_run or not dropped:
+        print("ℹ️ Nichts verändert" + (" (--dry-run)" if dry_run and dropped else ""))
+        return dropped
+
+    target_dir = os.path.join(DUPLICATES_DIR, dataset)
+    for key in sorted(dropped):
+        path = os.path.join(dataset_dir, key)
+        if delete:
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(os.path.join(target_dir, key)), exist_ok=True)
+            shutil.move(path, os.path.join(target_dir, key))
+    update_index(dataset_dir)
+    print(f"✅ {len(dropped)} Duplikate " + ("gelöscht" if delete else f"verschoben nach: {target_dir}"))
+    return dropped
+
+def main(argv=None):
+    """ Einstiegspunkt für die Kommandozeile und run_pipeline.py """
+    parser = argparse.ArgumentParser(description="Perceptual-Hash-Index über einen Datensatz: fast identische Aufnahmen finden und aussortieren")
+    parser.add_argument("command", choices=["report", "prune"], nargs="?", default="report", help="'report' = Übersicht (aktualisiert den Index), 'prune' = Duplikate aussortieren")
+    parser.add_argument("--dataset", type=str, choices=sorted(DATASET_DIRS), default="raw", help="Datensatz, der indiziert wird")
+    parser.add_argument("--max-distance", type=int, default=MAX_DISTANCE, help="Maximaler Bit-Abstand (von 64), ab dem zwei Bilder als verschieden gelten")
+    parser.add_argument("--keep", type=int, default=KEEP_PER_GROUP, help="Bilder pro Gruppe, die behalten werden")
+    parser.add_argument("--delete", action="store_true", help="Duplikate bei 'prune' löschen statt nach datasets/duplicates/ zu verschieben")
+    parser.add_argument("--dry-run", action="store_true", help="Bei 'prune' nur anzeigen, nichts verändern")
+    args = parser.parse_args(argv)
+    if args.keep < 1:
+        parser.error("--keep muss mindestens 1 sein (sonst verschwinden alle Bilder einer Gruppe)")
+    if not 0 <= args.max_distance <= 64:
+        parser.error("--max-distance muss zwischen 0 und 64 liegen")
+
+    dataset_dir = os.path.join(BASE_DATASET_PATH, DATASET_DIRS[args.dataset])
+    if not os.path.exists(dataset_dir):
+        raise FileNotFoundError(f"❌ Der Dataset-Ordner '{dataset_dir}' wurde nicht gefunden!")
+
+    if args.command == "prune":
+        prune(dataset_dir, args.dataset, args.max_distance, args.keep, args.delete, args.dry_run)
+    else:
+        report(dataset_dir, args.max_distance, args.keep)
+
+if __name__ == "__main__":
+    main()
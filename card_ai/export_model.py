@@ -0,0 +1,148 @@
+import os
+import time
+import argparse
+import cv2
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+from inference_engine import load_engine, load_class_map, save_class_map, check_class_map, MODEL_VARIANTS, MODEL_PATH, INPUT_SIZE
+from dataset_files import split_dataset
+
+# Basisverzeichnis korrekt setzen
+BASE_DATASET_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "datasets"))
+
+# Anzahl Bilder für die INT8-Kalibrierung (aus dem Trainingsanteil, über alle Klassen verteilt)
+CALIBRATION_SAMPLES = 200
+
+# Wiederholungen für die Latenzmessung (Batch-Größe 1)
+LATENCY_RUNS = 50
+
+def load_image(path, image_size=INPUT_SIZE):
+    """ Lädt ein Bild so, wie das Modell es sieht: Graustufen, 256x256 (bzw. image_size) """
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    return cv2.resize(img, image_size, interpolation=cv2.INTER_AREA)
+
+def representative_dataset(train_files, num_samples, image_size=INPUT_SIZE):
+    """ Liefert Kalibrierungsbilder für die INT8-Quantisierung, gleichmäßig über die Klassen verteilt """
+    by_label = {}
+    for i, (_, label) in enumerate(train_files):
+        by_label.setdefault(label, []).append(i)
+
+    # Pro Klasse num_samples // Klassen Bilder (mindestens eins), kleine Klassen komplett
+    rng = np.random.default_rng(0)
+    per_class = max(1, num_samples // max(1, len(by_label)))
+    picks = []
+    for label in sorted(by_label):
+        indices = by_label[label]
+        picks += rng.choice(indices, size=min(per_class, len(indices)), replace=False).tolist()
+
+    def generator():
+        for i in picks:
+            img = load_image(train_files[i][0], image_size)
+            if img is None:
+                continue
+            yield [img[np.newaxis, ..., np.newaxis].astype(np.float32) / 255.0]
+    return generator
+
+def export_float16(model, path):
+    """ Gewichte als float16 speichern (halbe Größe, Berechnung weiterhin float32) """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+def export_int8(model, path, calibration):
+    """ Full-Integer-Quantisierung: Gewichte, Aktivierungen sowie Ein- und Ausgabe als int8 """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = calibration
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+def evaluate(engine, val_files, runs=LATENCY_RUNS):
+    """ Misst Validierungsgenauigkeit und Latenz pro Bild (Batch-Größe 1, CPU) """
+    correct = 0
+    total = 0
+    sample = None
+    for path, label in val_files:
+        img = load_image(path)
+        if img is None:
+            continue
+        sample = img
+        correct += int(np.argmax(engine.predict_one(img)) == label)
+        total += 1
+
+    if sample is None:
+        sample = np.zeros(INPUT_SIZE, dtype=np.uint8)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        engine.predict_one(sample)
+        timings.append(time.perf_counter() - start)
+
+    accuracy = correct / total if total else float("nan")
+    return accuracy, float(np.median(timings)) * 1000
+
+def export_models(dataset_dir, model_path=MODEL_PATH, calibration_samples=CALIBRATION_SAMPLES, runs=LATENCY_RUNS):
+    """ Exportiert float16- und INT8-Varianten und vergleicht sie mit dem float32-Modell """
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"❌ Modell nicht gefunden unter: {model_path} \nBitte trainiere das Modell zuerst!")
+
+    # Labels in der Ausgabe-Reihenfolge des Modells (nach --incremental nicht mehr alphabetisch)
+    class_map = load_class_map(model_path)
+    classes, train_files, val_files = split_dataset(dataset_dir, classes=class_map["classes"] if class_map else None)
+    print(f"🔍 {len(classes)} Klassen, {len(train_files)} Trainings- und {len(val_files)} Validierungsbilder")
+
+    model = load_model(model_path)
+
+    print("\n🛠 Exportiere float16-Variante ...")
+    export_float16(model, MODEL_VARIANTS["float16"])
+
+    print(f"🛠 Exportiere INT8-Variante (Kalibrierung mit {calibration_samples} Bildern) ...")
+    image_size = (int(model.input_shape[2]), int(model.input_shape[1]))  # Kalibrierung in der Eingabegröße des Modells
+    export_int8(model, MODEL_VARIANTS["int8"], representative_dataset(train_files, calibration_samples, image_size))
+
+    # Quantisierte Varianten bekommen dieselbe Klassen-Map wie das Ausgangsmodell
+    if class_map:
+        for variant in ("float16", "int8"):
+            save_class_map(MODEL_VARIANTS[variant], **class_map)
+
+    rows = []
+    for variant in ("float32", "float16", "int8"):
+        path = model_path if variant == "float32" else MODEL_VARIANTS[variant]
+        engine = load_engine(path)
+        if class_map:
+            check_class_map(load_class_map(path), engine, path)
+        accuracy, latency_ms = evaluate(engine, val_files, runs)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        rows.append((variant, size_mb, latency_ms, accuracy))
+
+    print(f"\n{'Variante':<10}{'Größe (MB)':>12}{'Latenz (ms)':>14}{'Val-Genauigkeit':>18}")
+    for variant, size_mb, latency_ms, accuracy in rows:
+        print(f"{variant:<10}{size_mb:>12.2f}{latency_ms:>14.2f}{accuracy:>18.2%}")
+    print("\n✅ Exportierte Modelle liegen unter:", os.path.dirname(MODEL_VARIANTS["int8"]))
+    return rows
+
+def main(argv=None):
+    """ Einstiegspunkt für die Kommandozeile und run_pipeline.py """
+    parser = argparse.ArgumentParser(description="Exportiert quantisierte Varianten (float16/INT8) des Kartenmodells")
+    parser.add_argument("--dataset", type=str, choices=["raw", "processed", "warped"], default="raw", help="Datensatz für Kalibrierung und Validierung ('warped' = entzerrte Karten wie im Live-Betrieb)")
+    parser.add_argument("--model", type=str, default=MODEL_PATH, help="Pfad zum trainierten Keras-Modell")
+    parser.add_argument("--calibration-samples", type=int, default=CALIBRATION_SAMPLES, help="Anzahl Bilder für die INT8-Kalibrierung")
+    parser.add_argument("--runs", type=int, default=LATENCY_RUNS, help="Wiederholungen für die Latenzmessung")
+    args = parser.parse_args(argv)
+
+    dataset_dir = os.path.join(BASE_DATASET_PATH, {"processed": "processed_dataset"}.get(args.dataset, args.dataset))
+    if not os.path.exists(dataset_dir):
+        raise FileNotFoundError(f"❌ Der Dataset-Ordner '{dataset_dir}' wurde nicht gefunden!")
+
+    export_models(dataset_dir, args.model, args.calibration_samples, args.runs)
+
+if __name__ == "__main__":
+    main()
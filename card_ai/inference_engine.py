@@ -0,0 +1,267 @@
+import os
+import json
+import hashlib
+import cv2
+import numpy as np
+
+# TensorFlow wird erst beim Laden eines Modells importiert: Menüs, --help und
+# "Modell nicht gefunden" kommen so ohne mehrere Sekunden TF-Startzeit aus.
+
+# Basisverzeichnis bestimmen
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Standard-Pfad für das Modell (überschreibbar mit der Umgebungsvariable CARD_MODEL_PATH, wie in train_model.py)
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+MODEL_PATH = os.getenv("CARD_MODEL_PATH", os.path.join(MODELS_DIR, "card_model.h5"))
+
+# Quantisierte Varianten (werden von export_model.py erzeugt)
+MODEL_VARIANTS = {
+    "float32": MODEL_PATH,
+    "float16": os.path.join(MODELS_DIR, "card_model_float16.tflite"),
+    "int8": os.path.join(MODELS_DIR, "card_model_int8.tflite"),
+}
+
+# Eingabegröße des Netzes (Graustufen)
+INPUT_SIZE = (256, 256)
+
+# uint8 -> [0, 1] als float32-Skalar, damit NumPy nicht über float64 rechnet
+PIXEL_SCALE = np.float32(1.0 / 255.0)
+
+# Version der Klassen-Map: ab 2 ein vollständiges Modell-Manifest (Eingabeform, Vorverarbeitung, Modell-Hash)
+CLASS_MAP_VERSION = 2
+
+# Vorverarbeitung fürs Manifest: Graustufen-Crop in INPUT_SIZE, Pixel * pixel_scale. "resize" ist die
+# Interpolation, mit der der Trainings-Loader auf die Netzgröße skaliert hat (siehe preprocessing_params)
+PREPROCESSING = {"color": "gray", "crop_size": list(INPUT_SIZE), "resize": "area", "pixel_scale": 1.0 / 255.0}
+
+# Werte für "resize": so hat der Trainings-Loader auf die Netzgröße skaliert, die Engine macht es genauso
+RESIZE_METHODS = ("nearest", "area")
+
+# Felder, die save_class_map selbst berechnet (beim Kopieren einer Map für eine andere Modelldatei neu bestimmt)
+DERIVED_KEYS = ("version", "input_shape", "model_sha256")
+
+def class_map_path(model_path):
+    """ Klassen-Map liegt neben dem Modell: card_model.h5 -> card_model.classes.json """
+    return os.path.splitext(model_path)[0] + ".classes.json"
+
+def model_hash(model_path):
+    """ SHA-256 der Modelldatei (in 1-MB-Blöcken gelesen) """
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def preprocessing_params(resize):
+    """ Vorverarbeitung fürs Manifest mit der Interpolation, die der Trainings-Loader benutzt hat ('nearest'/'area') """
+    return dict(PREPROCESSING, resize=resize)
+
+def save_class_map(model_path, classes, **info):
+    """ Speichert das Modell-Manifest: Klassen in Ausgabe-Reihenfolge, Eingabeform, Vorverarbeitung, Hash und
+    Trainings-Infos (Zeit, Genauigkeit, ...). Muss nach dem Speichern des Modells aufgerufen werden.
+    Ohne preprocessing (preprocessing_params) wird PREPROCESSING eingetragen.
+    """
+    info = {key: value for key, value in info.items() if key not in DERIVED_KEYS}
+    info.setdefault("preprocessing", PREPROCESSING)
+    manifest = dict(info, version=CLASS_MAP_VERSION, classes=list(classes), model_sha256=model_hash(model_path))
+    if info.get("input_size"):
+        manifest["input_shape"] = [info["input_size"], info["input_size"], 1]
+    path = class_map_path(model_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_class_map(model_path):
+    """ Klassen-Map eines Modells als Dict (Schlüssel 'classes' = Namen in Ausgabe-Reihenfolge) oder None """
+    path = class_map_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+def require_class_map(model_path):
+    """ Wie load_class_map, aber ohne Klassen-Map gibt es einen Fehler statt eines Datensatz-Scans """
+    class_map = load_class_map(model_path)
+    if class_map is None:
+        raise FileNotFoundError(f"❌ Keine Klassen-Map gefunden unter: {class_map_path(model_path)} \n"
+                                f"Bitte trainiere das Modell neu oder gib den Datensatz mit --dataset an!")
+    return class_map
+
+def check_class_map(class_map, engine, model_path=None):
+    """ Prüft, ob die Klassen-Map zum geladenen Modell passt (Ausgabegröße, Eingabeform, Hash der Modelldatei),
+    und stellt die Engine auf deren Vorverarbeitung ein (Interpolation, Pixel-Skalierung)
+
+    Ältere Maps ohne Eingabeform/Hash werden nur gegen die Ausgabegröße geprüft.
+    """
+    classes = class_map["classes"]
+    if len(classes) != engine.num_classes:
+        raise ValueError(f"❌ Das Modell hat {engine.num_classes} Ausgaben, die Klassen-Map aber {len(classes)} Klassen!")
+    input_shape = class_map.get("input_shape")
+    if input_shape and tuple(input_shape) != tuple(engine.input_shape):
+        raise ValueError(f"❌ Eingabeform des Modells {tuple(engine.input_shape)} passt nicht zur Klassen-Map {tuple(input_shape)}!")
+    if model_path and class_map.get("model_sha256") and model_hash(model_path) != class_map["model_sha256"]:
+        raise ValueError(f"❌ {model_path} wurde nach dem Training ersetzt, die Klassen-Map gehört zu einem anderen Modell!")
+    if class_map.get("preprocessing"):
+        engine.configure(class_map["preprocessing"])
+
+class InferenceEngine:
+    """ Schlanker Inferenz-Pfad: einmal getracte tf.function statt model.predict pro Frame """
+
+    # Vorverarbeitung ohne Manifest (ältere Modelle), configure() übernimmt die Werte aus der Klassen-Map
+    resize_method = PREPROCESSING["resize"]
+    pixel_scale = PIXEL_SCALE
+
+    def __init__(self, model_path=MODEL_PATH, warmup=True):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"❌ Modell nicht gefunden unter: {model_path} \nBitte trainiere das Modell zuerst!")
+
+        import tensorflow as tf
+        from tensorflow.keras.models import load_model
+
+        print(f"📂 Lade Modell aus: {model_path}")
+        self.model = load_model(model_path)
+        self.input_shape = tuple(self.model.input_shape[1:])  # (H, W, 1)
+        self.num_classes = int(self.model.output_shape[-1])
+        self._input = None  # wiederverwendeter float32-Eingabepuffer, wächst mit der Batch-Größe
+
+        # Eine einzige Signatur mit variabler Batch-Größe -> kein Retracing pro Aufruf
+        signature = tf.TensorSpec(shape=(None,) + self.input_shape, dtype=tf.float32)
+        self._forward = tf.function(lambda x: self.model(x, training=False), input_signature=[signature])
+
+        if warmup:
+            self.warmup()
+
+    def warmup(self):
+        """ Einmal mit Dummy-Daten durchlaufen, damit Tracing/Initialisierung nicht im ersten Frame passiert """
+        self._forward(np.zeros((1,) + self.input_shape, dtype=np.float32))
+
+    def configure(self, preprocessing):
+        """ Übernimmt Interpolation und Pixel-Skalierung aus dem Manifest (class_map["preprocessing"]) """
+        resize = preprocessing.get("resize", PREPROCESSING["resize"])
+        if resize not in RESIZE_METHODS:
+            raise ValueError(f"❌ Unbekannte Interpolation '{resize}' in der Klassen-Map (erwartet: {', '.join(RESIZE_METHODS)})!")
+        self.resize_method = resize
+        self.pixel_scale = np.float32(preprocessing.get("pixel_scale", PREPROCESSING["pixel_scale"]))
+
+    def input_buffer(self, batch_size):
+        """ Eingabepuffer (batch_size, H, W, 1) float32, wird nur bei größerem Batch neu angelegt
+
+        Nicht thread-sicher: pro Engine darf nur ein Thread gleichzeitig vorhersagen (Detektor und Server tun das).
+        """
+        if self._input is None or len(self._input) < batch_size:
+            self._input = np.empty((batch_size,) + self.input_shape, dtype=np.float32)
+        return self._input[:batch_size]
+
+    def preprocess(self, images, out=None):
+        """ Bringt (N, H, W) oder (N, H, W, 1) Bilder in einen normalisierten float32-Tensor
+
+        Mit out wird direkt in diesen Puffer normalisiert (uint8 -> float32 in einem Schritt, ohne Zwischen-Arrays).
+        Crops in anderer Größe (z.B. 256x256 für ein 128er-Modell) werden vorher auf die Netzgröße skaliert.
+        """
+        batch = np.asarray(images)
+        if batch.ndim == len(self.input_shape):  # (N, H, W) -> Kanal ergänzen (View, keine Kopie)
+            batch = batch[..., np.newaxis]
+        if batch.shape[1:3] != self.input_shape[:2]:
+            batch = self.resize(batch)
+        if out is None:
+            if batch.dtype != np.uint8:
+                return batch.astype(np.float32, copy=False)
+            out = np.empty(batch.shape, dtype=np.float32)
+        if batch.dtype == np.uint8:
+            np.multiply(batch, self.pixel_scale, out=out)
+        else:
+            np.copyto(out, batch, casting="same_kind")
+        return out
+
+    def resize(self, batch):
+        """ (N, h, w, 1) -> (N, H, W, 1) in Netzgröße, mit derselben Interpolation wie der Trainings-Loader """
+        height, width = self.input_shape[:2]
+        if self.resize_method == "nearest":
+            # Wie tf.image.resize(method="nearest"): Quellpixel floor((i + 0.5) * h / H), cv2.INTER_NEAREST rundet anders
+            rows = ((np.arange(height) + 0.5) * batch.shape[1] / height).astype(np.intp)
+            cols = ((np.arange(width) + 0.5) * batch.shape[2] / width).astype(np.intp)
+            return batch[:, rows[:, np.newaxis], cols]
+        resized = np.empty((len(batch), height, width), dtype=batch.dtype)
+        for i, img in enumerate(batch):
+            cv2.resize(img[..., 0], (width, height), dst=resized[i], interpolation=cv2.INTER_AREA)
+        return resized[..., np.newaxis]
+
+    def predict_batch(self, images):
+        """ Wahrscheinlichkeiten für einen Stapel von Crops, Rückgabe-Shape (N, Klassen) """
+        if len(images) == 0:
+            return np.zeros((0, self.num_classes), dtype=np.float32)
+        batch = self.preprocess(images, out=self.input_buffer(len(images)))
+        return self._forward(batch).numpy()
+
+    def predict_one(self, image):
+        """ Wahrscheinlichkeiten für einen einzelnen Crop (H, W) oder (H, W, 1), Rückgabe-Shape (Klassen,) """
+        return self.predict_batch(np.expand_dims(image, axis=0))[0]
+
+class TFLiteEngine(InferenceEngine):
+    """ Gleiche API wie InferenceEngine, aber für exportierte TFLite-Modelle (float16 / INT8) """
+
+    def __init__(self, model_path, warmup=True, num_threads=None):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"❌ Modell nicht gefunden unter: {model_path} \nBitte exportiere das Modell zuerst (export_model.py)!")
+
+        import tensorflow as tf
+
+        print(f"📂 Lade TFLite-Modell aus: {model_path}")
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self.input_shape = tuple(int(dim) for dim in self.input_detail["shape"][1:])
+        self.num_classes = int(self.output_detail["shape"][-1])
+        self.batch_size = None
+        self._input = None
+
+        if warmup:
+            self.warmup()
+
+    def warmup(self):
+        """ Tensoren anlegen und einmal mit Dummy-Daten durchlaufen """
+        self.predict_batch(np.zeros((1,) + self.input_shape, dtype=np.float32))
+
+    def _resize(self, batch_size):
+        """ Eingabetensor nur bei geänderter Batch-Größe neu anlegen """
+        if batch_size != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input_detail["index"], (batch_size,) + self.input_shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = batch_size
+
+    def predict_batch(self, images):
+        """ Wahrscheinlichkeiten für einen Stapel von Crops, Rückgabe-Shape (N, Klassen) """
+        if len(images) == 0:
+            return np.zeros((0, self.num_classes), dtype=np.float32)
+        self._resize(len(images))
+
+        # Direkt in den Eingabetensor des Interpreters schreiben statt set_tensor (spart eine Kopie)
+        target = self.interpreter.tensor(self.input_detail["index"])()
+        input_dtype = self.input_detail["dtype"]
+        if input_dtype == np.float32:
+            self.preprocess(images, out=target)
+        else:
+            # Bei Full-Integer-Modellen die Eingabe im float32-Puffer quantisieren und die Ausgabe zurückrechnen
+            scale, zero_point = self.input_detail["quantization"]
+            info = np.iinfo(input_dtype)
+            batch = self.preprocess(images, out=self.input_buffer(len(images)))
+            np.multiply(batch, np.float32(1.0 / scale), out=batch)
+            np.add(batch, np.float32(zero_point), out=batch)
+            np.rint(batch, out=batch)
+            np.clip(batch, info.min, info.max, out=batch)
+            np.copyto(target, batch, casting="unsafe")
+        del target  # invoke() verlangt, dass keine Views auf interne Tensoren mehr existieren
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output_detail["index"])
+
+        if output.dtype != np.float32:
+            scale, zero_point = self.output_detail["quantization"]
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+def load_engine(model_path=MODEL_PATH, warmup=True):
+    """ Wählt die passende Engine anhand der Dateiendung (.h5/.keras oder .tflite) """
+    if model_path.endswith(".tflite"):
+        return TFLiteEngine(model_path, warmup=warmup)
+    return InferenceEngine(model_path, warmup=warmup)
@@ -0,0 +1,272 @@
+import io
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from inference_engine import load_engine, require_class_map, check_class_map, MODEL_VARIANTS
+
+# Standard-Adresse des Servers (nur lokal erreichbar)
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Micro-Batching: so viele Crops pro Forward-Pass, höchstens so lange auf weitere Anfragen warten
+MAX_BATCH = 32
+MAX_WAIT_MS = 5.0
+
+# So lange wartet eine Anfrage höchstens auf ihr Ergebnis, danach gibt es 500 statt eines hängenden Clients
+SUBMIT_TIMEOUT = 30.0
+
+# Erlaubte Datentypen der Crops (uint8 wie vom Detektor, float32 bereits normalisiert)
+CROP_DTYPES = (np.uint8, np.float32)
+
+# Debug-Modus (0 = aus, 1 = an)
+DEBUG = 1
+
+def log(msg):
+    """ Debug-Logger für schnelle Prints """
+    if DEBUG:
+        print(f"[LOG] {msg}")
+
+def encode_array(array):
+    """ Numpy-Array als .npy-Bytes (enthält Shape und Datentyp) """
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+def decode_array(data):
+    """ Gegenstück zu encode_array """
+    return np.load(io.BytesIO(data), allow_pickle=False)
+
+class PendingRequest:
+    """ Eine Anfrage eines Clients, die auf ihren Anteil am Batch wartet """
+
+    def __init__(self, crops):
+        self.crops = crops
+        self.done = threading.Event()
+        self.result = None
+        self.batch_size = 0
+
+class MicroBatcher(threading.Thread):
+    """ Sammelt Anfragen vieler Clients und führt sie gemeinsam in einem Forward-Pass aus """
+
+    def __init__(self, engine, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.crops = 0
+
+    def submit(self, crops, timeout=SUBMIT_TIMEOUT):
+        """ Blockiert, bis die Wahrscheinlichkeiten für die übergebenen Crops vorliegen (result None = Fehler/Timeout) """
+        request = PendingRequest(crops)
+        self.queue.put(request)
+        if not request.done.wait(timeout):
+            log(f"❌ Keine Antwort vom Batcher nach {timeout:.0f}s")
+        return request
+
+    def predict_group(self, requests):
+        """ Ein Forward-Pass für Anfragen mit gleicher Crop-Form, Fehler gehen nur an diese Clients """
+        size = sum(len(request.crops) for request in requests)
+        try:
+            batch = np.concatenate([request.crops for request in requests])
+            probabilities = self.engine.predict_batch(batch)
+        except Exception as error:  # Fehler an alle wartenden Clients der Gruppe weitergeben
+            log(f"❌ Inferenz fehlgeschlagen: {error}")
+            probabilities = None
+
+        start = 0
+        for request in requests:
+            count = len(request.crops)
+            request.result = None if probabilities is None else probabilities[start:start + count]
+            request.batch_size = size
+            start += count
+            request.done.set()
+
+        self.batches += 1
+        self.crops += size
+
+    def run(self):
+        while True:
+            # Auf die erste Anfrage warten, dann bis zur Deadline oder vollem Batch weitere einsammeln
+            requests = [self.queue.get()]
+            size = len(requests[0].crops)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                size += len(request.crops)
+
+            # Nach Crop-Größe und Datentyp gruppieren: verschiedene Clients dürfen z.B. 256er-Crops und
+            # Crops in Netzgröße schicken, ohne dass concatenate den ganzen Batch (und den Thread) abbricht
+            groups = {}
+            for request in requests:
+                groups.setdefault((request.crops.shape[1:], request.crops.dtype.str), []).append(request)
+            for group in groups.values():
+                self.predict_group(group)
+
+def make_handler(batcher, classes):
+    """ HTTP-Handler: POST /predict mit .npy-Body (N, H, W) uint8, GET /health für Modellinfos """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-Alive, damit Clients die Verbindung wiederverwenden
+        disable_nagle_algorithm = True
+        wbufsize = -1  # Gepuffert: Header und Body gehen als ein Paket raus (sonst ~40 ms Delayed-ACK)
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                self.send_json(404, {"error": "unbekannter Pfad"})
+                return
+            self.send_json(200, {
+                "input_shape": list(batcher.engine.input_shape),
+                "num_classes": batcher.engine.num_classes,
+                "classes": classes,
+                "batches": batcher.batches,
+                "crops": batcher.crops,
+            })
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self.send_json(404, {"error": "unbekannter Pfad"})
+                return
+            start = time.perf_counter()
+            try:
+                crops = decode_array(self.rfile.read(int(self.headers["Content-Length"])))
+            except (ValueError, TypeError, KeyError) as error:
+                self.send_json(400, {"error": f"ungültige Anfrage: {error}"})
+                return
+            if crops.ndim == 2:
+                crops = crops[np.newaxis]
+            if crops.ndim == 4 and crops.shape[-1] == 1:
+                crops = crops[..., 0]
+            # Graustufen-Crops (N, H, W) mit N > 0; andere Größen als die Netz-Eingabe skaliert die Engine
+            if crops.ndim != 3 or 0 in crops.shape or crops.dtype not in CROP_DTYPES:
+                expected = "x".join(str(dim) for dim in batcher.engine.input_shape[:2])
+                self.send_json(400, {"error": f"erwartet (N, H, W) uint8/float32 Graustufen-Crops (Netz: {expected}), "
+                                              f"erhalten {crops.shape} {crops.dtype}"})
+                return
+
+            request = batcher.submit(crops)
+            if request.result is None:
+                self.send_json(500, {"error": "Inferenz fehlgeschlagen"})
+                return
+            self.send_json(200, {
+                "probabilities": request.result.tolist(),
+                "batch_size": request.batch_size,
+                "server_ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+
+        def log_message(self, format, *args):
+            pass  # Kein Log pro Anfrage
+
+    return Handler
+
+class InferenceClient:
+    """ Gleiche API wie InferenceEngine (predict_one/predict_batch), rechnet aber auf dem Server """
+
+    def __init__(self, url=f"http://{HOST}:{PORT}", timeout=10):
+        parsed = urlparse(url)
+        self.connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=timeout)
+        self.lock = threading.Lock()
+        self._connect()
+        info = self._request("GET", "/health")
+        self.input_shape = tuple(info["input_shape"])
+        self.num_classes = info["num_classes"]
+        self.classes = info["classes"]
+
+    def _connect(self):
+        """ Verbindung aufbauen, Nagle aus (Header und Body gehen als getrennte Pakete raus) """
+        self.connection.close()
+        self.connection.connect()
+        self.connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _request(self, method, path, body=None):
+        with self.lock:
+            try:
+                self.connection.request(method, path, body=body)
+                response = self.connection.getresponse()
+            except (ConnectionError, http.client.HTTPException):
+                # Verbindung wurde geschlossen -> einmal neu verbinden
+                self._connect()
+                self.connection.request(method, path, body=body)
+                response = self.connection.getresponse()
+            payload = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"❌ Inferenz-Server meldet Fehler {response.status}: {payload.get('error')}")
+        return payload
+
+    def predict_batch(self, images):
+        """ Wahrscheinlichkeiten für einen Stapel von uint8-Crops, Rückgabe-Shape (N, Klassen) """
+        images = np.asarray(images)
+        if len(images) == 0:
+            return np.zeros((0, self.num_classes), dtype=np.float32)
+        payload = self._request("POST", "/predict", encode_array(images))
+        return np.asarray(payload["probabilities"], dtype=np.float32)
+
+    def predict_one(self, image):
+        """ Wahrscheinlichkeiten für einen einzelnen Crop, Rückgabe-Shape (Klassen,) """
+        return self.predict_batch(np.expand_dims(image, axis=0))[0]
+
+def serve(model_path, class_map, host=HOST, port=PORT, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    """ Lädt das Modell einmal, prüft es gegen die Klassen-Map und beantwortet Anfragen vieler Clients gebündelt """
+    engine = load_engine(model_path)
+    check_class_map(class_map, engine, model_path)
+    batcher = MicroBatcher(engine, max_batch, max_wait_ms)
+    batcher.start()
+
+    server = ThreadingHTTPServer((host, port), make_handler(batcher, class_map["classes"]))
+    server.daemon_threads = True
+    print(f"\n🟢 Inferenz-Server läuft auf http://{host}:{port} (max. Batch {max_batch}, max. Wartezeit {max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Inferenz-Server wird beendet...")
+    finally:
+        server.server_close()
+        if batcher.batches:
+            log(f"📊 {batcher.crops} Crops in {batcher.batches} Batches (Ø {batcher.crops / batcher.batches:.1f} pro Batch)")
+
+def main(argv=None):
+    """ Einstiegspunkt für die Kommandozeile und run_pipeline.py """
+    parser = argparse.ArgumentParser(description="Lokaler Inferenz-Server mit Micro-Batching für mehrere Kameras")
+    parser.add_argument("--host", type=str, default=HOST, help="Adresse, auf der der Server lauscht")
+    parser.add_argument("--port", type=int, default=PORT, help="Port des Servers")
+    parser.add_argument("--variant", choices=sorted(MODEL_VARIANTS), default="float32", help="Modellvariante (siehe export_model.py)")
+    parser.add_argument("--model", type=str, help="Expliziter Modellpfad, überschreibt --variant")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="Maximale Anzahl Crops pro Forward-Pass")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS, help="Maximale Wartezeit auf weitere Anfragen, bevor ein Batch startet")
+    parser.add_argument("--dataset", type=str, choices=["raw", "processed"], help="Klassennamen aus diesem Datensatz lesen statt aus der Klassen-Map neben dem Modell (nur für ältere Modelle ohne Map)")
+    args = parser.parse_args(argv)
+
+    model_path = args.model or MODEL_VARIANTS[args.variant]
+    if args.dataset:
+        from live_card_detector import load_classes
+        class_map = {"classes": load_classes(args.dataset)}
+    else:
+        class_map = require_class_map(model_path)
+
+    serve(model_path, class_map, args.host, args.port, args.max_batch, args.max_wait_ms)
+
+if __name__ == "__main__":
+    main()
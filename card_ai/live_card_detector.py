@@ -1,84 +1,131 @@
 import os
+import time
+import json
+import queue
+import pstats
+import cProfile
+import argparse
+import threading
+import tracemalloc
+from collections import deque
 import cv2
 import numpy as np
-from tensorflow.keras.models import load_model
+from inference_engine import load_engine, require_class_map, check_class_map, class_map_path, MODEL_VARIANTS
+from card_tracker import CardTracker, REFRESH_INTERVAL, SMOOTH_WINDOW
+from card_detection import CardDetector
+from inference_server import InferenceClient
+from stage_metrics import StageMetrics, SnapshotWriter, SNAPSHOT_INTERVAL
 
 # Basisverzeichnis bestimmen
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
-# Standard-Pfad für das Modell
-MODEL_PATH = os.path.join(BASE_DIR, "models", "card_model.h5")
+# Modell wird beim Start einmalig geladen und aufgewärmt (Variante per --variant/--model wählbar)
+engine = None
 
-# Prüfen, ob das Modell existiert
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError(f"❌ Modell nicht gefunden unter: {MODEL_PATH} \nBitte trainiere das Modell zuerst!")
+# Optionale schnelle Erkennung (Pyramide + ROI, siehe card_detection.py), wird per --fast-detect gesetzt
+detector = None
 
-# Modell einmalig laden
-print(f"📂 Lade Modell aus: {MODEL_PATH}")
-model = load_model(MODEL_PATH)
-
-# Beide Verzeichnisse laden, damit man sieht, welche Kartenklassen existieren
-raw_path = os.path.join(BASE_DIR, "datasets", "raw")
-processed_path = os.path.join(BASE_DIR, "datasets", "processed_dataset")
-
-# Anzeigen, welche Kartenklassen in beiden existieren
-raw_classes = sorted(os.listdir(raw_path)) if os.path.exists(raw_path) else []
-processed_classes = sorted(os.listdir(processed_path)) if os.path.exists(processed_path) else []
-
-
-# --- 🔍 Wähle den Datensatz ---
-print("\n🔍 Wähle den Datensatz für die Klassenerkennung:")
-print(f"1️⃣ Rohbilder {raw_classes}")
-print(f"2️⃣ Vorverarbeitete Bilder  {processed_classes}")
-
-dataset_choice = input("\nGib '1' für Rohbilder oder '2' für vorverarbeitete Bilder ein: ").strip()
+# Wiederverwendbare Frame- und Crop-Puffer für den Live-Pfad, werden in main angelegt (--no-buffers = aus)
+buffers = None
 
+# Zeiten der einzelnen Stufen (Aufnahme, Erkennung, Entzerren, Inferenz, Zeichnen, Anzeige), immer aktiv
+metrics = StageMetrics()
 
-print("\n🔍 **Gefundene Kartenklassen:**")
-print(f"🟢 Rohbilder: {raw_classes}")
-print(f"🔵 Vorverarbeitete Bilder: {processed_classes}")
+# Stufenzeiten in den Frame einblenden (--show-stages)
+show_stages = False
 
-if dataset_choice == "1":
-    DATASET_PATH = raw_path
-    print("📂 Nutze **Rohbilder** als Trainingsgrundlage.")
-elif dataset_choice == "2":
-    DATASET_PATH = processed_path
-    print("📂 Nutze **vorverarbeitete Bilder** als Trainingsgrundlage.")
-else:
-    print("❌ Ungültige Eingabe. Skript wird beendet.")
-    exit(1)
+# Kartenklassen (Reihenfolge wie beim Training), werden beim Start aus der Klassen-Map gesetzt
+classes = []
 
-# Prüfen, ob der gewählte Datensatz existiert
-if not os.path.exists(DATASET_PATH):
-    raise FileNotFoundError(f"❌ Kein Datensatz gefunden unter {DATASET_PATH} \nBitte stelle sicher, dass du Bilder aufgenommen hast.")
+# Verzeichnisse, aus denen --dataset die Kartenklassen liest (ältere Modelle ohne Klassen-Map)
+raw_path = os.path.join(BASE_DIR, "datasets", "raw")
+processed_path = os.path.join(BASE_DIR, "datasets", "processed_dataset")
 
-# Dynamisch die Kartenklassen aus dem Dataset laden
-classes = sorted(os.listdir(DATASET_PATH))
-print(f"🔍 **Final verwendete Klassen:** {classes}")
+def load_classes(dataset):
+    """ Liest die Kartenklassen aus dem Datensatz ('raw'/'processed') - nur für ältere Modelle ohne Klassen-Map """
+    dataset_path = {"raw": raw_path, "processed": processed_path}.get(dataset)
+    if dataset_path is None:
+        raise ValueError(f"❌ Unbekannter Datensatz: {dataset} (erlaubt: 'raw', 'processed')")
+    print(f"📂 Lese Kartenklassen aus **{dataset}**: {dataset_path}")
+
+    # Prüfen, ob der gewählte Datensatz existiert
+    if not os.path.exists(dataset_path):
+        raise FileNotFoundError(f"❌ Kein Datensatz gefunden unter {dataset_path} \nBitte stelle sicher, dass du Bilder aufgenommen hast.")
+
+    # Kartenklassen = Ordner, alphabetisch wie beim Training ohne Klassen-Map
+    dataset_classes = sorted(d for d in os.listdir(dataset_path) if os.path.isdir(os.path.join(dataset_path, d)))
+    print(f"🔍 **Final verwendete Klassen:** {dataset_classes}")
+    return dataset_classes
+
+# Mindestfläche (in Pixeln) einer Kontur, damit sie als Karte zählt
+MIN_CARD_AREA = 5000
+
+# Kantenlänge des entzerrten Karten-Crops (= Netz-Eingabe)
+CARD_SIZE = 256
+
+# Zielecken für die Perspektivtransformation (einmal statt pro Karte angelegt)
+CARD_CORNERS = np.array([
+    [0, 0],
+    [CARD_SIZE - 1, 0],
+    [CARD_SIZE - 1, CARD_SIZE - 1],
+    [0, CARD_SIZE - 1]
+], dtype="float32")
+
+# Platz für so viele Karten pro Frame, bei mehr wird der Crop-Stapel vergrößert
+MAX_CARDS = 8
+
+class FrameBuffers:
+    """ Puffer für Graubild, Unschärfe, Kanten, Warp und Crop-Stapel, angelegt pro Framegröße statt pro Frame """
+
+    def __init__(self, max_cards=MAX_CARDS, card_size=CARD_SIZE):
+        self.frame_shape = None
+        self.warp = np.empty((card_size, card_size, 3), dtype=np.uint8)
+        self.crops = np.empty((max_cards, card_size, card_size), dtype=np.uint8)
+
+    def frame(self, shape):
+        """ (gray, blurred, edges) in Framegröße, bei neuer Auflösung einmalig neu angelegt """
+        if shape[:2] != self.frame_shape:
+            self.frame_shape = shape[:2]
+            self.gray = np.empty(self.frame_shape, dtype=np.uint8)
+            self.blurred = np.empty(self.frame_shape, dtype=np.uint8)
+            self.edges = np.empty(self.frame_shape, dtype=np.uint8)
+        return self.gray, self.blurred, self.edges
+
+    def crop_stack(self, count):
+        """ (count, H, W) uint8-Stapel für die Crops, wächst nur, wenn mehr Karten als bisher im Bild sind """
+        if count > len(self.crops):
+            self.crops = np.empty((count,) + self.crops.shape[1:], dtype=np.uint8)
+        return self.crops[:count]
 
 # --- Funktionen für Kartenerkennung ---
-def detect_card(frame):
-    """ Ermittelt die Kontur einer möglichen Karte im Frame """
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    edges = cv2.Canny(blurred, 50, 150)
+def detect_cards(frame, min_area=MIN_CARD_AREA, buffers=None):
+    """ Ermittelt alle kartenförmigen (viereckigen) Konturen im Frame, größte zuerst """
+    # Mit Puffern schreibt OpenCV über dst= in vorhandene Arrays, ohne (None) legt es neue an
+    gray, blurred, edges = buffers.frame(frame.shape) if buffers is not None else (None, None, None)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0, dst=blurred)
+    edges = cv2.Canny(blurred, 50, 150, edges=edges)
 
     contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    card_contour = None
-    max_area = 0
+    cards = []
 
     for contour in contours:
         area = cv2.contourArea(contour)
-        if area > max_area:
+        if area > min_area:
             approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
             if len(approx) == 4:
-                card_contour = approx
-                max_area = area
+                cards.append((area, approx))
 
-    return card_contour
+    cards.sort(key=lambda card: card[0], reverse=True)
+    return [approx for _, approx in cards]
 
-def crop_card(frame, contour):
-    """ Schneidet die erkannte Karte aus und transformiert sie in die richtige Form """
+def detect_card(frame):
+    """ Ermittelt die Kontur der größten möglichen Karte im Frame """
+    cards = detect_cards(frame, min_area=0)
+    return cards[0] if cards else None
+
+def crop_card(frame, contour, dst=None):
+    """ Schneidet die erkannte Karte aus und transformiert sie in die richtige Form (optional in einen vorhandenen Puffer) """
     pts = contour.reshape(4, 2)
     rect = np.zeros((4, 2), dtype="float32")
 
@@ -90,61 +137,521 @@ def crop_card(frame, contour):
     rect[1] = pts[np.argmin(diff)]
     rect[3] = pts[np.argmax(diff)]
 
-    dst = np.array([
-        [0, 0],
-        [256 - 1, 0],
-        [256 - 1, 256 - 1],
-        [0, 256 - 1]
-    ], dtype="float32")
-
-    M = cv2.getPerspectiveTransform(rect, dst)
-    warp = cv2.warpPerspective(frame, M, (256, 256))
+    M = cv2.getPerspectiveTransform(rect, CARD_CORNERS)
+    warp = cv2.warpPerspective(frame, M, (CARD_SIZE, CARD_SIZE), dst=dst)
     return warp
 
-# Kamera initialisieren
-cap = cv2.VideoCapture(0)
-
-print("\n🔴 **Live-Kartenerkennung gestartet!**")
-print("Drücke **'q'**, um das Programm zu beenden und zurück zur Pipeline zu kehren.")
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("Fehler beim Lesen des Kamerafeeds.")
-        break
-
-    # Karte erkennen
-    card_contour = detect_card(frame)
-    if card_contour is not None:
-        cv2.drawContours(frame, [card_contour], -1, (0, 255, 0), 2)
-        cropped_card = crop_card(frame, card_contour)
-
-        # Bild vorbereiten und Vorhersage
-        cropped_card = cv2.cvtColor(cropped_card, cv2.COLOR_BGR2GRAY)  # Graustufen
-        normalized = cropped_card / 255.0  # Normalisieren
-        input_data = np.expand_dims(normalized, axis=(0, -1))  # Shape (1, 256, 256, 1)
+def classify_frame(frame, min_area=MIN_CARD_AREA, tracker=None):
+    """ Erkennt alle Karten im Frame und klassifiziert sie in einem Batch, gibt Liste von (Kontur, Klasse, Konfidenz) zurück """
+    with metrics.time("detect"):
+        card_contours = detector.detect(frame) if detector is not None else detect_cards(frame, min_area, buffers)
+    if not card_contours:
+        return []
+
+    # Alle Karten entzerren und direkt in den Graustufen-Stapel schreiben (Normalisierung übernimmt die Engine)
+    with metrics.time("warp"):
+        if buffers is not None:
+            crops, warp = buffers.crop_stack(len(card_contours)), buffers.warp
+        else:
+            crops, warp = np.empty((len(card_contours), CARD_SIZE, CARD_SIZE), dtype=np.uint8), None
+        for i, contour in enumerate(card_contours):
+            cv2.cvtColor(crop_card(frame, contour, dst=warp), cv2.COLOR_BGR2GRAY, dst=crops[i])
+
+    with metrics.time("inference"):
+        if tracker is None:
+            # Ein einziger Forward-Pass für alle Karten
+            predictions = engine.predict_batch(crops)
+        else:
+            # Nur neue oder veränderte Karten durchs CNN, sonst geglättete Wahrscheinlichkeiten aus dem Track
+            tracks = tracker.update(card_contours, crops, engine.predict_batch)
+            predictions = [track.probabilities() for track in tracks]
 
-        # **🔴 WICHTIG: Modell existiert jetzt immer korrekt!**
-        prediction = model.predict(input_data)
-        predicted_index = np.argmax(prediction)
+    results = []
+    for card_contour, prediction in zip(card_contours, predictions):
+        predicted_index = int(np.argmax(prediction))
+        confidence = float(prediction[predicted_index]) * 100
 
         # **Falls das Modell mehr Klassen hat als vorhanden, Fehler abfangen**
-        if predicted_index < len(classes):
-            predicted_class = classes[predicted_index]
-            confidence = prediction[0][predicted_index] * 100
-            cv2.putText(frame, f"{predicted_class} ({confidence:.2f}%)", (10, 50),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
+        label = classes[predicted_index] if predicted_index < len(classes) else None
+        results.append((card_contour, label, confidence))
+    return results
+
+def draw_results(frame, results):
+    """ Zeichnet Kontur und Klassifizierung jeder erkannten Karte in den Frame """
+    for card_contour, label, confidence in results or []:
+        if label is not None:
+            text, color = f"{label} ({confidence:.2f}%)", (0, 255, 0)
+        else:
+            text, color = "❌ Unbekannte Karte", (0, 0, 255)
+        cv2.drawContours(frame, [card_contour], -1, (0, 255, 0), 2)
+        x, y, _, _ = cv2.boundingRect(card_contour)
+        cv2.putText(frame, text, (x, max(y - 10, 20)), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2, cv2.LINE_AA)
+
+def draw_stage_times(frame):
+    """ Blendet p50/p95 jeder Stufe oben links ein (nur mit --show-stages) """
+    if not show_stages:
+        return
+    for i, line in enumerate(metrics.overlay_lines()):
+        cv2.putText(frame, line, (10, 20 + i * 18), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1, cv2.LINE_AA)
+
+class FpsCounter:
+    """ Misst die Rate von Ereignissen über ein gleitendes Zeitfenster """
+
+    def __init__(self, window=30):
+        self.timestamps = deque(maxlen=window)
+
+    def tick(self):
+        self.timestamps.append(time.monotonic())
+
+    def fps(self):
+        if len(self.timestamps) < 2:
+            return 0.0
+        return (len(self.timestamps) - 1) / (self.timestamps[-1] - self.timestamps[0])
+
+class FrameGrabber(threading.Thread):
+    """ Liest die Kamera in eigenem Thread und behält immer nur den neuesten Frame """
+
+    def __init__(self, cap):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.lock = threading.Lock()
+        self.new_frame = threading.Condition(self.lock)
+        self.frame = None
+        self.frame_id = 0
+        self.frame_time = 0.0
+        self.fps = FpsCounter()
+        self.running = True
+
+    def run(self):
+        while self.running:
+            with metrics.time("capture"):
+                ret, frame = self.cap.read()
+            if not ret:
+                print("Fehler beim Lesen des Kamerafeeds.")
+                break
+            with self.lock:
+                self.frame = frame
+                self.frame_id += 1
+                self.frame_time = time.monotonic()
+                self.fps.tick()
+                self.new_frame.notify_all()
+        with self.lock:
+            self.running = False
+            self.new_frame.notify_all()
+
+    def latest(self):
+        """ Gibt (Frame-ID, Aufnahmezeit, Frame) des neuesten Frames zurück """
+        with self.lock:
+            return self.frame_id, self.frame_time, self.frame
+
+    def wait_newer(self, frame_id):
+        """ Blockiert, bis ein Frame neuer als frame_id vorliegt (oder die Aufnahme endet) """
+        with self.lock:
+            while self.running and self.frame_id <= frame_id:
+                self.new_frame.wait(timeout=0.5)
+            return self.frame_id, self.frame_time, self.frame
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.new_frame.notify_all()
+
+class InferenceWorker(threading.Thread):
+    """ Klassifiziert in eigenem Thread immer den neuesten Frame, ältere Frames werden übersprungen """
+
+    def __init__(self, grabber, min_area=MIN_CARD_AREA, tracker=None):
+        super().__init__(daemon=True)
+        self.grabber = grabber
+        self.min_area = min_area
+        self.tracker = tracker
+        self.lock = threading.Lock()
+        self.result = None
+        self.result_time = 0.0
+        self.fps = FpsCounter()
+        self.running = True
+
+    def run(self):
+        last_id = 0
+        while self.running and self.grabber.running:
+            frame_id, frame_time, frame = self.grabber.wait_newer(last_id)
+            if frame is None or frame_id == last_id:
+                continue
+            last_id = frame_id
+            result = classify_frame(frame, self.min_area, self.tracker)
+            with self.lock:
+                self.result = result
+                self.result_time = frame_time
+            self.fps.tick()
+
+    def latest(self):
+        """ Gibt (Ergebnis, Aufnahmezeit des zugehörigen Frames) zurück """
+        with self.lock:
+            return self.result, self.result_time
+
+    def stop(self):
+        self.running = False
+
+def run_sequential(cap, min_area=MIN_CARD_AREA, tracker=None, max_frames=None):
+    """ Ursprünglicher Modus: Aufnahme, Erkennung und Anzeige nacheinander im selben Thread """
+    frame_count = 0
+    while max_frames is None or frame_count < max_frames:
+        frame_start = time.perf_counter()
+        with metrics.time("capture"):
+            ret, frame = cap.read()
+        if not ret:
+            print("Fehler beim Lesen des Kamerafeeds.")
+            break
+
+        # Karte erkennen
+        results = classify_frame(frame, min_area, tracker)
+        with metrics.time("draw"):
+            draw_results(frame, results)
+            draw_stage_times(frame)
+
+        # Live-Feed anzeigen
+        with metrics.time("display"):
+            cv2.imshow("Live Feed", frame)
+            key = cv2.waitKey(1) & 0xFF
+        metrics.record("frame", time.perf_counter() - frame_start)
+        frame_count += 1
+
+        # Beenden mit 'q'
+        if key == ord('q'):
+            print("\n🛑 **Live-Kartenerkennung wird beendet...**")
+            break
+
+def run_pipelined(cap, min_area=MIN_CARD_AREA, tracker=None):
+    """ Pipeline-Modus: Aufnahme-Thread, Inferenz-Thread und Anzeige laufen entkoppelt """
+    # Nur den neuesten Frame im Treiberpuffer halten (wird nicht von jedem Backend unterstützt)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    grabber = FrameGrabber(cap)
+    worker = InferenceWorker(grabber, min_area, tracker)
+    grabber.start()
+    worker.start()
+
+    render_fps = FpsCounter()
+    last_id = 0
+    while grabber.running:
+        frame_id, _, frame = grabber.wait_newer(last_id)
+        if frame is None or frame_id == last_id:
+            continue
+        last_id = frame_id
+        frame = frame.copy()  # Der Grabber überschreibt seinen Frame nicht, aber wir zeichnen hinein
+
+        # Neuestes Inferenz-Ergebnis überlagern
+        results, result_time = worker.latest()
+        with metrics.time("draw"):
+            draw_results(frame, results)
+            draw_stage_times(frame)
+        render_fps.tick()
+
+        latency_ms = (time.monotonic() - result_time) * 1000 if result_time else 0.0
+        stats = (f"Cam {grabber.fps.fps():.1f} FPS | Inferenz {worker.fps.fps():.1f} FPS | "
+                 f"Anzeige {render_fps.fps():.1f} FPS | Latenz {latency_ms:.0f} ms")
+        cv2.putText(frame, stats, (10, frame.shape[0] - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
+                    (255, 255, 0), 1, cv2.LINE_AA)
+
+        with metrics.time("display"):
+            cv2.imshow("Live Feed", frame)
+            key = cv2.waitKey(1) & 0xFF
+
+        if key == ord('q'):
+            print("\n🛑 **Live-Kartenerkennung wird beendet...**")
+            break
+
+    worker.stop()
+    grabber.stop()
+    worker.join(timeout=2)
+    grabber.join(timeout=2)
+
+# Dateiendungen, die im Verzeichnis-Modus als Frames gelesen werden
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+def iter_frames(source):
+    """ Liefert (Index, Name, Frame) aus einer Videodatei oder einem Verzeichnis mit Einzelbildern """
+    if os.path.isdir(source):
+        names = sorted(f for f in os.listdir(source) if f.lower().endswith(IMAGE_EXTENSIONS))
+        for index, name in enumerate(names):
+            frame = cv2.imread(os.path.join(source, name))
+            if frame is None:
+                print(f"❌ Fehler beim Laden: {name}")
+                continue
+            yield index, name, frame
+        return
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"❌ Video konnte nicht geöffnet werden: {source}")
+    index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield index, None, frame
+            index += 1
+    finally:
+        cap.release()  # auch wenn der Generator vorzeitig geschlossen wird
+
+def prefetch_frames(frames, depth=8):
+    """ Dekodiert Frames in einem Hintergrund-Thread vor, damit Lesen und Inferenz überlappen
+
+    Hört der Verbraucher vorzeitig auf (z.B. max_frames) oder wird der Generator geschlossen, wird der
+    Lese-Thread gestoppt, die Queue geleert und die Quelle (VideoCapture) freigegeben.
+    Fehler beim Lesen werden im Verbraucher erneut ausgelöst.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        """ Wartet auf Platz in der Queue, gibt aber auf, sobald der Verbraucher aufgehört hat """
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        frames_iter = iter(frames)
+        try:
+            while not stop.is_set():
+                # Lesen + Dekodieren zählt als Aufnahme-Stufe
+                start = time.perf_counter()
+                try:
+                    item = next(frames_iter, done)
+                except Exception as error:
+                    put((None, error))
+                    return
+                if item is done:
+                    break
+                metrics.record("capture", time.perf_counter() - start)
+                if not put((time.perf_counter(), item)):
+                    return
+            put((None, done))
+        finally:
+            close = getattr(frames_iter, "close", None)
+            if close is not None:
+                close()  # Generator im eigenen Thread beenden -> Quelle wird freigegeben
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        while True:
+            read_time, item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield read_time, item
+    finally:
+        stop.set()
+        while True:
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                break
+        thread.join()
+
+def run_headless(source, output_path, min_area=MIN_CARD_AREA, tracker=None, max_frames=None):
+    """ Verarbeitet Video oder Bildverzeichnis ohne GUI und schreibt pro Frame eine JSON-Zeile """
+    print(f"\n🎞️ Headless-Erkennung: {source} -> {output_path}")
+    frame_count = 0
+    card_count = 0
+    start = time.perf_counter()
+
+    frames = prefetch_frames(iter_frames(source))
+    try:
+        with open(output_path, "w") as out:
+            for read_time, (index, name, frame) in frames:
+                if max_frames is not None and frame_count >= max_frames:
+                    break
+                frame_start = time.perf_counter()
+                results = classify_frame(frame, min_area, tracker)
+                metrics.record("frame", time.perf_counter() - frame_start)
+                process_ms = (time.perf_counter() - frame_start) * 1000
+
+                cards = []
+                for card_contour, label, confidence in results:
+                    x, y, w, h = cv2.boundingRect(card_contour)
+                    cards.append({
+                        "card": label,
+                        "confidence": round(confidence, 2),
+                        "bbox": [x, y, w, h],
+                        "corners": card_contour.reshape(-1, 2).tolist(),
+                    })
+
+                record = {
+                    "frame": index,
+                    "cards": cards,
+                    "timing": {
+                        "queue_ms": round((frame_start - read_time) * 1000, 3),
+                        "process_ms": round(process_ms, 3),
+                    },
+                }
+                if name is not None:
+                    record["file"] = name
+                out.write(json.dumps(record) + "\n")
+
+                frame_count += 1
+                card_count += len(cards)
+    finally:
+        frames.close()  # Lese-Thread stoppen und Quelle freigeben, auch wenn bei max_frames abgebrochen wird
+
+    elapsed = time.perf_counter() - start
+    fps = frame_count / elapsed if elapsed else 0.0
+    print(f"✅ {frame_count} Frames, {card_count} Karten in {elapsed:.2f}s ({fps:.1f} FPS)")
+    return frame_count
+
+def print_stage_summary():
+    """ Tabelle der Stufenzeiten am Ende eines Laufs """
+    stages = metrics.snapshot()["stages"]
+    if not stages:
+        return
+    print(f"\n{'Stufe':<12}{'Anzahl':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in stages.items():
+        if "p50_ms" in stats:
+            print(f"{name:<12}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                  f"{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+
+def run_profiled(run, output_path, top=25):
+    """ Führt run() unter cProfile aus, speichert die pstats-Datei und zeigt die teuersten Funktionen """
+    profiler = cProfile.Profile()
+    profiler.runcall(run)
+    profiler.dump_stats(output_path)
+    print(f"\n📄 cProfile-Daten gespeichert unter: {output_path}")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
+
+def allocation_report(frames, min_area=MIN_CARD_AREA, warmup=3):
+    """ Misst mit tracemalloc den Speicher, den classify_frame pro Frame zusätzlich anlegt - ohne und mit Puffern """
+    global buffers
+    print(f"\n🧮 Allokationen pro Frame ({len(frames)} Frames, Speicher der Konturen/Ergebnisse eingeschlossen):")
+    for name, frame_buffers in (("ohne Puffer", None), ("mit Puffern", FrameBuffers())):
+        buffers = frame_buffers
+        for frame in frames[:warmup]:
+            classify_frame(frame, min_area)  # Puffer anlegen, Engine aufwärmen
+
+        tracemalloc.start()
+        peaks, timings = [], []
+        for frame in frames:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            classify_frame(frame, min_area)
+            timings.append(time.perf_counter() - start)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        tracemalloc.stop()
+
+        peaks = np.array(peaks) / 1024
+        print(f"📊 {name:<12} Spitze Ø {peaks.mean():9.1f} KB | max {peaks.max():9.1f} KB | "
+              f"{np.median(timings) * 1000:6.2f} ms/Frame (Median)")
+    buffers = frame_buffers
+
+def main(argv=None):
+    """ Einstiegspunkt für die Kommandozeile und run_pipeline.py """
+    global engine, classes, detector, buffers, show_stages
+
+    parser = argparse.ArgumentParser(description="Live-Kartenerkennung")
+    parser.add_argument("--pipelined", action="store_true", help="Aufnahme, Inferenz und Anzeige in getrennten Threads ausführen")
+    parser.add_argument("--min-area", type=int, default=MIN_CARD_AREA, help="Mindestfläche einer Kontur in Pixeln, damit sie als Karte gilt")
+    parser.add_argument("--track", action="store_true", help="Karten über Frames verfolgen und nur bei Veränderung neu klassifizieren")
+    parser.add_argument("--refresh-interval", type=float, default=REFRESH_INTERVAL, help="Sekunden, nach denen eine verfolgte Karte spätestens neu klassifiziert wird")
+    parser.add_argument("--smooth-window", type=int, default=SMOOTH_WINDOW, help="Anzahl Vorhersagen, über die die Konfidenz geglättet wird")
+    parser.add_argument("--variant", choices=sorted(MODEL_VARIANTS), default="float32", help="Modellvariante: float32 (Keras) oder quantisiertes TFLite-Modell aus export_model.py")
+    parser.add_argument("--model", type=str, help="Expliziter Pfad zu einem Modell (.h5 oder .tflite), überschreibt --variant")
+    parser.add_argument("--dataset", type=str, choices=["raw", "processed"], help="Kartenklassen aus diesem Datensatz lesen statt aus der Klassen-Map neben dem Modell (nur für ältere Modelle ohne Map)")
+    parser.add_argument("--source", type=str, help="Videodatei oder Bildverzeichnis: Headless-Modus ohne GUI und ohne Rückfragen")
+    parser.add_argument("--output", type=str, default="detections.jsonl", help="JSON-Lines-Datei für die Ergebnisse im Headless-Modus")
+    parser.add_argument("--server", type=str, help="URL eines laufenden Inferenz-Servers (inference_server.py), statt das Modell selbst zu laden")
+    parser.add_argument("--fast-detect", action="store_true", help="Konturensuche auf verkleinerter Pyramidenebene, in einer ROI um die letzten Karten")
+    parser.add_argument("--no-buffers", action="store_true", help="Puffer nicht wiederverwenden, jeder Frame legt eigene Arrays an (zum Vergleich)")
+    parser.add_argument("--alloc-report", type=int, metavar="N", help="Allokationen pro Frame für N Frames (aus --source oder der Kamera) ohne/mit Puffern messen und beenden")
+    parser.add_argument("--show-stages", action="store_true", help="p50/p95 jeder Stufe (Aufnahme, Erkennung, Entzerren, Inferenz, Zeichnen, Anzeige) im Bild einblenden")
+    parser.add_argument("--metrics-file", type=str, help="Stufenzeiten regelmäßig in diese Datei schreiben (.json = JSON, sonst Prometheus-Textformat)")
+    parser.add_argument("--metrics-interval", type=float, default=SNAPSHOT_INTERVAL, help="Sekunden zwischen zwei Snapshots für --metrics-file")
+    parser.add_argument("--profile", type=int, metavar="N", help="N Frames (sequentiell) unter cProfile verarbeiten, pstats-Bericht ausgeben und beenden")
+    parser.add_argument("--profile-output", type=str, default="detector.prof", help="Datei für die cProfile-Daten von --profile")
+    args = parser.parse_args(argv)
+
+    show_stages = args.show_stages
+
+    if args.fast_detect:
+        detector = CardDetector(min_area=args.min_area)
+
+    # Fehlendes Modell sofort melden, nicht erst nach Klassenauswahl und TensorFlow-Import
+    model_path = args.model or MODEL_VARIANTS[args.variant]
+    if not args.server and not os.path.exists(model_path):
+        raise FileNotFoundError(f"❌ Modell nicht gefunden unter: {model_path} \nBitte trainiere das Modell zuerst!")
+
+    # Klassen kommen aus der Klassen-Map neben dem Modell (stimmt auch nach inkrementellem Training mit neuen
+    # Klassen): kein Datensatz-Scan, keine Rückfrage. Mit --server liefert der Server die Klassen.
+    if args.dataset:
+        class_map = {"classes": load_classes(args.dataset)}
+    elif not args.server:
+        class_map = require_class_map(model_path)
+        print(f"🔍 **Klassen aus {class_map_path(model_path)}:** {class_map['classes']}")
+
+    # Modell einmalig laden und aufwärmen (oder Crops an den gemeinsamen Inferenz-Server schicken)
+    engine = InferenceClient(args.server) if args.server else load_engine(model_path)
+    if args.server and not args.dataset:
+        if not engine.classes:
+            raise ValueError(f"❌ Der Inferenz-Server unter {args.server} kennt keine Klassen - Klassen-Map neben das Modell legen oder --dataset angeben!")
+        class_map = {"classes": engine.classes}
+    check_class_map(class_map, engine, None if args.server or args.dataset else model_path)
+    classes = class_map["classes"]
+
+    tracker = CardTracker(refresh_interval=args.refresh_interval, smooth_window=args.smooth_window) if args.track else None
+    buffers = None if args.no_buffers else FrameBuffers()
+
+    if args.alloc_report:
+        if args.source:
+            frames = [frame for _, (_, _, frame) in zip(range(args.alloc_report), iter_frames(args.source))]
         else:
-            cv2.putText(frame, "❌ Unbekannte Karte", (10, 50),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
+            cap = cv2.VideoCapture(0)
+            frames = [frame for ret, frame in (cap.read() for _ in range(args.alloc_report)) if ret]
+            cap.release()
+        allocation_report(frames, args.min_area)
+        return
+
+    snapshot_writer = None
+    if args.metrics_file:
+        snapshot_writer = SnapshotWriter(metrics, args.metrics_file, args.metrics_interval)
+        snapshot_writer.start()
+
+    if args.source:
+        if args.profile:
+            run_profiled(lambda: run_headless(args.source, args.output, args.min_area, tracker, args.profile), args.profile_output)
+        else:
+            run_headless(args.source, args.output, args.min_area, tracker)
+    else:
+        # Kamera initialisieren
+        cap = cv2.VideoCapture(0)
+
+        print("\n🔴 **Live-Kartenerkennung gestartet!**")
+        print("Drücke **'q'**, um das Programm zu beenden und zurück zur Pipeline zu kehren.")
+
+        if args.profile:
+            # cProfile sieht nur den eigenen Thread, deshalb wird immer sequentiell profiliert
+            run_profiled(lambda: run_sequential(cap, args.min_area, tracker, args.profile), args.profile_output)
+        elif args.pipelined:
+            run_pipelined(cap, args.min_area, tracker)
+        else:
+            run_sequential(cap, args.min_area, tracker)
+
+        cap.release()
+        cv2.destroyAllWindows()
 
-    # Live-Feed anzeigen
-    cv2.imshow("Live Feed", frame)
+    if snapshot_writer is not None:
+        snapshot_writer.stop()
+        print(f"📄 Stufenzeiten gespeichert unter: {args.metrics_file}")
+    print_stage_summary()
 
-    # Beenden mit 'q'
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        print("\n🛑 **Live-Kartenerkennung wird beendet...**")
-        break
+    if tracker is not None and tracker.detections:
+        print(f"📊 CNN-Aufrufe: {tracker.classifications} für {tracker.detections} Karten-Detektionen "
+              f"({tracker.classifications / tracker.detections:.1%})")
 
-cap.release()
-cv2.destroyAllWindows()
+if __name__ == "__main__":
+    main()
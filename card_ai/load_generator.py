@@ -0,0 +1,53 @@
+import time
+import argparse
+import threading
+import numpy as np
+from inference_server import InferenceClient, HOST, PORT
+
+# Standardwerte für den Lasttest
+CLIENT_COUNTS = [1, 2, 4, 8, 16]
+DURATION = 5.0  # Sekunden pro Stufe
+CARDS_PER_REQUEST = 1
+
+def run_clients(url, clients, duration, cards):
+    """ Startet mehrere Clients parallel, jeder schickt so schnell wie möglich Anfragen; gibt Latenzen (ms) zurück """
+    rng = np.random.default_rng(0)
+    crops = rng.integers(0, 256, size=(cards, 256, 256), dtype=np.uint8)
+    latencies = [[] for _ in range(clients)]
+    connections = [InferenceClient(url) for _ in range(clients)]
+    stop_at = time.monotonic() + duration
+
+    def worker(index):
+        client = connections[index]
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            client.predict_batch(crops)
+            latencies[index].append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    return np.concatenate([np.array(l) for l in latencies]), elapsed
+
+def main(argv=None):
+    """ Einstiegspunkt für die Kommandozeile und run_pipeline.py """
+    parser = argparse.ArgumentParser(description="Lastgenerator für den Inferenz-Server")
+    parser.add_argument("--url", type=str, default=f"http://{HOST}:{PORT}", help="Adresse des Inferenz-Servers")
+    parser.add_argument("--clients", type=int, nargs="+", default=CLIENT_COUNTS, help="Anzahl gleichzeitiger Clients pro Stufe")
+    parser.add_argument("--duration", type=float, default=DURATION, help="Dauer jeder Stufe in Sekunden")
+    parser.add_argument("--cards", type=int, default=CARDS_PER_REQUEST, help="Crops pro Anfrage")
+    args = parser.parse_args(argv)
+
+    print(f"\n{'Clients':>8}{'Anfragen/s':>12}{'Crops/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}")
+    for clients in args.clients:
+        latencies, elapsed = run_clients(args.url, clients, args.duration, args.cards)
+        rate = len(latencies) / elapsed
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{clients:>8}{rate:>12.1f}{rate * args.cards:>10.1f}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+import numpy as np
+
+# Stufen des Live-Pfads in Anzeigereihenfolge (weitere Namen werden hinten angehängt)
+STAGES = ("capture", "detect", "warp", "inference", "draw", "display", "frame")
+
+# Rollierendes Fenster für Perzentile und Overlay
+WINDOW = 300
+
+# Grenzen der kumulativen Histogramm-Buckets in Sekunden (Prometheus-Konvention "le")
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Standard-Intervall für Snapshot-Dateien
+SNAPSHOT_INTERVAL = 5.0
+
+class StageStats:
+    """ Zeiten einer Stufe: rollierendes Fenster (Perzentile) plus kumulatives Histogramm seit Start """
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.buckets = [0] * (len(BUCKETS) + 1)  # letzter Bucket = +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def summary(self):
+        """ Kennzahlen des Fensters in Millisekunden """
+        window = np.array(self.samples) * 1000
+        if len(window) == 0:
+            return {"count": self.count}
+        return {
+            "count": self.count,
+            "mean_ms": round(float(window.mean()), 3),
+            "p50_ms": round(float(np.percentile(window, 50)), 3),
+            "p95_ms": round(float(np.percentile(window, 95)), 3),
+            "p99_ms": round(float(np.percentile(window, 99)), 3),
+            "max_ms": round(float(window.max()), 3),
+        }
+
+class StageTimer:
+    """ Kontextmanager für eine Messung (Klasse statt contextlib, um den Overhead klein zu halten) """
+
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+class StageMetrics:
+    """ Sammelt Stufenzeiten aus allen Threads (Aufnahme, Inferenz, Anzeige) """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.started = time.time()
+
+    def time(self, stage):
+        """ with metrics.time("detect"): ... """
+        return StageTimer(self, stage)
+
+    def record(self, stage, seconds):
+        """ Trägt eine gemessene Dauer (perf_counter-Differenz in Sekunden) ein """
+        with self.lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats(self.window)
+            stats.add(seconds)
+
+    def ordered(self):
+        """ Stufen in fester Reihenfolge, unbekannte Namen hinten """
+        names = [name for name in STAGES if name in self.stages]
+        return names + sorted(name for name in self.stages if name not in STAGES)
+
+    def snapshot(self):
+        """ Momentaufnahme aller Stufen als Dict (für JSON) """
+        with self.lock:
+            return {
+                "timestamp": time.time(),
+                "uptime_s": round(time.time() - self.started, 1),
+                "stages": {name: self.stages[name].summary() for name in self.ordered()},
+            }
+
+    def prometheus(self):
+        """ Momentaufnahme im Prometheus-Textformat (Histogramm pro Stufe plus p95 des Fensters) """
+        lines = [
+            "# HELP card_detector_stage_seconds Dauer der Stufen des Live-Detektors",
+            "# TYPE card_detector_stage_seconds histogram",
+        ]
+        p95 = []
+        with self.lock:
+            for name in self.ordered():
+                stats = self.stages[name]
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), stats.buckets):
+                    cumulative += count
+                    lines.append(f'card_detector_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'card_detector_stage_seconds_sum{{stage="{name}"}} {stats.total:.6f}')
+                lines.append(f'card_detector_stage_seconds_count{{stage="{name}"}} {stats.count}')
+                if stats.samples:
+                    p95.append(f'card_detector_stage_p95_seconds{{stage="{name}"}} {np.percentile(stats.samples, 95):.6f}')
+        lines += ["# HELP card_detector_stage_p95_seconds p95 der Stufe über das rollierende Fenster",
+                  "# TYPE card_detector_stage_p95_seconds gauge"] + p95
+        return "\n".join(lines) + "\n"
+
+    def overlay_lines(self):
+        """ Kurze Zeilen 'Stufe  p50 / p95 ms' fürs Einblenden in den Frame """
+        lines = []
+        with self.lock:
+            for name in self.ordered():
+                samples = self.stages[name].samples
+                if samples:
+                    p50, p95 = np.percentile(samples, [50, 95]) * 1000
+                    lines.append(f"{name:<9} {p50:6.1f} / {p95:6.1f} ms")
+        return lines
+
+    def write(self, path):
+        """ Schreibt eine Momentaufnahme atomar: .json als JSON, sonst Prometheus-Text (z.B. .prom) """
+        content = json.dumps(self.snapshot(), indent=2) if path.endswith(".json") else self.prometheus()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+class SnapshotWriter(threading.Thread):
+    """ Schreibt in festen Abständen Momentaufnahmen in eine Datei (z.B. für den node_exporter-Textfile-Collector) """
+
+    def __init__(self, metrics, path, interval=SNAPSHOT_INTERVAL):
+        super().__init__(daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.metrics.write(self.path)
+
+    def stop(self):
+        """ Beendet den Thread und schreibt einen letzten Stand """
+        self.stopped.set()
+        self.metrics.write(self.path)
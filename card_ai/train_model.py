@@ -1,49 +1,30 @@
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
-from tensorflow.keras import Sequential
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout, BatchNormalization
-from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.callbacks import ReduceLROnPlateau, EarlyStopping
-import matplotlib.pyplot as plt
 import os
+import json
+import time
+import shutil
 import argparse
 
-# Argumente definieren
-parser = argparse.ArgumentParser(description="Trainiere das Kartenmodell")
-parser.add_argument("--dataset", type=str, choices=["raw", "processed"], help="Wähle den Datensatz: 'raw' für unbearbeitete Bilder, 'processed' für vorverarbeitete Bilder")
-args = parser.parse_args()
+# Schwere Importe (TensorFlow, Datenpipeline) erst in den Funktionen, die sie brauchen:
+# so sind --help, Auswahlmenü und Fehlermeldungen sofort da.
 
 # Basisverzeichnis korrekt setzen
 BASE_DATASET_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "datasets"))
 
-# Falls kein Argument übergeben wurde -> Benutzer fragen
-if args.dataset is None:
-    print("\n🔍 Wähle den Datensatz für das Training:")
-    print("1️⃣ Rohbilder (raw_dataset)")
-    print("2️⃣ Vorverarbeitete Bilder (processed_dataset)")
-    
-    choice = input("\nGib '1' für Rohbilder oder '2' für verarbeitete Bilder ein: ").strip()
-
-    if choice == "1":
-        DATASET_DIR = os.path.join(BASE_DATASET_PATH, "raw")
-        print("📂 Training mit **Rohbildern** gestartet!")
-    elif choice == "2":
-        DATASET_DIR = os.path.join(BASE_DATASET_PATH, "processed_dataset")
-        print("📂 Training mit **vorverarbeiteten Bildern** gestartet!")
-    else:
-        print("❌ Ungültige Eingabe. Training abgebrochen.")
-        exit(1)
-else:
-    # Falls per Argument übergeben, direkt setzen
-    DATASET_DIR = os.path.join(BASE_DATASET_PATH, "processed_dataset") if args.dataset == "processed" else os.path.join(BASE_DATASET_PATH, "raw")
-    print(f"📂 Training mit Daten aus: {DATASET_DIR}")
+# Ordnernamen der wählbaren Datensätze ('warped' = entzerrte Karten aus warp_dataset.py)
+DATASET_DIRS = {"raw": "raw", "processed": "processed_dataset", "warped": "warped"}
 
-# Prüfen, ob der gewählte Ordner existiert
-if not os.path.exists(DATASET_DIR):
-    raise FileNotFoundError(f"❌ Der Dataset-Ordner '{DATASET_DIR}' wurde nicht gefunden! Stelle sicher, dass er existiert.")
+# Modell soll später hier gespeichert werden (absolut, unabhängig vom Arbeitsverzeichnis; gleiche
+# Umgebungsvariable wie inference_engine.py, damit Training und Erkennung dieselbe Datei meinen):
+MODEL_PATH = os.getenv("CARD_MODEL_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models", "card_model.h5")))
 
+# Checkpoints: Ordner neben dem Modell, gesichert wird nach jeder CHECKPOINT_EVERY-ten Epoche.
+# Nach erfolgreichem Speichern des fertigen Modells wird der Ordner wieder entfernt.
+CHECKPOINT_DIR = os.path.splitext(MODEL_PATH)[0] + "_checkpoint"
+CHECKPOINT_EVERY = 1
 
-# Modell soll später hier gespeichert werden:
-MODEL_PATH = os.getenv("DATASET_DIR", "../models/card_model.h5")
+# Interpolation, mit der die Loader auf die Netzgröße skalieren (steht im Modell-Manifest):
+# tf.data und ImageDataGenerator 'nearest', Packs werden mit INTER_AREA gepackt und per 'area' skaliert
+LOADER_RESIZE = {"tfdata": "nearest", "generator": "nearest", "pack": "area"}
 
 # Wie viele Epochen? (50 scheint erstmal gut, falls es zu Overfitting kommt, anpassen)
 EPOCHS = 50
@@ -52,112 +33,842 @@ EPOCHS = 50
 # Sollte so groß sein, wie der Speicher es zulässt. 16 ist sicher, aber wenn GPU stark genug, kann das hoch.
 BATCH_SIZE = 16  
 
-if not os.path.exists(DATASET_DIR):
-    raise FileNotFoundError(f"❌ Der Dataset-Ordner '{DATASET_DIR}' wurde nicht gefunden!")
+# CPU-Training: Thread-Pools (0 = TensorFlow-Standard), XLA ('auto' = Keras entscheidet, auf reinen CPU-Hosts aus),
+# Rechengenauigkeit und Gradienten-Akkumulation (effektiver Batch = batch_size * accumulate).
+# Die Werte können aus einer JSON-Datei kommen (Schlüssel wie die Optionen, z.B. "batch_size"),
+# --autotune schreibt die schnellste Einstellung nach TRAIN_CONFIG, das danach automatisch geladen wird.
+PRECISIONS = ("float32", "mixed_bfloat16")
+JIT_COMPILE = {"auto": None, "on": True, "off": False}  # None = jit_compile nicht übergeben, Keras wählt selbst
+CONFIG_KEYS = ("intra_threads", "inter_threads", "xla", "precision", "batch_size", "accumulate")
+TRAIN_CONFIG = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models", "train_config.json"))
+
+# Auto-Tune: Schritte zum Aufwärmen (Tracing, XLA-Kompilierung), gemessene Schritte pro Durchgang und
+# Durchgänge pro Einstellung (der schnellste zählt, gegen Ausreißer durch andere Last auf dem Host)
+AUTOTUNE_WARMUP = 3
+AUTOTUNE_STEPS = 15
+AUTOTUNE_REPEATS = 3
+AUTOTUNE_BATCH_SIZES = (16, 32, 64)
+
+# Wählbare Architekturen: bisheriges CNN (Flatten + Dense(512)), MobileNet-artig mit
+# depthwise-separable Convs, und das bisherige CNN mit Global-Average-Pooling-Kopf
+ARCHITECTURES = ("baseline", "separable", "gap")
+
+# Eingabegröße (quadratisch) - die Crops sind 256x256, kleinere Netze bekommen verkleinerte Bilder
+INPUT_SIZE = 256
+SWEEP_SIZES = (96, 128, 256)
+
+# Sweep: Epochen pro Kombination und Ablage der Modelle/Ergebnisse
+SWEEP_EPOCHS = 15
+SWEEP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models", "sweep"))
+
+# Inkrementelles Training: Anteil alter Bilder pro Klasse, die gegen das Vergessen mittrainiert werden,
+# Epochen nur für den neuen Kopf (Rumpf eingefroren) und danach für das ganze Netz mit kleiner Lernrate
+REPLAY = 0.2
+INCREMENTAL_EPOCHS = 5
+FINETUNE_EPOCHS = 10
+FINETUNE_LR = 0.0001
+
+def parse_args(argv=None):
+    """ Argumente definieren und einlesen (Werte aus --config bzw. TRAIN_CONFIG, Kommandozeile hat Vorrang) """
+    parser = argparse.ArgumentParser(description="Trainiere das Kartenmodell")
+    parser.add_argument("--dataset", type=str, choices=sorted(DATASET_DIRS), help="Wähle den Datensatz: 'raw' für unbearbeitete Bilder, 'processed' für vorverarbeitete Bilder, 'warped' für entzerrte Karten (warp_dataset.py)")
+    parser.add_argument("--loader", type=str, choices=["tfdata", "generator", "pack"], default="tfdata", help="Daten-Loader: 'tfdata' (einmal dekodiert & gecacht, parallele Augmentierung), 'generator' (ImageDataGenerator) oder 'pack' (memory-mapped Pack)")
+    parser.add_argument("--pack", type=str, help="Pfad zum Pack für --loader pack (Standard: datasets/packs/<dataset>)")
+    parser.add_argument("--cache", type=str, default="", help="Cache-Datei für dekodierte Bilder beim tf.data-Loader (leer = im Arbeitsspeicher)")
+    parser.add_argument("--dedup", action="store_true", help="Fast identische Aufnahmen (Perceptual-Hash-Index aus dedup_index.py) vor dem Aufteilen herausfiltern (nur --loader tfdata, Packs mit 'dataset_pack.py pack --dedup')")
+    parser.add_argument("--compare-loaders", action="store_true", help="Misst die Epochenzeit beider Loader (ohne Training) und beendet sich")
+    parser.add_argument("--arch", type=str, choices=ARCHITECTURES, default="baseline", help="Architektur: 'baseline' (Flatten + Dense 512), 'separable' (depthwise-separable, MobileNet-artig), 'gap' (Global Average Pooling statt Dense-Kopf)")
+    parser.add_argument("--input-size", type=int, default=INPUT_SIZE, help="Kantenlänge der Netz-Eingabe in Pixeln (z.B. 96, 128, 256)")
+    parser.add_argument("--sweep", action="store_true", help="Alle Kombinationen aus --archs und --sizes trainieren und Parameter, Größe, Latenz und Genauigkeit vergleichen")
+    parser.add_argument("--archs", nargs="+", choices=ARCHITECTURES, default=list(ARCHITECTURES), help="Architekturen für --sweep")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SWEEP_SIZES), help="Eingabegrößen für --sweep")
+    parser.add_argument("--sweep-epochs", type=int, default=SWEEP_EPOCHS, help="Maximale Epochen pro Kombination im Sweep (Early Stopping greift weiterhin)")
+    parser.add_argument("--config", type=str, help=f"JSON-Datei mit Trainings-Einstellungen (Standard: {TRAIN_CONFIG}, falls vorhanden)")
+    parser.add_argument("--intra-threads", type=int, default=0, help="Threads innerhalb einer Operation (0 = TensorFlow-Standard, meist alle Kerne)")
+    parser.add_argument("--inter-threads", type=int, default=0, help="Parallel laufende unabhängige Operationen (0 = TensorFlow-Standard)")
+    parser.add_argument("--xla", type=str, choices=sorted(JIT_COMPILE), default="auto", help="XLA-JIT-Kompilierung des Trainingsschritts")
+    parser.add_argument("--precision", type=str, choices=PRECISIONS, default="float32", help="'mixed_bfloat16' rechnet in bfloat16 (schnell auf CPUs mit AVX512-BF16/AMX), Gewichte bleiben float32")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Bilder pro Trainingsschritt")
+    parser.add_argument("--accumulate", type=int, default=1, help="Gradienten über so viele Batches sammeln, bevor die Gewichte aktualisiert werden (effektiver Batch = batch-size * accumulate)")
+    parser.add_argument("--autotune", action="store_true", help="Kurz Bilder/s für Threads, XLA, Genauigkeit und Batch-Größe messen, die schnellste Einstellung speichern und beenden")
+    parser.add_argument("--autotune-steps", type=int, default=AUTOTUNE_STEPS, help="Gemessene Trainingsschritte pro Einstellung beim Auto-Tune")
+    parser.add_argument("--resume", action="store_true", help="Abgebrochenes Training ab dem letzten Checkpoint fortsetzen (Datensatz, Architektur und Einstellungen kommen aus dem Checkpoint)")
+    parser.add_argument("--checkpoint-dir", type=str, default=CHECKPOINT_DIR, help="Ordner für Checkpoints des laufenden Trainings")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY, help="Checkpoint nach jeder N-ten Epoche (und immer, wenn Early Stopping greift)")
+    parser.add_argument("--incremental", action="store_true", help="Vorhandenes Modell weitertrainieren: Rumpf behalten, Softmax-Kopf um neue Klassen erweitern, nur neue/geänderte Bilder plus Replay alter Bilder")
+    parser.add_argument("--base-model", type=str, default=MODEL_PATH, help="Modell, von dem --incremental startet (braucht die Klassen-Map <modell>.classes.json daneben)")
+    parser.add_argument("--output", type=str, help="Ziel für das inkrementell trainierte Modell (Standard: --base-model überschreiben)")
+    parser.add_argument("--replay", type=float, default=REPLAY, help="Anteil alter Trainingsbilder pro Klasse, die bei --incremental mittrainiert werden")
+    parser.add_argument("--incremental-epochs", type=int, default=INCREMENTAL_EPOCHS, help="Epochen mit eingefrorenem Rumpf (nur der Kopf lernt)")
+    parser.add_argument("--finetune-epochs", type=int, default=FINETUNE_EPOCHS, help="Epochen Feintuning des ganzen Netzes danach (0 = aus)")
+    parser.add_argument("--compare-full", action="store_true", help="Nach --incremental von Null trainieren, bis dieselbe Genauigkeit erreicht ist, und die Zeiten vergleichen")
+
+    known, _ = parser.parse_known_args(argv)
+    config_path = known.config or (TRAIN_CONFIG if os.path.exists(TRAIN_CONFIG) else None)
+    if config_path and os.path.exists(config_path):
+        parser.set_defaults(**load_train_config(config_path))
+    elif config_path and not known.autotune:  # bei --autotune ist --config das Ziel und darf noch fehlen
+        raise FileNotFoundError(f"❌ Konfigurationsdatei nicht gefunden: {config_path}")
+    args = parser.parse_args(argv)
+    args.config = config_path
+    return args
+
+def load_train_config(path):
+    """ Liest Trainings-Einstellungen aus JSON, unbekannte Schlüssel sind ein Fehler (Tippfehler fallen sofort auf) """
+    with open(path, "r") as f:
+        config = json.load(f)
+    unknown = sorted(set(config) - set(CONFIG_KEYS))
+    if unknown:
+        raise ValueError(f"❌ Unbekannte Einstellungen in {path}: {unknown} (erlaubt: {list(CONFIG_KEYS)})")
+    print(f"⚙️ Trainings-Einstellungen aus: {path}")
+    return config
+
+def save_train_config(path, settings):
+    """ Schreibt die Einstellungen als JSON (nur die Schlüssel aus CONFIG_KEYS) """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({key: settings[key] for key in CONFIG_KEYS}, f, indent=2)
+
+def configure_runtime(args, verbose=True):
+    """ Thread-Pools und Genauigkeit setzen - muss vor der ersten TensorFlow-Operation passieren """
+    import tensorflow as tf
+
+    if args.intra_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(args.intra_threads)
+    if args.inter_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(args.inter_threads)
+    tf.keras.mixed_precision.set_global_policy(args.precision)
+    if verbose:
+        print(f"⚙️ Threads intra={args.intra_threads or 'auto'} inter={args.inter_threads or 'auto'} | XLA {args.xla} | "
+              f"{args.precision} | Batch {args.batch_size} x {args.accumulate} = {args.batch_size * args.accumulate}")
+
+def choose_dataset_dir(dataset):
+    """ Datensatz-Ordner bestimmen, ohne Argument wird der Benutzer gefragt """
+    if dataset is None:
+        print("\n🔍 Wähle den Datensatz für das Training:")
+        print("1️⃣ Rohbilder (raw_dataset)")
+        print("2️⃣ Vorverarbeitete Bilder (processed_dataset)")
+        print("3️⃣ Entzerrte Karten (warped, erstellt mit warp_dataset.py)")
+        
+        choice = input("\nGib '1' für Rohbilder, '2' für verarbeitete Bilder oder '3' für entzerrte Karten ein: ").strip()
+
+        if choice == "1":
+            dataset_dir = os.path.join(BASE_DATASET_PATH, "raw")
+            print("📂 Training mit **Rohbildern** gestartet!")
+        elif choice == "2":
+            dataset_dir = os.path.join(BASE_DATASET_PATH, "processed_dataset")
+            print("📂 Training mit **vorverarbeiteten Bildern** gestartet!")
+        elif choice == "3":
+            dataset_dir = os.path.join(BASE_DATASET_PATH, "warped")
+            print("📂 Training mit **entzerrten Karten** gestartet!")
+        else:
+            print("❌ Ungültige Eingabe. Training abgebrochen.")
+            exit(1)
+    else:
+        # Falls per Argument übergeben, direkt setzen
+        dataset_dir = os.path.join(BASE_DATASET_PATH, DATASET_DIRS[dataset])
+        print(f"📂 Training mit Daten aus: {dataset_dir}")
+
+    # Prüfen, ob der gewählte Ordner existiert
+    if not os.path.exists(dataset_dir):
+        raise FileNotFoundError(f"❌ Der Dataset-Ordner '{dataset_dir}' wurde nicht gefunden! Stelle sicher, dass er existiert.")
+    return dataset_dir
 
 # --- DATEN AUGMENTIERUNG ---
 # Hier bereite ich die Bilder vor, damit das Modell nicht nur exakt die gelernten Bilder erkennt,
 # sondern sich an Variationen gewöhnt. Falls Bilder zu einheitlich sind, hilft das.
-train_datagen = ImageDataGenerator(
-    rescale=1./255,  # Pixelwerte von 0-255 auf 0-1 normalisieren (hilft bei Training)
-    validation_split=0.2,  # 80% Training, 20% Validierung
-    rotation_range=45,  # Karten können leicht gedreht sein, also lernt Modell das mit
-    width_shift_range=0.4,  # Mal nach links/rechts verschieben, um Perspektiven mit abzudecken
-    height_shift_range=0.4,  
-    zoom_range=0.5,  # Manchmal gezoomt
-    shear_range=0.3,  # Verzerrungen, um realistische Kameraaufnahmen zu simulieren
-    brightness_range=[0.7, 1.3],  # Helligkeit variieren, damit es nicht immer gleiche Lichtbedingungen braucht
-    horizontal_flip=True  # Falls Karten mal seitenverkehrt sind (eventuell unnötig bei Karten, aber schadet nicht)
-)
-
-# --- TRAININGSDATEN LADEN ---
-train_generator = train_datagen.flow_from_directory(
-    DATASET_DIR,
-    target_size=(256, 256),  # Alle Bilder auf 256x256 skalieren
-    color_mode="grayscale",  # Weil Modell eh nur in Graustufen trainiert wird
-    batch_size=BATCH_SIZE,
-    class_mode="categorical",
-    subset="training"
-)
-
-# --- VALIDIERUNGSDATEN LADEN ---
-validation_generator = train_datagen.flow_from_directory(
-    DATASET_DIR,
-    target_size=(256, 256),
-    color_mode="grayscale",
-    batch_size=BATCH_SIZE,
-    class_mode="categorical",
-    subset="validation"
-)
-
-# --- MODELL AUFBAUEN ---
-# Das ist der Kern des CNN-Modells (Convolutional Neural Network)
-# Wichtig: Relu als Aktivierungsfunktion für Convolutional Layer
-# Softmax als letzte Aktivierung für Klassifizierung (weil mehrere Kartenklassen existieren)
-
-model = Sequential()
-
-# --- 1. Convolutional Block ---
-# 32 Filter, 3x3 Kernelgröße, aktiviert mit Relu
-model.add(Conv2D(32, (3, 3), activation='relu', input_shape=(256, 256, 1)))  
-model.add(BatchNormalization())  # Normalisiert Zwischenergebnisse, damit es stabiler trainiert
-model.add(MaxPooling2D((2, 2)))  # Pooling reduziert Bildgröße, damit das Modell sich auf Hauptmerkmale fokussiert
-model.add(Dropout(0.25))  # 25% der Neuronen werden zufällig deaktiviert, um Overfitting zu verhindern
-
-# --- 2. Convolutional Block ---
-model.add(Conv2D(64, (3, 3), activation='relu'))
-model.add(BatchNormalization())
-model.add(MaxPooling2D((2, 2)))
-model.add(Dropout(0.25))
-
-# --- 3. Convolutional Block ---
-model.add(Conv2D(128, (3, 3), activation='relu'))
-model.add(BatchNormalization())
-model.add(MaxPooling2D((2, 2)))
-model.add(Dropout(0.25))
-
-# --- 4. Convolutional Block (größter Layer) ---
-# Hier kommt richtig Power rein, 256 Filter
-model.add(Conv2D(256, (3, 3), activation='relu'))
-model.add(BatchNormalization())
-model.add(MaxPooling2D((2, 2)))
-model.add(Dropout(0.4))  # Höheres Dropout, weil Modell langsam Overfitting riskieren könnte
-
-# --- Vollständig vernetzte Schicht (DENSE) ---
-model.add(Flatten())  # Alle Features auf eine Zeile bringen
-model.add(Dense(512, activation='relu'))  # Dichte Schicht mit 512 Neuronen
-model.add(BatchNormalization())  # Normalisierung für stabileres Training
-model.add(Dropout(0.5))  # Höchste Dropout-Rate
-
-# --- OUTPUT SCHICHT ---
-num_classes = len(train_generator.class_indices)  # Anzahl der Klassen automatisch bestimmen
-model.add(Dense(num_classes, activation='softmax'))  # Softmax gibt Wahrscheinlichkeiten für jede Karte aus
-
-# --- OPTIMIERUNG UND LOSS-FUNKTION ---
-# Adam ist ein bewährter Optimizer, loss ist categorical_crossentropy weil mehrere Klassen existieren
-optimizer = Adam(learning_rate=0.001)
-model.compile(optimizer=optimizer, loss='categorical_crossentropy', metrics=['accuracy'])
-
-# --- CALLBACKS: AUTOMATISCHE ANPASSUNGEN ---
-# Falls Validierungs-Loss stagniert, dann wird Learning Rate halbiert
-reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, min_lr=0.00001)  
-
-# Falls Modell nach 10 Epochen nicht besser wird, Training abbrechen
-early_stopping = EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)  
-
-# --- TRAINING STARTEN ---
-# Hier startet das eigentliche Training. Callback-Funktionen helfen, falls es Probleme gibt.
-history = model.fit(
-    train_generator,
-    validation_data=validation_generator,
-    epochs=EPOCHS,
-    callbacks=[reduce_lr, early_stopping]
-)
-
-# --- MODELL SPEICHERN ---
-# Falls Ordner noch nicht existiert, erstelle ihn
-if not os.path.exists("models"):
-    os.makedirs("models")
-
-model.save(MODEL_PATH)
-print(f"✅ Modell gespeichert unter: {MODEL_PATH}")
+def build_generators(dataset_dir, batch_size=BATCH_SIZE, input_size=INPUT_SIZE):
+    """ Ursprünglicher Loader: ImageDataGenerator dekodiert & augmentiert jede Epoche neu in Python """
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+    train_datagen = ImageDataGenerator(
+        rescale=1./255,  # Pixelwerte von 0-255 auf 0-1 normalisieren (hilft bei Training)
+        validation_split=0.2,  # 80% Training, 20% Validierung
+        rotation_range=45,  # Karten können leicht gedreht sein, also lernt Modell das mit
+        width_shift_range=0.4,  # Mal nach links/rechts verschieben, um Perspektiven mit abzudecken
+        height_shift_range=0.4,  
+        zoom_range=0.5,  # Manchmal gezoomt
+        shear_range=0.3,  # Verzerrungen, um realistische Kameraaufnahmen zu simulieren
+        brightness_range=[0.7, 1.3],  # Helligkeit variieren, damit es nicht immer gleiche Lichtbedingungen braucht
+        horizontal_flip=True  # Falls Karten mal seitenverkehrt sind (eventuell unnötig bei Karten, aber schadet nicht)
+    )
+
+    # --- TRAININGSDATEN LADEN ---
+    train_generator = train_datagen.flow_from_directory(
+        dataset_dir,
+        target_size=(input_size, input_size),  # Alle Bilder auf 256x256 (bzw. --input-size) skalieren
+        color_mode="grayscale",  # Weil Modell eh nur in Graustufen trainiert wird
+        batch_size=batch_size,
+        class_mode="categorical",
+        subset="training"
+    )
+
+    # --- VALIDIERUNGSDATEN LADEN ---
+    validation_generator = train_datagen.flow_from_directory(
+        dataset_dir,
+        target_size=(input_size, input_size),
+        color_mode="grayscale",
+        batch_size=batch_size,
+        class_mode="categorical",
+        subset="validation"
+    )
+    return train_generator, validation_generator, train_generator.class_indices
+
+def pack_location(dataset_dir, args):
+    """ Pfad des Packs zu einem Datensatz-Ordner (--pack oder datasets/packs/<dataset>) """
+    pack_name = {folder: name for name, folder in DATASET_DIRS.items()}.get(os.path.basename(dataset_dir), "raw")
+    return args.pack or os.path.join(BASE_DATASET_PATH, "packs", pack_name)
+
+def validation_files(loader, dataset_dir, args, validation_data):
+    """ (Pfad, Label) der Validierungsbilder, die der Loader tatsächlich zurückgehalten hat
+
+    Der Generator teilt selbst auf (flow_from_directory, ohne --dedup), das Pack nach seinem eigenen
+    Dateibestand - ein Vergleich auf den split_dataset-Dateien würde dort auch Trainingsbilder bewerten.
+    """
+    if loader == "generator":
+        return list(zip(validation_data.filepaths, (int(label) for label in validation_data.classes)))
+    if loader == "pack":
+        from dataset_pack import PackedDataset
+        pack = PackedDataset(pack_location(dataset_dir, args))
+        _, val_idx = pack.split()
+        return [(os.path.join(dataset_dir, pack.files[i]), int(pack.labels[i])) for i in val_idx]
+    from dataset_files import split_dataset
+    _, _, val_files = split_dataset(dataset_dir, skip=args.skip)
+    return val_files
+
+def build_loader(loader, dataset_dir, args, input_size=INPUT_SIZE):
+    """ Liefert (Trainingsdaten, Validierungsdaten, class_indices) für den gewählten Loader """
+    batch_size = args.batch_size
+    if loader == "generator":
+        return build_generators(dataset_dir, batch_size, input_size)
+    if loader == "pack":
+        # Vorverarbeitete 256x256-Bilder direkt aus dem memory-mapped Pack (siehe dataset_pack.py)
+        from data_pipeline import build_pack_datasets
+        from dataset_pack import PackedDataset
+        return build_pack_datasets(PackedDataset(pack_location(dataset_dir, args)), batch_size, image_size=(input_size, input_size))
+    # tf.data: JPEGs nur einmal dekodieren, Augmentierung vektorisiert & parallel mit Prefetch
+    from data_pipeline import build_datasets
+    cache = f"{args.cache}.{input_size}" if args.cache and input_size != INPUT_SIZE else args.cache
+    if cache and args.skip:
+        cache += ".dedup"  # anderer Dateibestand -> eigener Cache
+    return build_datasets(dataset_dir, batch_size, (input_size, input_size), cache=cache, skip=args.skip)
+
+def time_epoch(data):
+    """ Zeit für einen kompletten Durchlauf über die Trainingsdaten (ohne Modell) """
+    start = time.perf_counter()
+    for i, _ in enumerate(data):
+        if i + 1 >= len(data):  # Generatoren laufen endlos
+            break
+    return time.perf_counter() - start
+
+def compare_loaders(dataset_dir, args):
+    """ Misst die Epochenzeit der Loader, ohne zu trainieren """
+    print("\n⏱️ Vergleiche Epochenzeit der Loader (2 Epochen, die erste füllt beim tf.data-Loader den Cache) ...")
+    loaders = ("generator", "tfdata", "pack") if args.loader == "pack" or args.pack else ("generator", "tfdata")
+    for loader in loaders:
+        train_data, _, _ = build_loader(loader, dataset_dir, args)
+        times = [time_epoch(train_data) for _ in range(2)]
+        print(f"📊 {loader:<10} Epoche 1: {times[0]:.2f}s | Epoche 2: {times[1]:.2f}s")
+
+def epoch_timer(loader):
+    """ Callback, der die Wall-Time jeder Epoche ausgibt """
+    from tensorflow.keras.callbacks import Callback
+
+    class EpochTimer(Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self.start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            print(f"⏱️ Epoche {epoch + 1}: {time.perf_counter() - self.start:.2f}s ({loader})")
+
+    return EpochTimer()
+
+def add_conv_blocks(model, input_size=INPUT_SIZE):
+    """ Die vier Convolutional Blocks des bisherigen CNN (für 'baseline' und 'gap') """
+    from tensorflow.keras.layers import Conv2D, MaxPooling2D, Dropout, BatchNormalization
+
+    # --- 1. Convolutional Block ---
+    # 32 Filter, 3x3 Kernelgröße, aktiviert mit Relu
+    model.add(Conv2D(32, (3, 3), activation='relu', input_shape=(input_size, input_size, 1)))  
+    model.add(BatchNormalization())  # Normalisiert Zwischenergebnisse, damit es stabiler trainiert
+    model.add(MaxPooling2D((2, 2)))  # Pooling reduziert Bildgröße, damit das Modell sich auf Hauptmerkmale fokussiert
+    model.add(Dropout(0.25))  # 25% der Neuronen werden zufällig deaktiviert, um Overfitting zu verhindern
+
+    # --- 2. Convolutional Block ---
+    model.add(Conv2D(64, (3, 3), activation='relu'))
+    model.add(BatchNormalization())
+    model.add(MaxPooling2D((2, 2)))
+    model.add(Dropout(0.25))
+
+    # --- 3. Convolutional Block ---
+    model.add(Conv2D(128, (3, 3), activation='relu'))
+    model.add(BatchNormalization())
+    model.add(MaxPooling2D((2, 2)))
+    model.add(Dropout(0.25))
+
+    # --- 4. Convolutional Block (größter Layer) ---
+    # Hier kommt richtig Power rein, 256 Filter
+    model.add(Conv2D(256, (3, 3), activation='relu'))
+    model.add(BatchNormalization())
+    model.add(MaxPooling2D((2, 2)))
+    model.add(Dropout(0.4))  # Höheres Dropout, weil Modell langsam Overfitting riskieren könnte
+
+def add_separable_blocks(model, input_size=INPUT_SIZE):
+    """ MobileNet-artiger Rumpf: ein normaler Conv-Stem, danach depthwise-separable Blocks """
+    from tensorflow.keras.layers import Conv2D, SeparableConv2D, MaxPooling2D, BatchNormalization, ReLU
+
+    # Stem mit Stride 2: halbiert die Auflösung sofort, danach ist jeder Block billig
+    model.add(Conv2D(32, (3, 3), strides=2, padding='same', use_bias=False, input_shape=(input_size, input_size, 1)))
+    model.add(BatchNormalization())
+    model.add(ReLU())
+
+    # Depthwise (3x3 pro Kanal) + Pointwise (1x1) statt voller 3x3-Faltung: ~8-9x weniger Rechenaufwand
+    for filters in (64, 128, 256):
+        model.add(SeparableConv2D(filters, (3, 3), padding='same', use_bias=False))
+        model.add(BatchNormalization())
+        model.add(ReLU())
+        model.add(MaxPooling2D((2, 2)))
+    model.add(SeparableConv2D(256, (3, 3), padding='same', use_bias=False))
+    model.add(BatchNormalization())
+    model.add(ReLU())
+
+def jit_options(xla):
+    """ compile()-Argumente für --xla: bei 'auto' keins, dann entscheidet Keras (jit_compile=None würde XLA abschalten) """
+    jit_compile = JIT_COMPILE[xla]
+    return {} if jit_compile is None else {"jit_compile": jit_compile}
+
+def adam(learning_rate, accumulate=1):
+    """ Adam, optional mit Gradienten-Akkumulation über mehrere Batches (gradient_accumulation_steps) """
+    from tensorflow.keras.optimizers import Adam
+    return Adam(learning_rate=learning_rate, gradient_accumulation_steps=accumulate if accumulate > 1 else None)
+
+def build_model(num_classes, architecture="baseline", input_size=INPUT_SIZE, xla="auto", accumulate=1):
+    """ Baut und kompiliert das CNN in der gewählten Architektur und Eingabegröße """
+    from tensorflow.keras import Sequential
+    from tensorflow.keras.layers import Flatten, Dense, Dropout, BatchNormalization, GlobalAveragePooling2D
+
+    # --- MODELL AUFBAUEN ---
+    # Das ist der Kern des CNN-Modells (Convolutional Neural Network)
+    # Wichtig: Relu als Aktivierungsfunktion für Convolutional Layer
+    # Softmax als letzte Aktivierung für Klassifizierung (weil mehrere Kartenklassen existieren)
+
+    model = Sequential()
+
+    if architecture == "separable":
+        add_separable_blocks(model, input_size)
+    else:
+        add_conv_blocks(model, input_size)
+
+    if architecture == "baseline":
+        # --- Vollständig vernetzte Schicht (DENSE) ---
+        model.add(Flatten())  # Alle Features auf eine Zeile bringen
+        model.add(Dense(512, activation='relu'))  # Dichte Schicht mit 512 Neuronen
+        model.add(BatchNormalization())  # Normalisierung für stabileres Training
+        model.add(Dropout(0.5))  # Höchste Dropout-Rate
+    else:
+        # --- Global Average Pooling ---
+        # Ein Mittelwert pro Feature-Map statt Flatten + Dense(512): der Kopf hat fast keine Parameter mehr
+        model.add(GlobalAveragePooling2D())
+        model.add(Dropout(0.3))
+
+    # --- OUTPUT SCHICHT ---
+    # Softmax gibt Wahrscheinlichkeiten für jede Karte aus (immer in float32, auch bei mixed_bfloat16)
+    model.add(Dense(num_classes, activation='softmax', dtype='float32'))
+
+    # --- OPTIMIERUNG UND LOSS-FUNKTION ---
+    # Adam ist ein bewährter Optimizer, loss ist categorical_crossentropy weil mehrere Klassen existieren
+    optimizer = adam(0.001, accumulate)
+    model.compile(optimizer=optimizer, loss='categorical_crossentropy', metrics=['accuracy'], **jit_options(xla))
+    return model
+
+def float32_model(model, num_classes, architecture, input_size):
+    """ Gleiches Netz mit float32-Policy und denselben Gewichten, damit die Inferenz nicht in bfloat16 läuft """
+    import tensorflow as tf
+
+    if model.dtype_policy.name == "float32":
+        return model
+    policy = tf.keras.mixed_precision.global_policy()
+    tf.keras.mixed_precision.set_global_policy("float32")
+    plain = build_model(num_classes, architecture, input_size)
+    tf.keras.mixed_precision.set_global_policy(policy)
+    plain.set_weights(model.get_weights())  # Gewichte sind auch bei mixed_bfloat16 float32-Variablen
+    return plain
+
+def probe_throughput(settings, architecture, input_size, num_classes, steps):
+    """ Bilder/s einer Einstellung auf synthetischen Batches (läuft in einem frischen Prozess) """
+    import numpy as np
+    import tensorflow as tf
+
+    configure_runtime(argparse.Namespace(**settings), verbose=False)
+    model = build_model(num_classes, architecture, input_size, settings["xla"], settings["accumulate"])
+    batch_size = settings["batch_size"]
+    rng = np.random.default_rng(0)
+    images = rng.random((batch_size, input_size, input_size, 1), dtype=np.float32)
+    labels = np.eye(num_classes, dtype=np.float32)[rng.integers(0, num_classes, batch_size)]
+    data = tf.data.Dataset.from_tensors((images, labels)).repeat()
+
+    model.fit(data, steps_per_epoch=AUTOTUNE_WARMUP, epochs=1, verbose=0)  # Tracing / XLA-Kompilierung
+    timings = []
+    for _ in range(AUTOTUNE_REPEATS):
+        start = time.perf_counter()
+        model.fit(data, steps_per_epoch=steps, epochs=1, verbose=0)
+        timings.append(time.perf_counter() - start)
+    return steps * batch_size / min(timings)
+
+def autotune(dataset_dir, args):
+    """ Misst Bilder/s für einige Einstellungen und speichert die schnellste
+
+    Thread-Pools lassen sich pro Prozess nur einmal setzen, darum läuft jede Messung in einem frischen
+    Prozess. Gesucht wird koordinatenweise: pro Einstellung alle Kandidaten, der beste Wert bleibt stehen.
+    Die Akkumulation wird nicht variiert (sie ändert den effektiven Batch, nicht den Durchsatz).
+    """
+    import multiprocessing
+
+    num_classes = sum(1 for d in os.listdir(dataset_dir) if os.path.isdir(os.path.join(dataset_dir, d)))
+    cpus = os.cpu_count() or 1
+    candidates = {
+        "xla": ["off", "on"],
+        "precision": list(PRECISIONS),
+        "batch_size": sorted(set(AUTOTUNE_BATCH_SIZES) | {args.batch_size}),
+        "intra_threads": sorted({0, max(1, cpus // 2), cpus}),
+        "inter_threads": [0, 1, 2],
+    }
+    context = multiprocessing.get_context("spawn")
+
+    def measure(settings):
+        with context.Pool(1) as pool:
+            rate = pool.apply(probe_throughput, (settings, args.arch, args.input_size, num_classes, args.autotune_steps))
+        print(f"📊 intra={settings['intra_threads'] or 'auto':<5} inter={settings['inter_threads'] or 'auto':<5} "
+              f"XLA {settings['xla']:<5} {settings['precision']:<15} Batch {settings['batch_size']:<4} {rate:8.1f} Bilder/s")
+        return rate
+
+    print(f"\n🧪 Auto-Tune ({args.arch} @ {args.input_size}x{args.input_size}, {args.autotune_steps} Schritte pro Messung, {cpus} Kerne)")
+    best = {key: getattr(args, key) for key in CONFIG_KEYS}
+    best_rate = measure(best)
+    for key, values in candidates.items():
+        for value in values:
+            if value == best[key]:
+                continue
+            settings = dict(best, **{key: value})
+            rate = measure(settings)
+            if rate > best_rate:
+                best, best_rate = settings, rate
+
+    path = args.config or TRAIN_CONFIG
+    save_train_config(path, best)
+    print(f"\n✅ Schnellste Einstellung ({best_rate:.1f} Bilder/s) gespeichert unter: {path}")
+    print(f"   {json.dumps(best)}")
+    return best
+
+def training_callbacks():
+    """ ReduceLROnPlateau + EarlyStopping wie beim normalen Training (in dieser Reihenfolge) """
+    from tensorflow.keras.callbacks import ReduceLROnPlateau, EarlyStopping
+
+    # --- CALLBACKS: AUTOMATISCHE ANPASSUNGEN ---
+    # Falls Validierungs-Loss stagniert, dann wird Learning Rate halbiert
+    reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, min_lr=0.00001)  
+
+    # Falls Modell nach 10 Epochen nicht besser wird, Training abbrechen
+    early_stopping = EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)  
+    return [reduce_lr, early_stopping]
+
+def accuracy_timer(target):
+    """ Callback, der das Training stoppt, sobald val_accuracy das Ziel erreicht, und die Zeit dafür merkt """
+    from tensorflow.keras.callbacks import Callback
+
+    class AccuracyTimer(Callback):
+        def on_train_begin(self, logs=None):
+            self.start = time.perf_counter()
+            self.reached_s = None
+
+        def on_epoch_end(self, epoch, logs=None):
+            if (logs or {}).get("val_accuracy", 0.0) >= target:
+                self.reached_s = time.perf_counter() - self.start
+                self.model.stop_training = True
+
+    return AccuracyTimer()
+
+def best_val_accuracy(history):
+    """ Beste Validierungsgenauigkeit eines fit()-Laufs oder eines History-Dicts (0, falls nicht gemessen) """
+    logs = getattr(history, "history", history)
+    return float(max(logs.get("val_accuracy", [0.0])))
+
+def callback_state(reduce_lr, early_stopping):
+    """ Zähler und Bestwerte von ReduceLROnPlateau und EarlyStopping (ohne Gewichte) als JSON-fähiges Dict """
+    def number(value):
+        return None if value is None else float(value)
+    return {
+        "reduce_lr": {"wait": reduce_lr.wait, "best": number(reduce_lr.best), "cooldown_counter": reduce_lr.cooldown_counter},
+        "early_stopping": {"wait": early_stopping.wait, "best": number(early_stopping.best),
+                           "best_epoch": early_stopping.best_epoch, "stopped_epoch": early_stopping.stopped_epoch},
+    }
+
+def write_checkpoint(directory, model, state, best_weights=None):
+    """ Schreibt Modell samt Optimizer-Zustand, beste Gewichte und Zustand; state.json zuletzt = Checkpoint vollständig """
+    import numpy as np
+
+    os.makedirs(directory, exist_ok=True)
+    # .keras enthält Gewichte und Optimizer-Variablen (Momente, Lernrate, Schrittzähler, Akkumulator)
+    model.save(os.path.join(directory, "model.partial.keras"))
+    os.replace(os.path.join(directory, "model.partial.keras"), os.path.join(directory, "model.keras"))
+    if best_weights is not None:
+        np.savez(os.path.join(directory, "best_weights.partial.npz"), *best_weights)
+        os.replace(os.path.join(directory, "best_weights.partial.npz"), os.path.join(directory, "best_weights.npz"))
+    tmp_path = os.path.join(directory, "state.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, "state.json"))
+
+def read_checkpoint(directory):
+    """ Zustand des letzten vollständigen Checkpoints (ohne TensorFlow zu laden) """
+    path = os.path.join(directory, "state.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"❌ Kein Checkpoint gefunden unter: {directory} \nOhne --resume neu trainieren!")
+    with open(path, "r") as f:
+        return json.load(f)
+
+def load_checkpoint_weights(directory):
+    """ Modell (kompiliert, mit Optimizer-Zustand) und beste Gewichte für EarlyStopping oder None """
+    import numpy as np
+    from tensorflow.keras.models import load_model
+
+    model = load_model(os.path.join(directory, "model.keras"))
+    best_path = os.path.join(directory, "best_weights.npz")
+    best_weights = None
+    if os.path.exists(best_path):
+        with np.load(best_path) as data:
+            best_weights = [data[f"arr_{i}"] for i in range(len(data.files))]
+    return model, best_weights
+
+def training_checkpoint(directory, every, reduce_lr, early_stopping, state, best_weights=None):
+    """ Callback: sichert regelmäßig Modell, Optimizer, Callback-Zustand und Epoche, stellt beim Fortsetzen alles wieder her
+
+    Muss nach ReduceLROnPlateau und EarlyStopping in der Callback-Liste stehen: die setzen ihren Zustand
+    in on_train_begin zurück und haben in on_epoch_end schon die aktuelle Epoche verarbeitet.
+    Position in den Daten ist die Epoche - gesichert wird an Epochengrenzen, danach beginnt ein neuer
+    Durchlauf (neu gemischt) über den tf.data-Cache.
+    """
+    from tensorflow.keras.callbacks import Callback
+
+    class TrainingCheckpoint(Callback):
+        def on_train_begin(self, logs=None):
+            self.start = time.perf_counter()
+            self.train_seconds = state["train_seconds"]
+            saved = state.get("callbacks")
+            if saved:
+                for callback, values in ((reduce_lr, saved["reduce_lr"]), (early_stopping, saved["early_stopping"])):
+                    for name, value in values.items():
+                        setattr(callback, name, value)
+                early_stopping.best_weights = best_weights
+
+        def on_epoch_end(self, epoch, logs=None):
+            for key, value in (logs or {}).items():
+                state["history"].setdefault(key, []).append(float(value))
+            state["epoch"] = epoch + 1
+            state["train_seconds"] = round(self.train_seconds + time.perf_counter() - self.start, 1)
+            if (epoch + 1) % every and not self.model.stop_training:
+                return
+            state["callbacks"] = callback_state(reduce_lr, early_stopping)
+            write_checkpoint(directory, self.model, state, early_stopping.best_weights)
+            print(f"\n💾 Checkpoint nach Epoche {epoch + 1}: {directory}")
+
+    return TrainingCheckpoint()
+
+def expand_head(base_model, num_classes, input_size):
+    """ Übernimmt alle Schichten bis auf den Softmax-Kopf und hängt einen größeren Kopf an
+
+    Die Gewichte der bisherigen Klassen werden in die ersten Spalten kopiert, neue Klassen starten zufällig.
+    """
+    from tensorflow.keras import Sequential, Input
+    from tensorflow.keras.layers import Dense
+
+    old_head = base_model.layers[-1]
+    head = Dense(num_classes, activation='softmax')
+    model = Sequential([Input((input_size, input_size, 1))] + base_model.layers[:-1] + [head])
+
+    old_kernel, old_bias = old_head.get_weights()
+    kernel, bias = head.get_weights()
+    kernel[:, :old_kernel.shape[1]] = old_kernel
+    bias[:old_bias.shape[0]] = old_bias
+    head.set_weights([kernel, bias])
+    return model
+
+def set_backbone_trainable(model, trainable):
+    """ (Ent-)friert den Faltungsrumpf ein: alle Schichten vor Flatten/GlobalAveragePooling2D """
+    for layer in model.layers:
+        if layer.__class__.__name__ in ("Flatten", "GlobalAveragePooling2D"):
+            break
+        layer.trainable = trainable
+
+def incremental_files(train_files, base_mtime, replay, added_labels=()):
+    """ Neue Klassen und seit dem Modell geänderte Bilder komplett, von den alten Bildern nur eine Replay-Stichprobe
+
+    Bilder der neuen Klassen (added_labels) zählen unabhängig von ihrer mtime als neu - beim Kopieren
+    bleibt das Änderungsdatum oft erhalten und kann älter als das Modell sein.
+    """
+    import random
+
+    added_labels = set(added_labels)
+    new_files, old_files = [], {}
+    for path, label in train_files:
+        if label in added_labels or os.path.getmtime(path) > base_mtime:
+            new_files.append((path, label))
+        else:
+            old_files.setdefault(label, []).append((path, label))
+
+    # Gleicher Anteil pro Klasse, damit keine alte Klasse komplett aus dem Training verschwindet
+    rng = random.Random(0)
+    replay_files = []
+    for files in old_files.values():
+        replay_files += rng.sample(files, max(1, round(len(files) * replay)) if replay > 0 else 0)
+    return new_files, replay_files
+
+def incremental_train(dataset_dir, args):
+    """ Warm-Start: vorhandenes Modell laden, Kopf um neue Klassen erweitern, nur auf neuen Daten plus Replay trainieren """
+    import tensorflow as tf
+    from tensorflow.keras.models import load_model
+    from data_pipeline import make_dataset
+    from dataset_files import split_dataset
+    from inference_engine import load_class_map, save_class_map, preprocessing_params
+
+    if not os.path.exists(args.base_model):
+        raise FileNotFoundError(f"❌ Basismodell nicht gefunden unter: {args.base_model} \nBitte trainiere das Modell zuerst!")
+    class_map = load_class_map(args.base_model)
+    if class_map is None:
+        raise FileNotFoundError(f"❌ Keine Klassen-Map neben {args.base_model} gefunden - einmal ohne --incremental trainieren!")
+
+    old_classes = class_map["classes"]
+    folders = sorted(d for d in os.listdir(dataset_dir) if os.path.isdir(os.path.join(dataset_dir, d)))
+    added = [card for card in folders if card not in old_classes]
+    classes = old_classes + added  # alte Indizes bleiben gleich, neue Klassen hinten anhängen
+    print(f"🔍 {len(old_classes)} bekannte Klassen, {len(added)} neue: {added}")
+
+    base_mtime = os.path.getmtime(args.base_model)
+    _, train_files, val_files = split_dataset(dataset_dir, classes=classes, skip=args.skip)
+    new_files, replay_files = incremental_files(train_files, base_mtime, args.replay, range(len(old_classes), len(classes)))
+    if not new_files and not added:
+        print("✅ Keine neuen oder geänderten Bilder seit dem letzten Training - nichts zu tun.")
+        return None
+    print(f"📂 {len(new_files)} neue/geänderte Bilder + {len(replay_files)} Replay-Bilder ({args.replay:.0%} der alten)")
+
+    # Der geladene Rumpf behält seine float32-Schichten; damit Kopf, gespeichertes Modell und Exporte nicht
+    # gemischt in bfloat16 landen, läuft das inkrementelle Training komplett in float32
+    if tf.keras.mixed_precision.global_policy().name != "float32":
+        print(f"⚠️ --precision {args.precision} gilt nicht für --incremental, trainiere in float32")
+        tf.keras.mixed_precision.set_global_policy("float32")
+
+    start = time.perf_counter()
+    base_model = load_model(args.base_model)
+    input_size = int(base_model.input_shape[1])
+    model = expand_head(base_model, len(classes), input_size)
+
+    image_size = (input_size, input_size)
+    train_data = make_dataset(new_files + replay_files, len(classes), args.batch_size, image_size, training=True)
+    validation_data = make_dataset(val_files, len(classes), args.batch_size, image_size)
+
+    # Phase 1: Rumpf eingefroren, nur der (neue) Kopf lernt die zusätzlichen Klassen
+    set_backbone_trainable(model, False)
+    model.compile(optimizer=adam(0.001, args.accumulate), loss='categorical_crossentropy', metrics=['accuracy'],
+                  **jit_options(args.xla))
+    history = model.fit(train_data, validation_data=validation_data, epochs=args.incremental_epochs,
+                        callbacks=[epoch_timer("incremental")])
+    accuracy = best_val_accuracy(history)
+
+    # Phase 2: ganzes Netz mit kleiner Lernrate nachziehen, damit sich der Rumpf an die neuen Bilder anpasst
+    if args.finetune_epochs > 0:
+        set_backbone_trainable(model, True)
+        model.compile(optimizer=adam(FINETUNE_LR, args.accumulate), loss='categorical_crossentropy', metrics=['accuracy'],
+                      **jit_options(args.xla))
+        history = model.fit(train_data, validation_data=validation_data, epochs=args.finetune_epochs,
+                            callbacks=training_callbacks() + [epoch_timer("finetune")])
+        accuracy = max(accuracy, best_val_accuracy(history))
+    train_s = time.perf_counter() - start
+
+    output = args.output or args.base_model
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    model.save(output)
+    # Zeit des letzten vollen Trainings weitergeben, damit spätere Läufe weiter dagegen vergleichen
+    full_train_s = class_map.get("full_train_seconds", class_map.get("train_seconds"))
+    save_class_map(output, classes, input_size=input_size, arch=class_map.get("arch"),
+                   preprocessing=preprocessing_params(LOADER_RESIZE["tfdata"]),  # make_dataset = tf.data-Pfad
+                   train_seconds=round(train_s, 1), full_train_seconds=full_train_s,
+                   val_accuracy=round(accuracy, 4), incremental=True, trained_at=time.time())
+    print(f"✅ Modell gespeichert unter: {output} ({len(classes)} Klassen)")
+
+    print(f"\n⏱️ Inkrementell: {train_s:.1f}s, Val-Genauigkeit {accuracy:.2%}")
+    if full_train_s:
+        print(f"⏱️ Letztes volles Training: {full_train_s:.1f}s (Val-Genauigkeit {class_map.get('val_accuracy', float('nan')):.2%})"
+              f" -> {full_train_s - train_s:.1f}s gespart")
+
+    if args.compare_full:
+        # Von Null mit allen Bildern trainieren, bis die inkrementelle Genauigkeit erreicht ist
+        print(f"\n🧪 Volles Training bis {accuracy:.2%} Val-Genauigkeit zum Vergleich ...")
+        tf.keras.backend.clear_session()
+        full_train = make_dataset(train_files, len(classes), args.batch_size, image_size, training=True)
+        full_model = build_model(len(classes), class_map.get("arch") or args.arch, input_size, args.xla, args.accumulate)
+        timer = accuracy_timer(accuracy)
+        full_model.fit(full_train, validation_data=validation_data, epochs=EPOCHS,
+                       callbacks=training_callbacks() + [timer, epoch_timer("full")])
+        if timer.reached_s is None:
+            print(f"⚠️ Volles Training hat {accuracy:.2%} in {EPOCHS} Epochen nicht erreicht")
+        else:
+            print(f"⏱️ Volles Training bis gleiche Genauigkeit: {timer.reached_s:.1f}s | inkrementell: {train_s:.1f}s "
+                  f"-> Faktor {timer.reached_s / train_s:.1f}")
+    return model
+
+def sweep(dataset_dir, args):
+    """ Trainiert jede Kombination aus Architektur und Eingabegröße und vergleicht Parameter, Größe, Latenz, Genauigkeit """
+    import tensorflow as tf
+    from export_model import evaluate
+    from inference_engine import InferenceEngine, preprocessing_params
+
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    rows = []
+    for architecture in args.archs:
+        for input_size in args.sizes:
+            print(f"\n🧪 Sweep: {architecture} @ {input_size}x{input_size}")
+            tf.keras.backend.clear_session()
+            train_data, validation_data, class_indices = build_loader(args.loader, dataset_dir, args, input_size=input_size)
+            model = build_model(len(class_indices), architecture, input_size, args.xla, args.accumulate)
+
+            start = time.perf_counter()
+            model.fit(train_data, validation_data=validation_data, epochs=args.sweep_epochs,
+                      callbacks=training_callbacks() + [epoch_timer(args.loader)])
+            train_s = time.perf_counter() - start
+
+            model_path = os.path.join(SWEEP_DIR, f"card_model_{architecture}_{input_size}.h5")
+            float32_model(model, len(class_indices), architecture, input_size).save(model_path)
+
+            # Genauigkeit und Latenz über denselben Pfad wie im Live-Betrieb (256er-Crops, Engine skaliert),
+            # bewertet auf den Bildern, die dieser Loader beim Training zurückgehalten hat
+            val_files = validation_files(args.loader, dataset_dir, args, validation_data)
+            engine = InferenceEngine(model_path)
+            engine.configure(preprocessing_params(LOADER_RESIZE[args.loader]))
+            accuracy, latency_ms = evaluate(engine, val_files)
+            rows.append({
+                "arch": architecture,
+                "input_size": input_size,
+                "params": int(model.count_params()),
+                "size_mb": round(os.path.getsize(model_path) / (1024 * 1024), 2),
+                "latency_ms": round(latency_ms, 3),
+                "val_accuracy": round(accuracy, 4),
+                "train_s": round(train_s, 1),
+                "model": model_path,
+            })
+
+    print(f"\n{'Architektur':<12}{'Größe':>7}{'Parameter':>12}{'MB':>8}{'Latenz (ms)':>13}{'Val-Genauigkeit':>17}{'Training (s)':>14}")
+    for row in sorted(rows, key=lambda row: row["latency_ms"]):
+        print(f"{row['arch']:<12}{row['input_size']:>7}{row['params']:>12,}{row['size_mb']:>8.2f}"
+              f"{row['latency_ms']:>13.2f}{row['val_accuracy']:>17.2%}{row['train_s']:>14.1f}")
+
+    results_path = os.path.join(SWEEP_DIR, "sweep_results.json")
+    with open(results_path, "w") as f:
+        json.dump(rows, f, indent=2)
+    print(f"\n✅ Sweep-Ergebnisse gespeichert unter: {results_path}")
+    return rows
+
+def main(argv=None):
+    """ Einstiegspunkt: Daten laden, Modell bauen, trainieren und speichern """
+    args = parse_args(argv)
+
+    # Beim Fortsetzen gilt, womit das Training begonnen wurde (nur Thread-Einstellungen sind pro Host)
+    checkpoint = None
+    if args.resume:
+        checkpoint = read_checkpoint(args.checkpoint_dir)
+        for key, value in checkpoint["settings"].items():
+            setattr(args, key, value)
+        dataset_dir = checkpoint["dataset_dir"]
+        if args.dataset and os.path.join(BASE_DATASET_PATH, DATASET_DIRS[args.dataset]) != dataset_dir:
+            raise ValueError(f"❌ Der Checkpoint wurde mit {dataset_dir} trainiert, nicht mit --dataset {args.dataset}!")
+        print(f"⏯️ Setze Training aus {args.checkpoint_dir} nach Epoche {checkpoint['epoch']} fort ({dataset_dir})")
+    else:
+        dataset_dir = choose_dataset_dir(args.dataset)
+
+    # Duplikate einmal bestimmen (Index wird dabei inkrementell aktualisiert), alle Loader-Aufrufe nutzen dieselbe Menge
+    args.skip = None
+    if args.dedup:
+        if args.loader != "tfdata":
+            raise ValueError("❌ --dedup filtert nur beim tf.data-Loader - für Packs 'dataset_pack.py pack --dedup' verwenden!")
+        from dedup_index import duplicate_filter
+        args.skip = duplicate_filter(dataset_dir)
+
+    if args.autotune:
+        return autotune(dataset_dir, args)
+
+    configure_runtime(args)
+
+    if args.compare_loaders:
+        compare_loaders(dataset_dir, args)
+        return
+
+    if args.sweep:
+        return sweep(dataset_dir, args)
+
+    if args.incremental:
+        return incremental_train(dataset_dir, args)
+
+    train_data, validation_data, class_indices = build_loader(args.loader, dataset_dir, args, input_size=args.input_size)
+
+    num_classes = len(class_indices)  # Anzahl der Klassen automatisch bestimmen
+    classes = sorted(class_indices, key=class_indices.get)
+
+    if checkpoint:
+        if checkpoint["classes"] != classes:
+            raise ValueError(f"❌ Klassen im Datensatz haben sich seit dem Checkpoint geändert: {checkpoint['classes']} -> {classes}")
+        model, best_weights = load_checkpoint_weights(args.checkpoint_dir)
+        state = checkpoint
+        # Hatte Early Stopping schon gegriffen, nur noch die besten Gewichte zurückholen und speichern
+        initial_epoch = EPOCHS if checkpoint["callbacks"]["early_stopping"]["stopped_epoch"] else checkpoint["epoch"]
+    else:
+        if os.path.exists(os.path.join(args.checkpoint_dir, "state.json")):
+            print(f"⚠️ Vorhandener Checkpoint in {args.checkpoint_dir} wird überschrieben (zum Fortsetzen --resume angeben)")
+        model = build_model(num_classes, args.arch, args.input_size, args.xla, args.accumulate)
+        best_weights = None
+        state = {
+            "dataset_dir": dataset_dir,
+            "classes": classes,
+            "settings": {key: getattr(args, key) for key in ("arch", "input_size", "loader", "dedup") + CONFIG_KEYS[2:]},
+            "epoch": 0,
+            "train_seconds": 0.0,
+            "history": {},
+        }
+        initial_epoch = 0
+
+    reduce_lr, early_stopping = training_callbacks()
+    checkpointer = training_checkpoint(args.checkpoint_dir, args.checkpoint_every, reduce_lr, early_stopping, state, best_weights)
+
+    # --- TRAINING STARTEN ---
+    # Hier startet das eigentliche Training. Callback-Funktionen helfen, falls es Probleme gibt.
+    try:
+        model.fit(
+            train_data,
+            validation_data=validation_data,
+            epochs=EPOCHS,
+            initial_epoch=initial_epoch,
+            callbacks=[reduce_lr, early_stopping, epoch_timer(args.loader), checkpointer]
+        )
+    except KeyboardInterrupt:
+        print(f"\n⏸️ Training abgebrochen nach Epoche {state['epoch']} - fortsetzen mit: python train_model.py --resume")
+        return None
+
+    # --- MODELL SPEICHERN ---
+    # Falls Ordner noch nicht existiert, erstelle ihn
+    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+
+    model = float32_model(model, num_classes, args.arch, args.input_size)
+    model.save(MODEL_PATH)
+    print(f"✅ Modell gespeichert unter: {MODEL_PATH}")
+
+    # Klassen in Ausgabe-Reihenfolge neben dem Modell ablegen: Erkennung und --incremental brauchen keine Ordnerliste
+    from inference_engine import save_class_map, preprocessing_params
+    save_class_map(MODEL_PATH, classes, input_size=args.input_size, arch=args.arch,
+                   preprocessing=preprocessing_params(LOADER_RESIZE[args.loader]),
+                   train_seconds=state["train_seconds"], val_accuracy=round(best_val_accuracy(state["history"]), 4),
+                   incremental=False, trained_at=time.time())
+
+    # Fertig gespeichert -> Checkpoint wird nicht mehr gebraucht
+    shutil.rmtree(args.checkpoint_dir, ignore_errors=True)
+    return state["history"]
+
+if __name__ == "__main__":
+    main()
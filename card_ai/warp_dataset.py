@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import cv2
+from multiprocessing import Pool
+from live_card_detector import detect_cards, crop_card, MIN_CARD_AREA, CARD_SIZE
+
+# Basisverzeichnis korrekt setzen
+BASE_DATASET_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "datasets"))
+
+# Entzerrte Karten landen hier (gleiche Klassenordner wie datasets/raw), Manifest mit Ecken pro Bild
+WARPED_DIR = os.path.join(BASE_DATASET_PATH, "warped")
+MANIFEST_NAME = ".manifest.json"
+
+# Version des Crop-Pfads: erhöhen, wenn sich detect_cards/crop_card ändern, dann wird alles neu gebaut
+WARP_VERSION = 1
+
+# Batch-Modus: Anzahl Prozesse (None = alle Kerne) und Bilder pro Arbeitspaket
+DEFAULT_WORKERS = None
+DEFAULT_CHUNKSIZE = 16
+
+# Manifest wird nach so vielen Bildern zwischengespeichert (Abbruch = Fortsetzen möglich)
+MANIFEST_SAVE_EVERY = 200
+
+# Debug-Modus (0 = aus, 1 = an)
+DEBUG = 1
+
+def log(msg):
+    """ Debug-Logger für schnelle Prints """
+    if DEBUG:
+        print(f"[LOG] {msg}")
+
+def params_hash(min_area):
+    """ Hash über alles, was den Crop beeinflusst - ändert er sich, wird alles neu gebaut """
+    params = {"version": WARP_VERSION, "min_area": min_area, "card_size": CARD_SIZE}
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def load_manifest(manifest_path, params):
+    """ Lädt das Manifest; bei anderen Parametern oder kaputter Datei wird neu begonnen """
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        log("⚠️ Manifest nicht lesbar, baue alles neu")
+        return {}
+    if manifest.get("params_hash") != params:
+        log("🔄 Crop-Parameter haben sich geändert, baue alles neu")
+        return {}
+    return manifest.get("files", {})
+
+def save_manifest(manifest_path, params, files):
+    """ Schreibt das Manifest atomar (erst temporäre Datei, dann umbenennen) """
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"params_hash": params, "files": files}, f)
+    os.replace(tmp_path, manifest_path)
+
+def warp_single_image(job):
+    """ Live-Pfad auf eine Aufnahme anwenden: größte Karte finden, entzerren, als Graustufen-PNG speichern """
+    key, img_path, output_path, min_area = job
+    frame = cv2.imread(img_path)
+    if frame is None:
+        log(f"❌ Fehler beim Laden: {img_path}")
+        return key, {"status": "error"}
+
+    contours = detect_cards(frame, min_area)
+    if not contours:
+        return key, {"status": "no_card"}
+
+    contour = contours[0]
+    crop = cv2.cvtColor(crop_card(frame, contour), cv2.COLOR_BGR2GRAY)
+    cv2.imwrite(output_path, crop)  # PNG: verlustfrei, die Kanten bleiben wie im Live-Betrieb
+    height, width = frame.shape[:2]
+    return key, {
+        "status": "ok",
+        "corners": contour.reshape(-1, 2).tolist(),
+        "frame_size": [width, height],
+        "area": float(cv2.contourArea(contour)),
+    }
+
+def collect_jobs(input_dir, output_dir, files, min_area, force=False):
+    """ Sammelt alle Aufnahmen, die neu sind oder sich seit dem letzten Lauf geändert haben """
+    jobs = []
+    sources = {}
+    for card in sorted(os.listdir(input_dir)):
+        card_path = os.path.join(input_dir, card)
+        if not os.path.isdir(card_path):
+            continue
+        output_card_path = os.path.join(output_dir, card)
+        os.makedirs(output_card_path, exist_ok=True)
+
+        for img_file in sorted(os.listdir(card_path)):
+            img_path = os.path.join(card_path, img_file)
+            output_path = os.path.join(output_card_path, os.path.splitext(img_file)[0] + ".png")
+            key = f"{card}/{img_file}"
+            stat = os.stat(img_path)
+            sources[key] = {"mtime": stat.st_mtime, "size": stat.st_size, "output": os.path.relpath(output_path, output_dir)}
+
+            entry = files.get(key)
+            unchanged = (
+                entry is not None
+                and entry["mtime"] == stat.st_mtime
+                and entry["size"] == stat.st_size
+                and (entry["status"] != "ok" or os.path.exists(output_path))
+            )
+            if force or not unchanged:
+                jobs.append((key, img_path, output_path, min_area))
+    return jobs, sources
+
+def remove_stale(output_dir, files, sources):
+    """ Entzerrte Bilder zu gelöschten Aufnahmen entfernen """
+    for key, entry in files.items():
+        if key not in sources and entry.get("status") == "ok":
+            stale = os.path.join(output_dir, entry["output"])
+            if os.path.exists(stale):
+                os.remove(stale)
+
+def build_warped_dataset(input_dir, output_dir=WARPED_DIR, min_area=MIN_CARD_AREA,
+                         workers=DEFAULT_WORKERS, chunksize=DEFAULT_CHUNKSIZE, force=False):
+    """ Baut (inkrementell) den Datensatz aus entzerrten Karten-Crops, parallel auf allen Kernen """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    params = params_hash(min_area)
+    files = load_manifest(manifest_path, params)
+    jobs, sources = collect_jobs(input_dir, output_dir, files, min_area, force)
+
+    remove_stale(output_dir, files, sources)
+    files = {key: entry for key, entry in files.items() if key in sources}
+
+    log(f"📂 {len(sources)} Aufnahmen gefunden, {len(jobs)} zu entzerren, {len(sources) - len(jobs)} unverändert")
+
+    start = time.perf_counter()
+    done = 0
+    pool = Pool(workers) if workers != 1 and len(jobs) > 1 else None
+    try:
+        results = pool.imap_unordered(warp_single_image, jobs, chunksize) if pool else map(warp_single_image, jobs)
+        for key, result in results:
+            # Kein Karten-Crop mehr (z.B. Aufnahme ersetzt) -> altes PNG darf nicht im Datensatz bleiben
+            if result["status"] != "ok":
+                stale = os.path.join(output_dir, sources[key]["output"])
+                if os.path.exists(stale):
+                    os.remove(stale)
+            files[key] = dict(sources[key], **result)
+            done += 1
+            if done % MANIFEST_SAVE_EVERY == 0:
+                save_manifest(manifest_path, params, files)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        save_manifest(manifest_path, params, files)
+
+    elapsed = time.perf_counter() - start
+    counts = {}
+    for entry in files.values():
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    log(f"⏱️ {done} Aufnahmen in {elapsed:.1f}s entzerrt")
+    print(f"🎯 Entzerrte Karten: {counts.get('ok', 0)} | ohne erkannte Karte: {counts.get('no_card', 0)} | "
+          f"Fehler: {counts.get('error', 0)} -> {output_dir}")
+    return files
+
+def main(argv=None):
+    """ Einstiegspunkt für die Kommandozeile und run_pipeline.py """
+    parser = argparse.ArgumentParser(description="Baut einen Datensatz aus entzerrten Karten (gleicher Crop-Pfad wie die Live-Erkennung)")
+    parser.add_argument("--dataset", type=str, choices=["raw", "processed"], default="raw", help="Quell-Datensatz mit den Aufnahmen")
+    parser.add_argument("--output", type=str, default=WARPED_DIR, help="Zielordner (Standard: datasets/warped)")
+    parser.add_argument("--min-area", type=int, default=MIN_CARD_AREA, help="Mindestfläche einer Kontur in Pixeln, wie in live_card_detector.py")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Anzahl paralleler Prozesse (Standard: alle Kerne, 1 = seriell)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Aufnahmen pro Arbeitspaket eines Prozesses")
+    parser.add_argument("--force", action="store_true", help="Alles neu entzerren, Manifest ignorieren")
+    args = parser.parse_args(argv)
+
+    input_dir = os.path.join(BASE_DATASET_PATH, "processed_dataset" if args.dataset == "processed" else "raw")
+    if not os.path.exists(input_dir):
+        raise FileNotFoundError(f"❌ Der Dataset-Ordner '{input_dir}' wurde nicht gefunden!")
+
+    build_warped_dataset(input_dir, args.output, args.min_area, args.workers, args.chunksize, args.force)
+
+if __name__ == "__main__":
+    main()
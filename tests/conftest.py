@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Die Skripte in card_ai/ importieren sich gegenseitig als Geschwister-Module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "card_ai")))
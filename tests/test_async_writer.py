@@ -0,0 +1,33 @@
+import os
+import threading
+
+import numpy as np
+
+from async_writer import AsyncImageWriter
+
+FRAME = np.zeros((16, 16, 3), dtype=np.uint8)
+
+def close_within(writer, seconds=5):
+    """ close() in einem Thread aufrufen und prüfen, dass es zurückkehrt """
+    closer = threading.Thread(target=writer.close, daemon=True)
+    closer.start()
+    closer.join(seconds)
+    return not closer.is_alive()
+
+def test_writes_frames(tmp_path):
+    writer = AsyncImageWriter(threads=2, block=True)
+    for i in range(5):
+        writer.submit(str(tmp_path / f"img{i}.jpg"), FRAME)
+    assert close_within(writer)
+    assert writer.written == 5 and writer.failed == 0
+    assert len(os.listdir(tmp_path)) == 5
+
+def test_unwritable_paths_are_counted_and_close_returns(tmp_path):
+    writer = AsyncImageWriter(threads=1, queue_size=2, block=True)
+    writer.submit(str(tmp_path / "fehlt" / "img1.jpg"), FRAME)  # Ordner existiert nicht
+    writer.submit(str(tmp_path / "img2.unbekannt"), FRAME)  # keine Kodierung für diese Endung
+    for i in range(4):  # Queue ist klein: hängt der Worker, blockiert schon submit
+        writer.submit(str(tmp_path / f"ok{i}.jpg"), FRAME)
+
+    assert close_within(writer)
+    assert writer.failed == 2 and writer.written == 4
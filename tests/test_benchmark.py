@@ -0,0 +1,15 @@
+import cv2
+import numpy as np
+
+import benchmark
+
+def test_sample_frames_skips_files_next_to_class_folders(tmp_path, monkeypatch):
+    (tmp_path / "hearts_2").mkdir()
+    cv2.imwrite(str(tmp_path / "hearts_2" / "img1.jpg"), np.zeros((8, 8, 3), dtype=np.uint8))
+    (tmp_path / "hearts_2" / ".DS_Store").write_bytes(b"")
+    (tmp_path / ".dedup_index.json").write_text("{}")  # alter Index im Datensatz-Ordner
+    monkeypatch.setattr(benchmark, "RAW_DATA_DIR", str(tmp_path))
+
+    frames = benchmark.sample_frames(10)
+
+    assert len(frames) == 1 and frames[0].shape == (8, 8, 3)
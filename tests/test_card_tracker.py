@@ -0,0 +1,59 @@
+import numpy as np
+
+from card_tracker import CardTracker
+
+CONTOUR = np.array([[[10, 10]], [[110, 10]], [[110, 160]], [[10, 160]]], dtype=np.int32)
+
+# Helligkeit steigt bzw. fällt von links nach rechts -> dHash unterscheidet sich in allen 64 Bit
+CARD_A = np.tile(np.arange(0, 256, dtype=np.uint8), (256, 1))
+CARD_B = CARD_A[:, ::-1].copy()
+
+def classifier(probabilities):
+    """ Liefert für jeden Crop dieselbe Wahrscheinlichkeitsverteilung und zählt die Aufrufe """
+    calls = []
+
+    def classify_batch(batch):
+        calls.append(len(batch))
+        return np.tile(np.asarray(probabilities, dtype=np.float32), (len(batch), 1))
+
+    return classify_batch, calls
+
+def test_unchanged_card_is_not_reclassified():
+    tracker = CardTracker(refresh_interval=3600)
+    classify, calls = classifier([1.0, 0.0])
+    tracker.update([CONTOUR], [CARD_A], classify)
+    tracks = tracker.update([CONTOUR], [CARD_A], classify)
+
+    assert calls == [1]
+    assert tracker.classifications == 1 and tracker.detections == 2
+    assert tracks[0].id == 1
+
+def test_swapped_card_takes_new_label_on_next_update():
+    tracker = CardTracker(refresh_interval=3600)
+    classify_a, _ = classifier([1.0, 0.0])
+    for _ in range(3):
+        tracker.update([CONTOUR], [CARD_A], classify_a)
+
+    classify_b, calls = classifier([0.0, 1.0])
+    track = tracker.update([CONTOUR], [CARD_B], classify_b)[0]
+
+    assert calls == [1]
+    assert track.id == 1  # gleiche Position -> gleicher Track
+    assert int(np.argmax(track.probabilities())) == 1
+    np.testing.assert_allclose(track.probabilities(), [0.0, 1.0])
+
+def test_stale_refresh_keeps_smoothing_window():
+    tracker = CardTracker(refresh_interval=0.0)
+    tracker.update([CONTOUR], [CARD_A], classifier([1.0, 0.0])[0])
+    track = tracker.update([CONTOUR], [CARD_A], classifier([0.0, 1.0])[0])[0]
+
+    assert len(track.predictions) == 2
+    np.testing.assert_allclose(track.probabilities(), [0.5, 0.5])
+
+def test_lost_card_is_forgotten_after_max_missed():
+    tracker = CardTracker(max_missed=1)
+    tracker.update([CONTOUR], [CARD_A], classifier([1.0, 0.0])[0])
+    tracker.update([], [], classifier([1.0, 0.0])[0])
+    assert len(tracker.tracks) == 1
+    tracker.update([], [], classifier([1.0, 0.0])[0])
+    assert tracker.tracks == []
@@ -0,0 +1,103 @@
+import json
+
+import numpy as np
+import pytest
+
+from inference_engine import (save_class_map, load_class_map, require_class_map, check_class_map, class_map_path,
+                              preprocessing_params, InferenceEngine, CLASS_MAP_VERSION)
+
+CLASSES = ["hearts_2", "hearts_3", "hearts_ace"]
+
+def engine(num_classes=3, size=96):
+    """ Engine ohne geladenes Modell (kein TensorFlow), nur Form und Vorverarbeitung """
+    fake = InferenceEngine.__new__(InferenceEngine)
+    fake.num_classes = num_classes
+    fake.input_shape = (size, size, 1)
+    fake._input = None
+    return fake
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / "card_model.h5"
+    path.write_bytes(b"modell-gewichte")
+    return str(path)
+
+def test_manifest_contents(model_path):
+    save_class_map(model_path, CLASSES, input_size=96, arch="separable", preprocessing=preprocessing_params("nearest"))
+
+    class_map = load_class_map(model_path)
+    assert class_map_path(model_path).endswith("card_model.classes.json")
+    assert class_map["version"] == CLASS_MAP_VERSION
+    assert class_map["classes"] == CLASSES
+    assert class_map["input_shape"] == [96, 96, 1]
+    assert class_map["preprocessing"]["resize"] == "nearest"
+    assert len(class_map["model_sha256"]) == 64
+
+def test_copied_manifest_gets_hash_of_new_file_but_keeps_preprocessing(model_path, tmp_path):
+    save_class_map(model_path, CLASSES, input_size=96, preprocessing=preprocessing_params("nearest"))
+    variant = tmp_path / "card_model_int8.tflite"
+    variant.write_bytes(b"andere-bytes")
+
+    save_class_map(str(variant), **load_class_map(model_path))
+
+    copied = load_class_map(str(variant))
+    assert copied["model_sha256"] != load_class_map(model_path)["model_sha256"]
+    assert copied["preprocessing"]["resize"] == "nearest"
+    check_class_map(copied, engine(), str(variant))
+
+def test_matching_manifest_passes(model_path):
+    save_class_map(model_path, CLASSES, input_size=96)
+    check_class_map(load_class_map(model_path), engine(), model_path)
+
+@pytest.mark.parametrize("model_engine, message", [(engine(num_classes=4), "Ausgaben"), (engine(size=128), "Eingabeform")])
+def test_mismatching_model_is_rejected(model_path, model_engine, message):
+    save_class_map(model_path, CLASSES, input_size=96)
+    with pytest.raises(ValueError, match=message):
+        check_class_map(load_class_map(model_path), model_engine, model_path)
+
+def test_replaced_model_file_is_rejected(model_path):
+    save_class_map(model_path, CLASSES, input_size=96)
+    with open(model_path, "wb") as f:
+        f.write(b"neues-modell")
+    with pytest.raises(ValueError, match="ersetzt"):
+        check_class_map(load_class_map(model_path), engine(), model_path)
+
+def test_legacy_map_is_checked_against_output_size_only(model_path):
+    with open(class_map_path(model_path), "w") as f:
+        json.dump({"classes": CLASSES}, f)
+    check_class_map(load_class_map(model_path), engine(size=256), model_path)
+    with pytest.raises(ValueError):
+        check_class_map(load_class_map(model_path), engine(num_classes=2), model_path)
+
+def test_missing_manifest_is_an_error(model_path):
+    assert load_class_map(model_path) is None
+    with pytest.raises(FileNotFoundError):
+        require_class_map(model_path)
+
+def test_engine_resizes_like_the_training_loader(model_path):
+    crop = np.arange(256 * 256, dtype=np.uint32).reshape(1, 256, 256) % 251
+    crop = crop.astype(np.uint8)
+    area, nearest = engine(), engine()
+
+    save_class_map(model_path, CLASSES, input_size=96, preprocessing=preprocessing_params("nearest"))
+    check_class_map(load_class_map(model_path), nearest, model_path)
+
+    assert area.resize_method == "area" and nearest.resize_method == "nearest"
+    # tf.image.resize(method="nearest") nimmt Quellpixel floor((i + 0.5) * 256 / 96)
+    index = ((np.arange(96) + 0.5) * 256 / 96).astype(int)
+    expected = crop[0][index[:, np.newaxis], index] / np.float32(255)
+    assert np.allclose(nearest.preprocess(crop)[0, ..., 0], expected)
+    assert not np.allclose(area.preprocess(crop)[0, ..., 0], expected)
+
+def test_manifest_pixel_scale_is_used(model_path):
+    save_class_map(model_path, CLASSES, input_size=96, preprocessing=dict(preprocessing_params("area"), pixel_scale=1.0))
+    scaled = engine()
+    check_class_map(load_class_map(model_path), scaled, model_path)
+
+    assert scaled.preprocess(np.full((1, 96, 96), 200, dtype=np.uint8)).max() == 200
+
+def test_unknown_resize_method_is_rejected(model_path):
+    save_class_map(model_path, CLASSES, input_size=96, preprocessing=preprocessing_params("bicubic"))
+
+    with pytest.raises(ValueError, match="bicubic"):
+        check_class_map(load_class_map(model_path), engine(), model_path)
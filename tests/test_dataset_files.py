@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+from dataset_files import split_dataset, is_validation
+from dataset_pack import PackedDataset
+
+def make_dataset(root, layout):
+    """ Legt <root>/<klasse>/<datei> mit leerem Inhalt an """
+    for card, names in layout.items():
+        (root / card).mkdir()
+        for name in names:
+            (root / card / name).write_bytes(b"")
+    return str(root)
+
+def test_split_ignores_non_image_files(tmp_path):
+    dataset_dir = make_dataset(tmp_path, {
+        "hearts_2": ["img1.jpg", "img2.JPG", "img3.png", "img4.jpeg", ".DS_Store", "notes.txt"],
+        "hearts_3": ["img1.jpg", ".manifest.json"],
+    })
+    (tmp_path / ".dedup_index.json").write_text("{}")
+
+    classes, train_files, val_files = split_dataset(dataset_dir, validation_split=0.25)
+
+    assert classes == ["hearts_2", "hearts_3"]
+    names = sorted(path.rsplit("/", 1)[-1] for path, _ in train_files + val_files)
+    assert names == ["img1.jpg", "img1.jpg", "img2.JPG", "img3.png", "img4.jpeg"]
+
+def test_split_uses_given_class_order_and_skip(tmp_path):
+    dataset_dir = make_dataset(tmp_path, {"hearts_2": ["a.jpg", "b.jpg"], "hearts_ace": ["a.jpg"]})
+
+    classes, train_files, _ = split_dataset(dataset_dir, validation_split=0.0, classes=["hearts_ace", "hearts_2"],
+                                            skip={"hearts_2/b.jpg"})
+
+    assert classes == ["hearts_ace", "hearts_2"]
+    assert sorted((path.rsplit("/", 2)[-2], label) for path, label in train_files) == [("hearts_2", 1), ("hearts_ace", 0)]
+
+def test_split_is_stable_when_captures_are_added(tmp_path):
+    names = [f"img{i:03d}.jpg" for i in range(200)]
+    (tmp_path / "before").mkdir()
+    (tmp_path / "after").mkdir()
+    before = make_dataset(tmp_path / "before", {"hearts_2": names[:100]})
+    after = make_dataset(tmp_path / "after", {"hearts_2": names})
+
+    _, _, val_before = split_dataset(before)
+    _, train_after, val_after = split_dataset(after)
+
+    name = lambda files: {path.rsplit("/", 1)[-1] for path, _ in files}
+    # Alte Validierungsbilder bleiben Validierung, keines rutscht durch neue Aufnahmen ins Training
+    assert name(val_before) <= name(val_after)
+    assert not name(val_before) & name(train_after)
+    assert 20 <= len(val_after) <= 60  # etwa 20% von 200
+
+def test_is_validation_ignores_path_separator():
+    assert is_validation("hearts_2/img1.jpg", 0.5) == is_validation("hearts_2" + os.sep + "img1.jpg", 0.5)
+    assert not is_validation("hearts_2/img1.jpg", 0.0)
+    assert is_validation("hearts_2/img1.jpg", 1.0)
+
+def test_pack_split_matches_split_dataset(tmp_path):
+    dataset_dir = make_dataset(tmp_path, {"hearts_2": [f"a{i}.jpg" for i in range(30)], "hearts_3": [f"b{i}.jpg" for i in range(30)]})
+    classes, train_files, val_files = split_dataset(dataset_dir, validation_split=0)
+    _, _, val_files = split_dataset(dataset_dir)
+
+    pack = PackedDataset.__new__(PackedDataset)  # ohne Pack-Dateien, nur Index
+    pack.classes = classes
+    pack.files = [os.path.relpath(path, dataset_dir) for path, _ in train_files]
+    pack.labels = np.array([label for _, label in train_files])
+
+    _, val_idx = pack.split()
+    assert [pack.files[i] for i in val_idx] == [os.path.relpath(path, dataset_dir) for path, _ in val_files]
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+from dedup_index import group_duplicates, select_keep, duplicates, hamming, main, index_path, load_index, save_index
+
+def entry(value):
+    return {"mtime": 0.0, "size": 0, "hash": None if value is None else f"{value:016x}"}
+
+def test_hamming_counts_differing_bits():
+    hashes = np.array([0, 0b1011, 2**64 - 1], dtype=np.uint64)
+    assert hamming(hashes, 0).tolist() == [0, 3, 64]
+
+def test_groups_stay_within_class_and_join_nearest_leader():
+    files = {
+        "hearts_2/a.jpg": entry(0x0),
+        "hearts_2/b.jpg": entry(0x3),  # 2 Bit von a
+        "hearts_2/c.jpg": entry(0xFFFF),  # 16 Bit von a -> eigene Gruppe
+        "hearts_2/d.jpg": entry(0xFFFE),  # 1 Bit von c
+        "hearts_3/a.jpg": entry(0x0),  # gleicher Hash, andere Klasse
+        "hearts_3/x.jpg": entry(None),  # nicht lesbar -> eigene Gruppe
+    }
+
+    groups = group_duplicates(files, max_distance=8)
+
+    assert groups["hearts_2"] == [["hearts_2/a.jpg", "hearts_2/b.jpg"], ["hearts_2/c.jpg", "hearts_2/d.jpg"]]
+    assert groups["hearts_3"] == [["hearts_3/a.jpg"], ["hearts_3/x.jpg"]]
+    assert duplicates(groups, keep=1) == {"hearts_2/b.jpg", "hearts_2/d.jpg"}
+
+def test_select_keep_spreads_over_group():
+    group = [f"img{i}" for i in range(10)]
+    assert select_keep(group, 1) == ["img0"]
+    assert select_keep(group, 3) == ["img0", "img3", "img6"]
+    assert select_keep(group[:2], 5) == ["img0", "img1"]
+
+@pytest.mark.parametrize("keep", [0, -1])
+def test_select_keep_rejects_keeping_nothing(keep):
+    with pytest.raises(ValueError):
+        select_keep(["img0", "img1"], keep)
+
+@pytest.mark.parametrize("argv", [["report", "--keep", "0"], ["prune", "--keep", "-2"], ["report", "--max-distance", "65"]])
+def test_cli_rejects_invalid_limits(argv):
+    with pytest.raises(SystemExit) as error:
+        main(argv)
+    assert error.value.code == 2
+
+def test_index_is_stored_outside_the_class_tree(tmp_path):
+    dataset_dir = tmp_path / "raw"
+    (dataset_dir / "hearts_2").mkdir(parents=True)
+    files = {"hearts_2/a.jpg": entry(0x3)}
+
+    save_index(str(dataset_dir), files)
+
+    assert index_path(str(dataset_dir)) == str(tmp_path / ".dedup" / "raw.json")
+    assert os.listdir(dataset_dir) == ["hearts_2"]
+    assert load_index(str(dataset_dir)) == files
+
+def test_legacy_index_is_moved_out_of_the_dataset(tmp_path):
+    dataset_dir = tmp_path / "raw"
+    dataset_dir.mkdir()
+    save_index(str(dataset_dir), {"hearts_2/a.jpg": entry(0x3)})
+    os.replace(index_path(str(dataset_dir)), dataset_dir / ".dedup_index.json")
+
+    assert load_index(str(dataset_dir)) == {"hearts_2/a.jpg": entry(0x3)}
+    assert os.listdir(dataset_dir) == []
@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pytest
+
+from enhance_images import check_prescreen, enhance_image, PRESCREEN_FLAGS, PRESCREEN_REDUCTION, TARGET_SIZE
+
+RAW_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "datasets", "raw"))
+
+def test_prescreen_is_opt_in():
+    assert PRESCREEN_REDUCTION == 0
+
+@pytest.mark.skipif(not os.path.isdir(RAW_DIR), reason="keine Beispiel-Rohdaten")
+@pytest.mark.parametrize("reduction", sorted(PRESCREEN_FLAGS))
+def test_prescreen_rejects_nothing_sharp_in_raw_images(reduction):
+    assert check_prescreen(reduction, RAW_DIR) == []
+
+def test_collect_jobs_skips_non_image_files(tmp_path, monkeypatch):
+    import enhance_images
+
+    card = tmp_path / "raw" / "hearts_2"
+    card.mkdir(parents=True)
+    for name in ("img1.jpg", "img2.PNG", ".DS_Store", "notes.txt"):
+        (card / name).write_bytes(b"")
+    (tmp_path / "raw" / ".dedup_index.json").write_text("{}")
+    monkeypatch.setattr(enhance_images, "INPUT_DIR", str(tmp_path / "raw"))
+    monkeypatch.setattr(enhance_images, "OUTPUT_DIR", str(tmp_path / "processed"))
+
+    jobs, sources = enhance_images.collect_jobs({})
+
+    assert sorted(sources) == ["hearts_2/img1.jpg", "hearts_2/img2.PNG"]
+    assert sorted(job[0] for job in jobs) == sorted(sources)
+
+@pytest.mark.parametrize("workers", ["0", "-1"])
+def test_cli_rejects_less_than_one_worker(workers):
+    import enhance_images
+
+    with pytest.raises(SystemExit) as error:
+        enhance_images.main(["--workers", workers])
+    assert error.value.code == 2
+
+def test_enhance_image_returns_one_gray_channel():
+    img = np.zeros((480, 640, 3), dtype=np.uint8)
+    img[100:380, 200:400] = (200, 220, 240)  # helle Karte auf dunklem Grund
+
+    out = enhance_image(img)
+
+    assert out.shape == (TARGET_SIZE[1], TARGET_SIZE[0]) and out.dtype == np.uint8
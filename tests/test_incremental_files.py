@@ -0,0 +1,42 @@
+import os
+
+from train_model import incremental_files
+
+BASE_MTIME = 1_000_000.0
+
+def make_files(tmp_path, card, count, mtime, label):
+    """ count leere Bilder einer Klasse mit fester mtime als (Pfad, Label)-Liste """
+    (tmp_path / card).mkdir()
+    files = []
+    for i in range(count):
+        path = tmp_path / card / f"img{i}.jpg"
+        path.write_bytes(b"")
+        os.utime(path, (mtime, mtime))
+        files.append((str(path), label))
+    return files
+
+def test_added_class_with_old_mtime_is_fully_used(tmp_path):
+    old = make_files(tmp_path, "hearts_2", 10, BASE_MTIME - 100, 0)
+    added = make_files(tmp_path, "hearts_3", 4, BASE_MTIME - 100, 1)  # mit erhaltener, älterer mtime kopiert
+
+    new_files, replay_files = incremental_files(old + added, BASE_MTIME, 0.2, added_labels=[1])
+
+    assert sorted(new_files) == sorted(added)
+    assert len(replay_files) == 2 and all(label == 0 for _, label in replay_files)
+
+def test_changed_images_of_known_classes_are_new(tmp_path):
+    old = make_files(tmp_path, "hearts_2", 5, BASE_MTIME - 100, 0)
+    changed = make_files(tmp_path, "hearts_3", 2, BASE_MTIME + 100, 1)
+
+    new_files, replay_files = incremental_files(old + changed, BASE_MTIME, 0.0)
+
+    assert sorted(new_files) == sorted(changed)
+    assert replay_files == []
+
+def test_replay_keeps_at_least_one_image_per_old_class(tmp_path):
+    files = make_files(tmp_path, "hearts_2", 3, BASE_MTIME - 100, 0) + make_files(tmp_path, "hearts_3", 20, BASE_MTIME - 100, 1)
+
+    _, replay_files = incremental_files(files, BASE_MTIME, 0.1)
+
+    labels = [label for _, label in replay_files]
+    assert labels.count(0) == 1 and labels.count(1) == 2
@@ -0,0 +1,95 @@
+import json
+import threading
+import http.client
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from inference_server import MicroBatcher, make_handler, encode_array
+
+class FakeEngine:
+    """ Engine-Ersatz: zwei Klassen, schlägt für Crops einer bestimmten Größe fehl """
+
+    input_shape = (96, 96, 1)
+    num_classes = 2
+
+    def __init__(self, fail_shape=None):
+        self.fail_shape = fail_shape
+        self.batches = []
+
+    def predict_batch(self, images):
+        self.batches.append(images.shape)
+        if images.shape[1:] == self.fail_shape:
+            raise ValueError("kaputter Batch")
+        return np.tile(np.array([[0.25, 0.75]], dtype=np.float32), (len(images), 1))
+
+def started(engine, **kwargs):
+    batcher = MicroBatcher(engine, **kwargs)
+    batcher.start()
+    return batcher
+
+def test_requests_with_different_shapes_are_batched_separately():
+    engine = FakeEngine()
+    batcher = started(engine, max_wait_ms=200)
+    results = {}
+
+    def submit(name, crops):
+        results[name] = batcher.submit(crops, timeout=5)
+
+    threads = [threading.Thread(target=submit, args=("full", np.zeros((2, 256, 256), np.uint8))),
+               threading.Thread(target=submit, args=("small", np.zeros((3, 96, 96), np.uint8)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results["full"].result.shape == (2, 2)
+    assert results["small"].result.shape == (3, 2)
+    assert sorted(shape[0] for shape in engine.batches) == [2, 3]
+
+def test_failing_batch_reports_error_and_batcher_keeps_running():
+    batcher = started(FakeEngine(fail_shape=(50, 50)))
+
+    assert batcher.submit(np.zeros((1, 50, 50), np.uint8), timeout=5).result is None
+    request = batcher.submit(np.zeros((1, 96, 96), np.uint8), timeout=5)
+
+    assert batcher.is_alive()
+    np.testing.assert_allclose(request.result, [[0.25, 0.75]])
+
+def test_submit_times_out_without_running_batcher():
+    batcher = MicroBatcher(FakeEngine())  # nicht gestartet -> niemand beantwortet die Anfrage
+    request = batcher.submit(np.zeros((1, 96, 96), np.uint8), timeout=0.05)
+    assert request.result is None
+
+@pytest.fixture
+def server():
+    batcher = started(FakeEngine())
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(batcher, ["a", "b"]))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+def post(port, crops):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    connection.request("POST", "/predict", body=encode_array(crops))
+    response = connection.getresponse()
+    payload = json.loads(response.read())
+    connection.close()
+    return response.status, payload
+
+@pytest.mark.parametrize("crops", [
+    np.zeros((1, 96, 96, 3), np.uint8),  # Farbe statt Graustufen
+    np.zeros((1, 96, 96), np.int64),  # falscher Datentyp
+    np.zeros((0, 96, 96), np.uint8),  # leerer Stapel
+])
+def test_invalid_crops_are_rejected_with_400(server, crops):
+    status, payload = post(server, crops)
+    assert status == 400
+    assert "erwartet" in payload["error"]
+
+def test_valid_crops_are_answered(server):
+    status, payload = post(server, np.zeros((2, 96, 96, 1), np.uint8))
+    assert status == 200
+    assert payload["probabilities"] == [[0.25, 0.75], [0.25, 0.75]]
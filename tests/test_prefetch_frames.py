@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from live_card_detector import prefetch_frames
+
+class EndlessSource:
+    """ Unendliche Frame-Quelle wie eine Kamera/ein Video, merkt sich, ob sie freigegeben wurde """
+
+    def __init__(self):
+        self.released = threading.Event()
+
+    def frames(self):
+        index = 0
+        try:
+            while True:
+                yield index, None, index
+                index += 1
+        finally:
+            self.released.set()
+
+def test_early_stop_releases_source_and_stops_thread():
+    source = EndlessSource()
+    threads_before = threading.active_count()
+
+    frames = prefetch_frames(source.frames(), depth=2)
+    received = [item for _, (_, item) in zip(range(3), frames)]
+    frames.close()
+
+    assert [index for index, _, _ in received] == [0, 1, 2]
+    assert source.released.is_set()
+    assert threading.active_count() == threads_before
+
+def test_all_frames_arrive_in_order():
+    frames = [(i, f"img{i}.jpg", i) for i in range(20)]
+    assert [item for _, item in prefetch_frames(iter(frames), depth=4)] == frames
+
+def test_read_error_is_raised_in_consumer():
+    def broken():
+        yield 0, None, 0
+        raise FileNotFoundError("Video kaputt")
+
+    frames = prefetch_frames(broken())
+    assert next(frames)[1] == (0, None, 0)
+    with pytest.raises(FileNotFoundError):
+        next(frames)
@@ -0,0 +1,46 @@
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+
+from dataset_files import split_dataset
+from dataset_pack import pack_paths
+from train_model import validation_files
+
+def make_dataset(root, count):
+    """ Zwei Klassen mit je count leeren Bildern """
+    for card in ("hearts_2", "hearts_3"):
+        (root / card).mkdir(parents=True)
+        for i in range(count):
+            (root / card / f"img{i}.jpg").write_bytes(b"")
+    return str(root)
+
+def test_generator_uses_its_own_validation_subset():
+    validation_data = SimpleNamespace(filepaths=["d/hearts_2/img0.jpg", "d/hearts_3/img0.jpg"], classes=np.array([0, 1]))
+
+    files = validation_files("generator", "d", SimpleNamespace(), validation_data)
+
+    assert files == [("d/hearts_2/img0.jpg", 0), ("d/hearts_3/img0.jpg", 1)]
+
+def test_pack_uses_the_packed_file_list(tmp_path):
+    dataset_dir = make_dataset(tmp_path / "raw", 20)
+    # Pack mit älterem Dateibestand: nur die ersten 10 Bilder je Klasse
+    keys = [f"{card}/img{i}.jpg" for card in ("hearts_2", "hearts_3") for i in range(10)]
+    images_path, labels_path, index_path = pack_paths(str(tmp_path / "pack"))
+    np.save(images_path, np.zeros((len(keys), 4, 4), dtype=np.uint8))
+    np.save(labels_path, np.array([0] * 10 + [1] * 10, dtype=np.int32))
+    with open(index_path, "w") as f:
+        json.dump({"classes": ["hearts_2", "hearts_3"], "image_size": [4, 4], "files": keys}, f)
+
+    files = validation_files("pack", dataset_dir, SimpleNamespace(pack=index_path, skip=None), None)
+
+    assert {os.path.relpath(path, dataset_dir) for path, _ in files} <= set(keys)
+    _, _, val_files = split_dataset(dataset_dir)
+    assert set(files) <= set(val_files)  # gleiche Zuordnung, nur auf den gepackten Bildern
+
+def test_tfdata_uses_split_dataset(tmp_path):
+    dataset_dir = make_dataset(tmp_path, 20)
+    _, _, val_files = split_dataset(dataset_dir)
+
+    assert validation_files("tfdata", dataset_dir, SimpleNamespace(skip=None), None) == val_files